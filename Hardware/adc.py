@@ -0,0 +1,117 @@
+# adc.py
+"""
+Optional analog front-ends for the MQ3 alcohol sensor.
+
+The MQ3 D0 pin is only a comparator output; wiring A0 through an ADC
+gives a continuous reading that can be calibrated to BAC. Both readers
+return a normalised level in [0, 1] (higher = more alcohol vapour).
+
+MCP3008 (SPI):
+    VDD, VREF -> 3.3V     CLK  -> GPIO11 (SCLK)
+    AGND, DGND -> GND     DOUT -> GPIO9  (MISO)
+    CH0 -> MQ3 A0 (via divider, A0 swings to 5V)
+                          DIN  -> GPIO10 (MOSI)
+                          CS   -> GPIO8  (CE0)
+
+ADS1115 (I2C):
+    VDD -> 3.3V, GND -> GND, SCL -> GPIO3, SDA -> GPIO2
+    A0  -> MQ3 A0 (via divider)
+"""
+
+import time
+
+
+class MCP3008:
+    """10-bit SPI ADC. Needs `spidev` (imported on construction)."""
+
+    MAX_VALUE = 1023
+
+    def __init__(self, channel=0, bus=0, device=0, max_speed_hz=1_000_000):
+
+        import spidev
+
+        if not 0 <= channel <= 7:
+            raise ValueError("MCP3008 channel must be 0-7")
+
+        self.channel = channel
+
+        self.spi = spidev.SpiDev()
+        self.spi.open(bus, device)
+        self.spi.max_speed_hz = max_speed_hz
+
+    def read_raw(self):
+
+        # start bit, single-ended mode + channel, padding
+        reply = self.spi.xfer2([1, (8 + self.channel) << 4, 0])
+
+        return ((reply[1] & 3) << 8) | reply[2]
+
+    def read(self):
+        return self.read_raw() / self.MAX_VALUE
+
+    def close(self):
+
+        try:
+            self.spi.close()
+        except Exception:
+            pass
+
+
+class ADS1115:
+    """16-bit I2C ADC, single-shot reads. Needs `smbus2`."""
+
+    MAX_VALUE = 32767
+
+    _REG_CONVERSION = 0x00
+    _REG_CONFIG = 0x01
+
+    def __init__(self, channel=0, address=0x48, bus=1):
+
+        from smbus2 import SMBus
+
+        if not 0 <= channel <= 3:
+            raise ValueError("ADS1115 channel must be 0-3")
+
+        self.channel = channel
+        self.address = address
+        self.bus = SMBus(bus)
+
+    def read_raw(self):
+
+        # OS=1 (start), MUX=AINx vs GND, PGA=±4.096V, single-shot, 860 SPS
+        config = (
+            0x8000
+            | ((0x4 + self.channel) << 12)
+            | (0x1 << 9)
+            | 0x0100
+            | (0x7 << 5)
+            | 0x0003
+        )
+
+        self.bus.write_i2c_block_data(
+            self.address,
+            self._REG_CONFIG,
+            [(config >> 8) & 0xFF, config & 0xFF]
+        )
+
+        # one conversion at 860 SPS takes ~1.2 ms
+        time.sleep(0.0015)
+
+        hi, lo = self.bus.read_i2c_block_data(self.address, self._REG_CONVERSION, 2)
+
+        value = (hi << 8) | lo
+
+        if value & 0x8000:
+            value -= 1 << 16
+
+        return max(value, 0)
+
+    def read(self):
+        return self.read_raw() / self.MAX_VALUE
+
+    def close(self):
+
+        try:
+            self.bus.close()
+        except Exception:
+            pass
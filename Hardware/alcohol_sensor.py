@@ -1,10 +1,48 @@
-import RPi.GPIO as GPIO
+from Hardware.gpio import GPIO
+import threading
 import time
+import numpy as np
+
+
+# ---------------- SAMPLING ----------------
+
+# Background sampling rate (Hz) and history kept in the ring buffer
+SAMPLE_RATE_HZ = 50
+BUFFER_SECONDS = 30
+
+# Decision window (seconds of most recent samples)
+WINDOW_SEC = 3.0
+
+# Fraction of the window above threshold needed for a positive result
+DUTY_THRESHOLD = 0.5
+
+# Continuous time above threshold needed (rejects single-sample spikes)
+MIN_TIME_ABOVE_SEC = 0.5
+
+# Analog level (0-1) counted as alcohol when an ADC is used
+ADC_THRESHOLD = 0.45
+
+# ---------------- WARM-UP ----------------
+
+# Heater needs at least this long before readings are trusted (analog
+# path, once the level is stable)
+WARMUP_MIN_SEC = 5.0
+
+# Full heater warm-up (the old fixed warm-up); the digital D0 path always
+# waits this long
+WARMUP_MAX_SEC = 20.0
+
+# Analog signal must stay stable this long to count as warmed up
+STABILITY_SEC = 3.0
+
+# Max standard deviation of the analog level over STABILITY_SEC
+STABILITY_STD = 0.02
 
 
 class AlcoholSensor:
     """
     MQ3 Alcohol Sensor using DIGITAL output (D0)
+    or the analog output (A0) through an optional ADC (see Hardware/adc.py)
 
     Connections:
 
@@ -12,36 +50,337 @@ class AlcoholSensor:
         VCC -> 5V
         GND -> GND
         D0  -> GPIO17
+
+    start_sampling() polls the sensor in the background into a ring
+    buffer; is_alcohol_detected() then decides from windowed statistics
+    instead of a single noisy read.
+
+    Warm-up is tracked rather than slept: start_warmup() records the start
+    time and `ready` is set WARMUP_MAX_SEC later. With an ADC the analog
+    level shows the heater settling, so a level stable for STABILITY_SEC
+    ends the warm-up earlier (but not before WARMUP_MIN_SEC); the D0
+    comparator output sits at one level on a cold sensor too and cannot
+    shorten it. time_to_ready() estimates the remaining wait.
+
+    `clock` (time.monotonic by default) timestamps samples and warm-up.
     """
 
-    def __init__(self, pin=17, warmup=True):
+    def __init__(self, pin=17, warmup=True, adc=None, adc_threshold=ADC_THRESHOLD,
+                 clock=time.monotonic):
 
         self.pin = pin
+        self.adc = adc
+        self.adc_threshold = adc_threshold
+        self.clock = clock
+
+        size = int(SAMPLE_RATE_HZ * BUFFER_SECONDS)
+
+        self._times = np.zeros(size, dtype=np.float64)
+        self._levels = np.zeros(size, dtype=np.float32)
+        self._count = 0
+
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.warmup_started_at = None
+        self.ready_at = None
+        self.ready = threading.Event()
+        self._stable_since = None
 
         GPIO.setmode(GPIO.BCM)
         GPIO.setup(self.pin, GPIO.IN)
 
         print(f"✅ Alcohol sensor connected on GPIO {self.pin}")
 
+        if adc is not None:
+            print(f"✅ Alcohol sensor analog path: {type(adc).__name__}")
+
         if warmup:
-            print("🔥 Alcohol sensor warming up (20 seconds)...")
-            time.sleep(20)
-            print("✅ Alcohol sensor ready")
+            print(f"🔥 Alcohol sensor warming up (up to {WARMUP_MAX_SEC:.0f} seconds)...")
+            self.start_warmup()
+            self.wait_ready()
+
+    # ---------------- RAW READ ----------------
+    def read_level(self):
+        """
+        One reading, normalised so that higher means more alcohol:
+        digital D0 -> 1.0 (LOW, alcohol) / 0.0 (HIGH)
+        analog ADC -> 0..1
+        """
+
+        if self.adc is not None:
+            return float(self.adc.read())
+
+        return 1.0 if GPIO.input(self.pin) == 0 else 0.0
+
+    @property
+    def threshold(self):
+        return self.adc_threshold if self.adc is not None else 0.5
+
+    # ---------------- WARM-UP / READINESS ----------------
+    def start_warmup(self):
+        """
+        Mark the heater start and begin sampling; returns immediately.
+        """
+
+        if self.warmup_started_at is None:
+            self.warmup_started_at = self.clock()
+
+        self.start_sampling()
+
+    def _update_readiness(self, now):
+
+        if self.ready.is_set() or self.warmup_started_at is None:
+            return
+
+        elapsed = now - self.warmup_started_at
+
+        stable = False
+
+        if self.adc is not None:
+
+            times, levels = self.window(STABILITY_SEC)
+
+            covered = len(times) > 1 and times[-1] - times[0] >= STABILITY_SEC * 0.9
+
+            stable = covered and float(np.std(levels)) <= STABILITY_STD
+
+        # Digital D0 is a comparator output: a steady pin says nothing about
+        # the heater, so only the full warm-up counts
+
+        if not stable:
+            self._stable_since = None
+        elif self._stable_since is None:
+            self._stable_since = times[0]
+
+        if (stable and elapsed >= WARMUP_MIN_SEC) or elapsed >= WARMUP_MAX_SEC:
+
+            self.ready_at = now
+            self.ready.set()
+
+            how = "stable" if stable else "max warm-up reached"
+
+            print(f"✅ Alcohol sensor ready after {elapsed:.1f}s ({how})")
+
+    def time_to_ready(self):
+        """
+        Estimated seconds until the sensor is ready (0 when ready,
+        None if warm-up has not started).
+        """
+
+        if self.ready.is_set():
+            return 0.0
+
+        if self.warmup_started_at is None:
+            return None
+
+        now = self.clock()
+        elapsed = now - self.warmup_started_at
+
+        remaining = max(WARMUP_MAX_SEC - elapsed, 0.0)
+
+        if self.adc is None:
+            return remaining
+
+        stable_for = 0.0 if self._stable_since is None else now - self._stable_since
+
+        estimate = max(WARMUP_MIN_SEC - elapsed, STABILITY_SEC - stable_for, 0.0)
+
+        return min(estimate, remaining)
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until warmed up. Returns True when ready, False on timeout.
+        """
 
-    def is_alcohol_detected(self):
+        if self.warmup_started_at is None:
+            self.start_warmup()
+
+        remaining = WARMUP_MAX_SEC - (self.clock() - self.warmup_started_at)
+        limit = remaining if timeout is None else min(timeout, remaining)
+
+        if self.ready.wait(max(limit, 0.0)):
+            return True
+
+        # Also covers a stopped sampler: the max warm-up still applies
+        self._update_readiness(self.clock())
+
+        return self.ready.is_set()
+
+    def readiness(self):
+        """Warm-up timings for the session log."""
+
+        return {
+            "ready": self.ready.is_set(),
+            "warmup_sec": (
+                None if self.ready_at is None or self.warmup_started_at is None
+                else round(self.ready_at - self.warmup_started_at, 3)
+            ),
+            "time_to_ready_sec": self.time_to_ready()
+        }
+
+    # ---------------- BACKGROUND SAMPLER ----------------
+    def start_sampling(self, rate_hz=SAMPLE_RATE_HZ):
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._stop.clear()
+
+        self._thread = threading.Thread(
+            target=self._sample_loop,
+            args=(rate_hz,),
+            name="alcohol-sampler",
+            daemon=True
+        )
+        self._thread.start()
+
+    def stop_sampling(self):
+
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+    @property
+    def sampling(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _sample_loop(self, rate_hz):
+
+        interval = 1.0 / rate_hz
+        next_t = time.monotonic()
+
+        # Readiness is re-evaluated a few times per second
+        check_every = max(1, int(rate_hz / 4))
+        n = 0
+
+        while not self._stop.is_set():
+
+            try:
+                level = self.read_level()
+
+            except Exception as e:
+                print(f"⚠ Alcohol sampler stopped: {e}")
+                return
+
+            now = self.clock()
+
+            self.record(level, now)
+
+            n += 1
+
+            if n % check_every == 0:
+                self._update_readiness(now)
+
+            # Absolute schedule: no drift from read time
+            next_t += interval
+            self._stop.wait(max(0.0, next_t - time.monotonic()))
+
+    def record(self, level, now):
+        """Append one sample to the ring buffer (the sampler's write path)."""
+
+        with self._lock:
+            idx = self._count % len(self._levels)
+            self._times[idx] = now
+            self._levels[idx] = level
+            self._count += 1
+
+    def window(self, seconds=WINDOW_SEC):
+        """
+        Returns:
+            (times, levels) -> copies of the samples from the last `seconds`,
+            oldest first
+        """
+
+        with self._lock:
+
+            n = min(self._count, len(self._levels))
+            start = self._count - n
+
+            idx = np.arange(start, self._count) % len(self._levels)
+
+            times = self._times[idx]
+            levels = self._levels[idx]
+
+        keep = times >= self.clock() - seconds
+
+        return times[keep], levels[keep]
+
+    def window_stats(self, seconds=WINDOW_SEC):
+        """
+        Windowed statistics over the most recent samples.
+
+        Returns:
+            dict with samples, duty_cycle (fraction above threshold),
+            majority (bool), time_above_sec (longest continuous run above
+            threshold), mean and max level
+        """
+
+        times, levels = self.window(seconds)
+
+        if len(levels) == 0:
+            return {"samples": 0}
+
+        above = levels >= self.threshold
+
+        # Longest run of consecutive samples above threshold
+        longest = 0.0
+        run_start = None
+
+        for t, a in zip(times, above):
+
+            if a and run_start is None:
+                run_start = t
+            elif not a and run_start is not None:
+                run_start = None
+
+            if run_start is not None:
+                longest = max(longest, t - run_start)
+
+        duty = float(np.mean(above))
+
+        return {
+            "samples": int(len(levels)),
+            "duty_cycle": round(duty, 3),
+            "majority": duty > 0.5,
+            "time_above_sec": round(float(longest), 3),
+            "mean": round(float(np.mean(levels)), 4),
+            "max": round(float(np.max(levels)), 4)
+        }
+
+    # ---------------- DECISION ----------------
+    def is_alcohol_detected(self, window_sec=WINDOW_SEC):
         """
         Returns:
         (True/False, raw_value)
+
+        With samples in the last `window_sec` seconds (background sampler)
+        the decision uses that rolling window (duty cycle and continuous
+        time above threshold) and raw_value is the mean level; otherwise a
+        single reading is taken.
         """
 
         try:
 
-            state = GPIO.input(self.pin)
+            stats = self.window_stats(window_sec)
+
+            if stats["samples"] >= 3:
+
+                detected = (
+                    stats["duty_cycle"] >= DUTY_THRESHOLD
+                    and stats["time_above_sec"] >= MIN_TIME_ABOVE_SEC
+                )
+
+                return detected, stats["mean"]
 
-            if state == 0:
-                return True, 1   # alcohol detected
+            level = self.read_level()
+
+            if level >= self.threshold:
+                return True, level   # alcohol detected
             else:
-                return False, 0  # no alcohol
+                return False, level  # no alcohol
 
         except Exception as e:
             print(f"⚠ Alcohol detection error: {e}")
@@ -49,7 +388,12 @@ class AlcoholSensor:
 
     def close(self):
 
+        self.stop_sampling()
+
+        if self.adc is not None:
+            self.adc.close()
+
         try:
             GPIO.cleanup(self.pin)
         except:
-            pass
\ No newline at end of file
+            pass
@@ -1,16 +1,143 @@
 # cam.py
 
+import threading
 import time
 import cv2
-from picamera2 import Picamera2
+import numpy as np
+
+from Hardware.camera_backends import create_backend
+from tracing import span, traced
+
+
+# Frame geometry (every backend delivers frames at this size)
+FRAME_SIZE = (640, 480)
+
+# Number of preallocated frames kept by the capture thread
+RING_SIZE = 8
+
+# Ring pixel format; None uses each backend's native format: "yuv420" on
+# Picamera2 (liveness reads the Y plane with no per-frame conversion, BGR
+# is only built for stills and colour streams), "bgr" on OpenCV / replay
+# (stills stay BGR, luma streams convert to grey per frame)
+PIXEL_FORMAT = None
+
+# ---------------- AE / AWB CONVERGENCE ----------------
+
+# Max relative change between consecutive frames to count as settled
+CONVERGENCE_TOLERANCE = 0.03
+
+# Consecutive settled frame pairs required
+CONVERGENCE_FRAMES = 2
+
+# Ceilings (seconds) on waiting for convergence
+INIT_STABILIZE_TIMEOUT = 2.0
+CAPTURE_STABILIZE_TIMEOUT = 1.0
+
+
+class FrameRing:
+    """
+    Fixed-size ring of preallocated frames.
+
+    One producer (the capture thread) writes each frame straight into the
+    next slot and then publishes it by bumping `seq`; readers never take a
+    lock to look at the latest frame.
+
+    Frames are returned as views into the ring (zero copy). A view stays
+    valid for RING_SIZE - 1 frame periods, after which the producer reuses
+    the slot - copy it if you need to keep it longer.
+    """
+
+    def __init__(self, size, shape, dtype=np.uint8):
+
+        self.size = size
+        self.frames = np.empty((size,) + tuple(shape), dtype=dtype)
+        self.timestamps = np.zeros(size, dtype=np.float64)
+        self.metadata = [None] * size
+
+        # Total frames published; latest frame is seq - 1
+        self.seq = 0
+
+        self._cond = threading.Condition()
+
+    def write_slot(self):
+        """Slot the producer fills next (not visible to readers yet)."""
+        return self.frames[self.seq % self.size]
+
+    def publish(self, timestamp, metadata=None):
+
+        self.timestamps[self.seq % self.size] = timestamp
+        self.metadata[self.seq % self.size] = metadata
+
+        # Single writer: a plain int store is the publication point
+        self.seq += 1
+
+        with self._cond:
+            self._cond.notify_all()
+
+    def latest(self):
+        """
+        Returns:
+            (seq, frame, timestamp) of the newest frame, or None if empty
+        """
+
+        seq = self.seq
+
+        if seq == 0:
+            return None
+
+        idx = (seq - 1) % self.size
+
+        return seq - 1, self.frames[idx], float(self.timestamps[idx])
+
+    def metadata_at(self, seq):
+        """Backend metadata captured with frame `seq` (may be None)."""
+        return self.metadata[seq % self.size]
+
+    def wait_next(self, after_seq, timeout=1.0):
+        """
+        Block until a frame newer than `after_seq` exists.
+
+        A reader whose next frame sits in the slot the producer overwrites
+        next (or an older one) has fallen behind and skips to the newest
+        frame, so its view stays valid for RING_SIZE - 1 frame periods.
+
+        Returns:
+            (seq, frame, timestamp) or None on timeout
+        """
+
+        if self.seq <= after_seq + 1:
+            with self._cond:
+                self._cond.wait_for(lambda: self.seq > after_seq + 1, timeout)
+
+        seq = self.seq
+
+        if seq <= after_seq + 1:
+            return None
+
+        wanted = after_seq + 1
+
+        # seq - (size - 1) is the next slot written: keep one slot of margin
+        if wanted < seq - (self.size - 2):
+            wanted = seq - 1
+
+        idx = wanted % self.size
+
+        return wanted, self.frames[idx], float(self.timestamps[idx])
 
 
 class Camera:
     """
     Single authoritative camera interface.
-    Uses Picamera2 ONLY.
+    Uses Picamera2 by default; any CameraBackend can be passed instead
+    (see Hardware/camera_backends.py), e.g. a ReplayBackend for offline
+    benchmarking on x86.
     Handles exposure stabilization automatically.
 
+    For live backends a background thread captures continuously at the
+    sensor frame rate into a FrameRing; still capture, liveness and face
+    detection all read from that one live stream. Replay backends are read
+    on demand into the same ring, so no recorded frame is ever dropped.
+
     Camera Connections:
 
     Raspberry Pi Camera Module (CSI Camera)
@@ -29,124 +156,380 @@ class Camera:
     No GPIO pins are used by this module.
     """
 
-    def __init__(self):
+    def __init__(self, backend=None, stabilize_timeout=CAPTURE_STABILIZE_TIMEOUT,
+                 pixel_format=PIXEL_FORMAT):
+
+        self.stabilize_timeout = stabilize_timeout
+        self._height = None
+        self._yuv = False
+
+        self.backend = None
+
+        self._ring = None
+        self._stop = threading.Event()
+        self._thread = None
+
         try:
             print("📷 Initializing camera...")
 
-            self.picam2 = Picamera2()
+            self.backend = backend or create_backend(size=FRAME_SIZE, pixel_format=pixel_format)
+            self.backend.start()
 
-            config = self.picam2.create_video_configuration(
-                main={"size": (640, 480), "format": "RGB888"}
-            )
+            # A backend passed in brings its own format
+            self._height = self.backend.size[1]
+            self._yuv = self.backend.pixel_format == "yuv420"
+
+            self._ring = FrameRing(RING_SIZE, self.backend.frame_shape())
+
+            if self.backend.live:
 
-            self.picam2.configure(config)
-            self.picam2.start()
+                self._thread = threading.Thread(
+                    target=self._capture_loop,
+                    name="camera-capture",
+                    daemon=True
+                )
+                self._thread.start()
 
             # Allow auto exposure / white balance to settle
-            time.sleep(2)
+            self.wait_until_stable(INIT_STABILIZE_TIMEOUT)
 
             print("✅ Camera initialized successfully")
 
         except Exception as e:
             print(f"⚠️ Camera init error: {e}")
-            self.picam2 = None
+            self._stop.set()
+
+            if self._thread is not None:
+                self._thread.join(timeout=1.0)
+
+            # A backend that started (or half started) still holds the
+            # sensor: release it, or the next Camera() cannot open it
+            if self.backend is not None:
+                try:
+                    self.backend.stop()
+                except Exception as stop_error:
+                    print(f"⚠️ Camera stop error: {stop_error}")
+
+            self.backend = None
+
+
+    def _capture_loop(self):
+        """
+        Producer: capture at the sensor's own pace (the backend blocks
+        until the next frame) and write it straight into the ring,
+        keeping the frame's AE/AWB metadata alongside it.
+        """
+
+        while not self._stop.is_set():
+
+            try:
+                ts, metadata = self.backend.read_into(self._ring.write_slot())
+
+                self._ring.publish(ts, metadata)
+
+            except Exception as e:
+
+                if self._stop.is_set():
+                    break
+
+                print(f"⚠️ Camera capture thread error: {e}")
+                time.sleep(0.1)
+
+
+    def _wait_frame(self, after_seq, timeout):
+        """
+        Next frame after `after_seq`: from the capture thread for live
+        backends, read synchronously for replay. None on timeout / EOF.
+        """
+
+        if self.backend.live:
+            return self._ring.wait_next(after_seq, timeout)
+
+        try:
+            ts, metadata = self.backend.read_into(self._ring.write_slot())
+        except EOFError:
+            return None
+
+        self._ring.publish(ts, metadata)
+
+        return self._ring.latest()
+
+
+    def _next_frame(self, after_seq, timeout=2.0):
 
+        item = self._wait_frame(after_seq, timeout)
 
-    def capture_stable_image(self, filename):
+        if item is None:
+            raise RuntimeError("No frame from capture thread")
+
+        return item
+
+
+    def _luma(self, frame):
+        """Grey view of a ring frame: the Y plane rows, or a BGR conversion."""
+
+        if self._yuv:
+            return frame[:self._height]
+
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+    def _bgr(self, frame):
+        """BGR image of a ring frame (a new array for yuv420 rings)."""
+
+        if self._yuv:
+            return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+
+        return frame
+
+
+    @staticmethod
+    def _exposure_signature(metadata, frame):
+        """
+        Values that move while AE/AWB is still converging.
+        Falls back to mean luma when the metadata is missing.
+        """
+
+        if metadata and "ExposureTime" in metadata:
+
+            gains = metadata.get("ColourGains") or (0.0, 0.0)
+
+            return (
+                float(metadata.get("ExposureTime", 0)),
+                float(metadata.get("AnalogueGain", 0)),
+                float(gains[0]),
+                float(gains[1])
+            )
+
+        # Subsampled mean is enough to see exposure drift
+        return (float(frame[::8, ::8].mean()),)
+
+
+    @traced("camera.stabilize")
+    def wait_until_stable(self, max_wait=None):
+        """
+        Wait until auto exposure / white balance has converged.
+
+        Compares exposure time, analogue gain and colour gains (or mean luma)
+        of consecutive frames and returns once they stay within
+        CONVERGENCE_TOLERANCE for CONVERGENCE_FRAMES pairs - a few frames
+        on a warm camera - or when `max_wait` seconds have passed.
+
+        Returns:
+            (converged, elapsed_sec)
+        """
+
+        if not self.backend.live:
+            # Recorded frames were exposed when they were captured
+            return True, 0.0
+
+        if max_wait is None:
+            max_wait = self.stabilize_timeout
+
+        start = time.time()
+
+        latest = self._ring.latest()
+
+        if latest is None:
+            latest = self._next_frame(-1, timeout=max_wait)
+
+        seq, frame, _ = latest
+
+        # Y plane only: chroma rows would dilute the luma fallback
+        if self._yuv:
+            frame = frame[:self._height]
+
+        previous = self._exposure_signature(self._ring.metadata_at(seq), frame)
+
+        settled = 0
+
+        while time.time() - start < max_wait:
+
+            item = self._wait_frame(seq, timeout=max_wait)
+
+            if item is None:
+                break
+
+            seq, frame, _ = item
+
+            if self._yuv:
+                frame = frame[:self._height]
+
+            current = self._exposure_signature(self._ring.metadata_at(seq), frame)
+
+            if len(current) == len(previous) and all(
+                abs(c - p) <= CONVERGENCE_TOLERANCE * max(abs(p), 1e-6)
+                for c, p in zip(current, previous)
+            ):
+                settled += 1
+            else:
+                settled = 0
+
+            previous = current
+
+            if settled >= CONVERGENCE_FRAMES:
+                elapsed = time.time() - start
+                print(f"⚙️ Exposure converged in {elapsed * 1000:.0f} ms")
+                return True, elapsed
+
+        elapsed = time.time() - start
+
+        print(f"⚠️ Exposure not converged after {elapsed:.2f}s, continuing")
+
+        return False, elapsed
+
+
+    def latest_frame(self):
+        """
+        Newest BGR frame without blocking, or None. A zero-copy view
+        for a bgr ring; converted (a new array) for a yuv420 ring.
+
+        Returns:
+            (seq, frame, timestamp) or None
+        """
+
+        if self._ring is None:
+            return None
+
+        latest = self._ring.latest()
+
+        if latest is None:
+            return None
+
+        seq, frame, ts = latest
+
+        return seq, self._bgr(frame), ts
+
+
+    @traced("camera.capture")
+    def capture_stable_image(self, filename, return_frame=False):
         """
-        Capture stable still image after discarding garbage frame and stabilizing.
-        
-        Raspberry Pi cameras typically produce a garbage (unstable) first frame.
+        Capture stable still image once exposure has converged.
+
         This function:
-        1. Captures and discards the first garbage frame
-        2. Allows camera to stabilize for exposure/white balance
-        3. Captures and returns the valid image
+        1. Waits until AE/AWB has settled (returns after a few frames on a
+           warm camera, at most `stabilize_timeout` seconds)
+        2. Saves the newest valid frame from the live stream
+
+        Returns:
+            filename, or (filename, BGR frame copy) with return_frame=True
+            so callers can skip decoding the JPEG again
         """
 
-        if self.picam2 is None:
+        if self.backend is None:
             raise RuntimeError("Camera not initialized")
 
         try:
-            # Step 1: Capture and discard first garbage frame from Raspberry Pi camera
-            print("📷 Capturing garbage frame...")
-            garbage_frame = self.picam2.capture_array()
-            print("🗑️ Garbage frame discarded (Raspberry Pi camera warmup)")
-            
-            # Step 2: Allow camera to stabilize with additional frames
+            # Step 1: Wait for exposure / white balance convergence
             print("⚙️ Stabilizing camera exposure and white balance...")
-            for i in range(4):
-                self.picam2.capture_array()
-                time.sleep(0.2)
-            
-            # Step 3: Capture valid image
+            self.wait_until_stable()
+
+            # Step 2: Capture valid image
             print("📸 Capturing valid image...")
-            frame = self.picam2.capture_array()
 
-            if frame is None:
-                raise RuntimeError("Failed to capture frame")
+            if self.backend.live:
+                seq, frame, _ = self._ring.latest()
+            else:
+                seq, frame, _ = self._next_frame(-1)
 
-            # Convert RGB → BGR for OpenCV
-            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+            # Colour is only built here, once per still
+            frame = self._bgr(frame)
 
-            cv2.imwrite(filename, frame)
+            with span("camera.imwrite"):
+                cv2.imwrite(filename, frame)
 
             print(f"✅ Valid image saved: {filename}")
 
+            if return_frame:
+                # The ring slot is reused by the capture thread; a yuv420
+                # conversion is already a private array
+                return filename, frame if self._yuv else frame.copy()
+
             return filename
 
         except Exception as e:
             raise RuntimeError(f"Camera capture error: {e}")
 
 
-    def get_frame_stream(self, duration_sec=6, fps=12):
+    def get_frame_stream(self, duration_sec=6, fps=None, with_timestamps=False,
+                         luma=False):
         """
         Generator that yields frames for liveness detection
-        Increased duration and FPS for better blink detection
+        (or (timestamp, frame) tuples with with_timestamps=True)
+
+        Frames come from the capture thread at the sensor frame rate
+        (fps=None) or decimated to at most `fps` without any sleeping.
+
+        BGR frames by default; luma=True yields 2-D grey frames. Frames in
+        the ring's own layout (grey from yuv420, BGR from bgr) are zero-copy
+        views into the ring; the other combination is converted per frame.
+
+        Duration is measured on frame timestamps, so a replay backend
+        yields exactly the same frames however fast it is consumed.
         """
 
-        if self.picam2 is None:
+        if self.backend is None:
             raise RuntimeError("Camera not initialized")
 
-        interval = 1.0 / fps
-        end_time = time.time() + duration_sec
+        interval = 1.0 / fps if fps else 0.0
 
         frame_count = 0
+        first_ts = None
+        last_ts = 0.0
+
+        latest = self._ring.latest()
+        seq = latest[0] if latest else -1
 
         print("👁️ Starting frame stream for liveness detection...")
-        print(f"⏱ Duration: {duration_sec} sec | FPS: {fps}")
+        print(f"⏱ Duration: {duration_sec} sec | FPS: {fps or 'sensor'}")
 
-        while time.time() < end_time:
+        try:
 
-            try:
-                frame = self.picam2.capture_array()
+            while True:
 
-                if frame is None:
-                    continue
+                item = self._wait_frame(seq, timeout=1.0)
 
-                # Convert RGB → BGR
-                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+                if item is None:
+                    print("⚠️ Camera stream error: no more frames")
+                    break
 
+                seq, frame, ts = item
+
+                if first_ts is None:
+                    first_ts = ts
+
+                if ts - first_ts >= duration_sec:
+                    break
+
+                if ts - last_ts < interval:
+                    continue
+
+                last_ts = ts
                 frame_count += 1
 
-                yield frame
+                frame = self._luma(frame) if luma else self._bgr(frame)
 
-            except Exception as e:
-                print(f"⚠️ Camera stream error: {e}")
-                break
+                yield (ts, frame) if with_timestamps else frame
 
-            time.sleep(interval)
+        finally:
 
-        print(f"👁️ Frame stream ended | Frames captured: {frame_count}")
+            # Also reached when the consumer stops early (generator close)
+            print(f"👁️ Frame stream ended | Frames captured: {frame_count}")
 
 
     def close(self):
         """
-        Safely stop the camera
+        Safely stop the capture thread and the camera
         """
 
-        if self.picam2:
+        self._stop.set()
+
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+
+        if self.backend:
             try:
-                self.picam2.stop()
+                self.backend.stop()
                 print("🛑 Camera stopped")
             except Exception:
-                pass
\ No newline at end of file
+                pass
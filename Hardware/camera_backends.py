@@ -0,0 +1,405 @@
+# camera_backends.py
+"""
+Frame sources for Hardware.cam.Camera.
+
+Camera only needs three things from a backend: start(), read_into(dst)
+and stop(). This lets the same vision pipeline run on the Pi camera,
+on any OpenCV-readable device, or on recorded frames for offline
+benchmarking and CI.
+
+Select a backend with DRIVEGUARD_CAMERA:
+    picamera2              Raspberry Pi CSI camera (default)
+    opencv[:<index>]       cv2.VideoCapture device, e.g. opencv:0
+    replay:<dir|video>     recorded frames, unthrottled
+    replay:<dir|video>?fps=30&realtime=1&loop=1
+                           ... with replay options (see ReplayBackend)
+
+Pixel formats written by read_into:
+    "bgr"      H x W x 3 uint8 (default for OpenCV and replay, whose
+               sources decode to BGR anyway)
+    "yuv420"   planar I420, (H * 3/2) x W uint8: rows [0, H) are the Y
+               (luma) plane, so grey consumers take a zero-copy view.
+               Default for Picamera2, which delivers it natively; other
+               backends convert BGR once in the capture thread
+"""
+
+import glob
+import os
+import time
+from urllib.parse import parse_qsl
+import cv2
+import numpy as np
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+PIXEL_FORMATS = ("bgr", "yuv420")
+
+
+class CameraBackend:
+    """
+    Base class for frame sources.
+
+    live  : True when frames arrive in real time (Camera runs a capture
+            thread); False for sources read on demand (replay)
+    size  : (width, height) of frames written by read_into
+    pixel_format : "bgr" or "yuv420" (see module docstring); None picks
+                   the backend's native `default_pixel_format`
+    """
+
+    live = True
+
+    default_pixel_format = "bgr"
+
+    def __init__(self, size=(640, 480), pixel_format=None):
+
+        pixel_format = pixel_format or self.default_pixel_format
+
+        if pixel_format not in PIXEL_FORMATS:
+            raise ValueError(f"Unknown pixel format: {pixel_format}")
+
+        self.size = tuple(size)
+        self.pixel_format = pixel_format
+
+    def frame_shape(self):
+        """Shape of the buffer read_into fills."""
+
+        width, height = self.size
+
+        if self.pixel_format == "yuv420":
+            return (height * 3 // 2, width)
+
+        return (height, width, 3)
+
+    def start(self):
+        pass
+
+    def read_into(self, dst):
+        """
+        Write the next frame into `dst` (frame_shape(), pixel_format).
+
+        Returns:
+            (timestamp, metadata) -> metadata dict or None
+        Raises:
+            EOFError when a finite source is exhausted
+        """
+        raise NotImplementedError
+
+    def stop(self):
+        pass
+
+    def _fit_bgr(self, frame):
+        """BGR frame resized to `size` if needed."""
+
+        if frame.shape[:2] == (self.size[1], self.size[0]):
+            return frame
+
+        return cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+
+    def _fit_into(self, frame, dst):
+        """Write a BGR frame into dst in this backend's pixel format."""
+
+        if self.pixel_format == "yuv420":
+            cv2.cvtColor(self._fit_bgr(frame), cv2.COLOR_BGR2YUV_I420, dst=dst)
+        elif frame.shape == dst.shape:
+            np.copyto(dst, frame)
+        else:
+            cv2.resize(frame, self.size, dst=dst, interpolation=cv2.INTER_AREA)
+
+
+def _copy_i420(src, dst):
+    """
+    Copy a Picamera2 YUV420 array into a packed I420 buffer.
+
+    Picamera2 pads every Y row to the ISP stride (src.shape[1]); the U and
+    V planes follow with stride/2 bytes per chroma row, two chroma rows per
+    padded row. Cropping the padded array to dst's width would keep
+    chroma padding and shift U/V, so the planes are copied one by one.
+    dst must be C-contiguous (ring slots are).
+    """
+
+    height = dst.shape[0] * 2 // 3
+    width = dst.shape[1]
+    stride = src.shape[1]
+
+    if stride == width:
+        np.copyto(dst, src[:dst.shape[0]])
+        return
+
+    np.copyto(dst[:height], src[:height, :width])
+
+    ch, cw, cstride = height // 2, width // 2, stride // 2
+
+    src_uv = np.ascontiguousarray(src[height:]).reshape(-1)
+    dst_uv = dst[height:].reshape(2, ch, cw)
+
+    for plane in range(2):
+
+        start = plane * ch * cstride
+
+        rows = src_uv[start:start + ch * cstride].reshape(ch, cstride)
+
+        np.copyto(dst_uv[plane], rows[:, :cw])
+
+
+class Picamera2Backend(CameraBackend):
+    """
+    Raspberry Pi CSI camera through Picamera2 (imported lazily).
+    In yuv420 mode (the default) the ISP output is copied as is: no
+    colour conversion.
+    """
+
+    default_pixel_format = "yuv420"
+
+    def __init__(self, size=(640, 480), pixel_format=None):
+
+        super().__init__(size, pixel_format)
+
+        self.picam2 = None
+
+    def start(self):
+
+        from picamera2 import Picamera2
+
+        self.picam2 = Picamera2()
+
+        fmt = "YUV420" if self.pixel_format == "yuv420" else "RGB888"
+
+        config = self.picam2.create_video_configuration(
+            main={"size": self.size, "format": fmt}
+        )
+
+        self.picam2.configure(config)
+        self.picam2.start()
+
+    def read_into(self, dst):
+
+        # Blocks until the sensor delivers the next frame
+        request = self.picam2.capture_request()
+
+        try:
+            frame = request.make_array("main")
+            metadata = request.get_metadata()
+        finally:
+            request.release()
+
+        if self.pixel_format == "yuv420":
+            _copy_i420(frame, dst)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_RGB2BGR, dst=dst)
+
+        return time.time(), metadata
+
+    def stop(self):
+
+        if self.picam2:
+            self.picam2.stop()
+
+
+class OpenCVBackend(CameraBackend):
+    """Any device cv2.VideoCapture can open (USB webcam, laptop camera)."""
+
+    def __init__(self, device=0, size=(640, 480), pixel_format=None):
+
+        super().__init__(size, pixel_format)
+
+        self.device = device
+        self.cap = None
+
+    def start(self):
+
+        self.cap = cv2.VideoCapture(self.device)
+
+        if not self.cap.isOpened():
+            raise RuntimeError(f"Cannot open video device {self.device}")
+
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.size[0])
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.size[1])
+
+    def read_into(self, dst):
+
+        ok, frame = self.cap.read()
+
+        if not ok or frame is None:
+            raise RuntimeError("VideoCapture read failed")
+
+        self._fit_into(frame, dst)
+
+        return time.time(), None
+
+    def stop(self):
+
+        if self.cap is not None:
+            self.cap.release()
+
+
+class ReplayBackend(CameraBackend):
+    """
+    Deterministic replay of recorded frames from a directory of images
+    (sorted by name) or a video file.
+
+    Timestamps are synthetic (frame index / fps), so liveness timing and
+    stream durations are identical on every run. With realtime=False frames
+    are delivered as fast as the consumer reads them.
+    """
+
+    live = False
+
+    def __init__(self, source, fps=30.0, realtime=False, loop=False, size=(640, 480),
+                 pixel_format=None):
+
+        super().__init__(size, pixel_format)
+
+        self.source = source
+        self.fps = fps
+        self.realtime = realtime
+        self.loop = loop
+
+        self._frames = None
+        self._cap = None
+        self._index = 0
+        self._t0 = None
+
+    def start(self):
+
+        if os.path.isdir(self.source):
+
+            paths = sorted(
+                p for p in glob.glob(os.path.join(self.source, "*"))
+                if p.lower().endswith(IMAGE_EXTENSIONS)
+            )
+
+            # Decode once up front so replay speed is not bound by JPEG decode
+            self._frames = []
+
+            for p in paths:
+
+                frame = cv2.imread(p)
+
+                if frame is None:
+                    print(f"⚠️ Replay: cannot decode {p}")
+                    continue
+
+                self._frames.append(self._fit_bgr(frame))
+
+            # Also covers a directory of unreadable files: with loop=True
+            # _read_frame would otherwise divide by zero
+            if not self._frames:
+                raise RuntimeError(f"No images in {self.source}")
+
+        else:
+
+            self._cap = cv2.VideoCapture(self.source)
+
+            if not self._cap.isOpened():
+                raise RuntimeError(f"Cannot open replay video {self.source}")
+
+        self._index = 0
+        self._t0 = time.time()
+
+    def _read_frame(self):
+
+        if self._frames is not None:
+
+            if self._index >= len(self._frames) and not self.loop:
+                raise EOFError("Replay finished")
+
+            return self._frames[self._index % len(self._frames)]
+
+        ok, frame = self._cap.read()
+
+        if not ok and self.loop:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, frame = self._cap.read()
+
+        if not ok or frame is None:
+            raise EOFError("Replay finished")
+
+        return frame
+
+    def read_into(self, dst):
+
+        frame = self._read_frame()
+
+        ts = self._t0 + self._index / self.fps
+
+        if self.realtime:
+            # Pace against the absolute schedule, so sleeps never drift
+            delay = ts - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        self._fit_into(frame, dst)
+
+        self._index += 1
+
+        return ts, None
+
+    def stop(self):
+
+        if self._cap is not None:
+            self._cap.release()
+
+
+def _flag(value):
+
+    return value.lower() in ("1", "true", "yes", "on")
+
+
+def _replay_options(query):
+    """
+    Parse "fps=30&realtime=1&loop=1" into ReplayBackend keyword arguments.
+
+    Returns:
+        dict -> subset of {"fps", "realtime", "loop"}
+    """
+
+    options = {}
+
+    for key, value in parse_qsl(query, keep_blank_values=True):
+
+        if key == "fps":
+            options["fps"] = float(value)
+        elif key in ("realtime", "loop"):
+            options[key] = _flag(value)
+        else:
+            raise ValueError(f"Unknown replay option: {key}")
+
+    if options.get("fps", 1.0) <= 0:
+        raise ValueError("replay fps must be positive")
+
+    return options
+
+
+def create_backend(spec=None, size=(640, 480), pixel_format=None):
+    """
+    Build a backend from a spec string (see module docstring).
+    Defaults to DRIVEGUARD_CAMERA, then picamera2.
+    """
+
+    spec = spec or os.getenv("DRIVEGUARD_CAMERA", "picamera2")
+
+    kind, _, arg = spec.partition(":")
+
+    if kind == "picamera2":
+        return Picamera2Backend(size=size, pixel_format=pixel_format)
+
+    if kind == "opencv":
+        return OpenCVBackend(
+            device=int(arg) if arg.isdigit() else (arg or 0),
+            size=size,
+            pixel_format=pixel_format
+        )
+
+    if kind == "replay":
+        path, _, query = arg.partition("?")
+        if not path:
+            raise ValueError("replay backend needs a path: replay:<dir|video>")
+        return ReplayBackend(
+            path,
+            size=size,
+            pixel_format=pixel_format,
+            **_replay_options(query)
+        )
+
+    raise ValueError(f"Unknown camera backend: {spec}")
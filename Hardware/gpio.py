@@ -0,0 +1,291 @@
+# gpio.py
+"""
+GPIO access for the DriveGuard hardware modules.
+
+`GPIO` is RPi.GPIO on a Raspberry Pi. With DRIVEGUARD_GPIO=sim it is a
+SimulatedGPIO with the same API, so Main_File.main() runs headless (CI,
+soak tests, laptops). Without it a missing or unusable RPi.GPIO is an
+error, as on the vehicle it must be.
+
+Simulation example:
+
+    from Hardware.gpio import GPIO
+
+    GPIO.script(24, [(0.5, GPIO.LOW), (0.6, GPIO.HIGH)])   # button tap
+    GPIO.set_input(17, GPIO.HIGH)                          # MQ3: sober
+    ...
+    GPIO.outputs(25)   # -> [(t, level), ...] relay transitions
+"""
+
+import heapq
+import os
+import threading
+import time
+
+
+class SimulatedGPIO:
+    """
+    In-memory stand-in for RPi.GPIO.
+
+    Input levels can be set immediately (set_input) or scripted over time
+    (script); edges fire wait_for_edge / add_event_detect callbacks exactly
+    like the real library. Every output change is recorded with a
+    timestamp (seconds since reset()) in `transitions`.
+    """
+
+    BCM = 11
+    BOARD = 10
+
+    OUT = 0
+    IN = 1
+
+    LOW = 0
+    HIGH = 1
+
+    PUD_OFF = 20
+    PUD_DOWN = 21
+    PUD_UP = 22
+
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self):
+
+        self._cond = threading.Condition()
+        self._dispatcher = None
+
+        self.reset()
+
+    # ---------- SIMULATION CONTROL ----------
+    def reset(self):
+        """Forget all pins, scripts and recorded transitions."""
+
+        with self._cond:
+
+            self.mode = None
+            self.t0 = time.monotonic()
+
+            self._pins = {}          # pin -> direction
+            self._levels = {}        # pin -> current level
+            self._events = []        # heap of (time, order, pin, level)
+            self._order = 0
+
+            self._detect = {}        # pin -> (edge, callbacks, bouncetime)
+            self._detected = set()
+            self._last_edge = {}
+
+            self.transitions = []    # (t, pin, level) for outputs
+
+            self._cond.notify_all()
+
+    def now(self):
+        return time.monotonic() - self.t0
+
+    def set_input(self, pin, level):
+        """Drive an input pin to `level` right now."""
+        self._apply(pin, level)
+
+    def script(self, pin, events):
+        """
+        Schedule input levels: events is [(seconds_from_now, level), ...].
+        """
+
+        start = time.monotonic()
+
+        with self._cond:
+
+            for offset, level in events:
+                self._order += 1
+                heapq.heappush(self._events, (start + offset, self._order, pin, level))
+
+            self._start_dispatcher()
+            self._cond.notify_all()
+
+    def outputs(self, pin):
+        """Recorded [(t, level), ...] transitions of one output pin."""
+        return [(t, level) for t, p, level in self.transitions if p == pin]
+
+    def _start_dispatcher(self):
+
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+
+            self._dispatcher = threading.Thread(
+                target=self._dispatch_loop,
+                name="gpio-sim",
+                daemon=True
+            )
+            self._dispatcher.start()
+
+    def _dispatch_loop(self):
+
+        while True:
+
+            with self._cond:
+
+                while not self._events:
+                    self._cond.wait()
+
+                when = self._events[0][0]
+                delay = when - time.monotonic()
+
+                if delay > 0:
+                    self._cond.wait(delay)
+                    continue
+
+                _, _, pin, level = heapq.heappop(self._events)
+
+            self._apply(pin, level)
+
+    def _apply(self, pin, level):
+
+        callbacks = []
+
+        with self._cond:
+
+            old = self._levels.get(pin, self.HIGH)
+            self._levels[pin] = level
+
+            if old != level:
+
+                edge = self.RISING if level == self.HIGH else self.FALLING
+
+                watch = self._detect.get(pin)
+
+                if watch is not None:
+
+                    wanted, cbs, bouncetime = watch
+
+                    last = self._last_edge.get(pin)
+                    bounced = (
+                        bouncetime
+                        and last is not None
+                        and (time.monotonic() - last) * 1000 < bouncetime
+                    )
+
+                    if wanted in (edge, self.BOTH) and not bounced:
+                        self._last_edge[pin] = time.monotonic()
+                        self._detected.add(pin)
+                        callbacks = list(cbs)
+
+            self._cond.notify_all()
+
+        for cb in callbacks:
+            cb(pin)
+
+    # ---------- RPi.GPIO API ----------
+    def setwarnings(self, flag):
+        pass
+
+    def setmode(self, mode):
+        self.mode = mode
+
+    def setup(self, pin, direction, pull_up_down=None, initial=None):
+
+        with self._cond:
+
+            self._pins[pin] = direction
+
+            if direction == self.OUT:
+                level = initial if initial is not None else self.LOW
+                self._levels[pin] = level
+                self.transitions.append((self.now(), pin, level))
+
+            elif pin not in self._levels:
+                self._levels[pin] = self.LOW if pull_up_down == self.PUD_DOWN else self.HIGH
+
+    def input(self, pin):
+
+        if pin not in self._pins:
+            raise RuntimeError(f"GPIO {pin} not set up")
+
+        return self._levels.get(pin, self.HIGH)
+
+    def output(self, pin, value):
+
+        if self._pins.get(pin) != self.OUT:
+            raise RuntimeError(f"GPIO {pin} not set up as output")
+
+        value = self.HIGH if value else self.LOW
+
+        with self._cond:
+
+            if self._levels.get(pin) != value:
+                self._levels[pin] = value
+                self.transitions.append((self.now(), pin, value))
+
+    def wait_for_edge(self, pin, edge, bouncetime=None, timeout=None):
+        """
+        Returns:
+            pin when the edge occurred, None on timeout (ms, like RPi.GPIO)
+        """
+
+        start_level = self.input(pin)
+
+        def seen():
+            level = self._levels.get(pin, self.HIGH)
+            if level == start_level:
+                return False
+            return edge == self.BOTH or (edge == self.RISING) == (level == self.HIGH)
+
+        with self._cond:
+            ok = self._cond.wait_for(seen, None if timeout is None else timeout / 1000.0)
+
+        return pin if ok else None
+
+    def add_event_detect(self, pin, edge, callback=None, bouncetime=None):
+
+        with self._cond:
+
+            if pin in self._detect:
+                raise RuntimeError(f"Conflicting edge detection already enabled for GPIO {pin}")
+
+            self._detect[pin] = (edge, [callback] if callback else [], bouncetime)
+
+    def add_event_callback(self, pin, callback):
+
+        with self._cond:
+            self._detect[pin][1].append(callback)
+
+    def remove_event_detect(self, pin):
+
+        with self._cond:
+            self._detect.pop(pin, None)
+            self._detected.discard(pin)
+
+    def event_detected(self, pin):
+
+        with self._cond:
+
+            if pin in self._detected:
+                self._detected.discard(pin)
+                return True
+
+            return False
+
+    def cleanup(self, pin=None):
+
+        with self._cond:
+
+            pins = list(self._pins) if pin is None else (
+                list(pin) if isinstance(pin, (list, tuple)) else [pin]
+            )
+
+            for p in pins:
+                self._pins.pop(p, None)
+                self._detect.pop(p, None)
+
+
+def _load_gpio():
+
+    if os.getenv("DRIVEGUARD_GPIO", "").lower() == "sim":
+        return SimulatedGPIO()
+
+    # No silent fallback: on the vehicle a simulated relay would leave the
+    # unit looking alive while never driving the ignition
+    import RPi.GPIO as rpi_gpio
+
+    return rpi_gpio
+
+
+GPIO = _load_gpio()
@@ -1,6 +1,7 @@
 # ignition_control.py
 
-import RPi.GPIO as GPIO
+from Hardware.gpio import GPIO
+from tracing import traced
 
 
 class IgnitionController:
@@ -63,6 +64,22 @@ class IgnitionController:
         except Exception as e:
             print(f"⚠️ IgnitionController init error: {e}")
 
+    def reset(self):
+        """
+        Back to the fail-safe idle state (ignition off, buzzer off, red LED)
+        between sessions in daemon mode
+        """
+
+        try:
+            GPIO.output(self.relay_pin, GPIO.LOW)
+            GPIO.output(self.buzzer_pin, GPIO.LOW)
+            GPIO.output(self.green_led, GPIO.LOW)
+            GPIO.output(self.red_led, GPIO.HIGH)
+
+        except Exception as e:
+            print(f"⚠️ Ignition reset error: {e}")
+
+    @traced("gpio.allow_ignition")
     def allow_ignition(self):
         """
         Driver is valid → start vehicle
@@ -79,6 +96,7 @@ class IgnitionController:
         except Exception as e:
             print(f"⚠️ Ignition allow error: {e}")
 
+    @traced("gpio.block_ignition")
     def block_ignition(self):
         """
         Driver invalid → block vehicle
@@ -1,8 +1,22 @@
 # ignition_switch.py
 
-import RPi.GPIO as GPIO
+import asyncio
+import queue
+import threading
 import time
 
+from Hardware.gpio import GPIO
+
+
+# Hardware debounce window for the push button (ms)
+BOUNCE_MS = 200
+
+# A release must read HIGH this long (s), as a bounce is not a release
+RELEASE_HOLD_SEC = 1.0
+
+# Level polling interval while waiting for a release (s)
+RELEASE_POLL_SEC = 0.05
+
 
 class IgnitionSwitch:
     """
@@ -20,11 +34,22 @@ class IgnitionSwitch:
     Logic:
         NOT PRESSED → GPIO HIGH
         PRESSED     → GPIO LOW
+
+    Presses are edge-triggered (kernel interrupt on the FALLING edge +
+    bouncetime) and pushed into an event queue, so waiting for the button
+    costs no CPU and works from both threads and asyncio code. Releases
+    are rare and read from the pin level (see wait_for_off).
     """
 
-    def __init__(self, pin=24):
+    def __init__(self, pin=24, bouncetime=BOUNCE_MS):
 
         self.pin = pin
+        self.bouncetime = bouncetime
+
+        self._presses = queue.Queue()
+
+        self._async_waiters = []
+        self._lock = threading.Lock()
 
         GPIO.setwarnings(False)
         GPIO.setmode(GPIO.BCM)
@@ -32,52 +57,151 @@ class IgnitionSwitch:
         # Internal pull-up resistor
         GPIO.setup(self.pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
 
+        try:
+            GPIO.add_event_detect(
+                self.pin,
+                GPIO.FALLING,
+                callback=self._on_edge,
+                bouncetime=self.bouncetime
+            )
+            self.edge_events = True
+
+        except Exception as e:
+            print(f"⚠️ Button edge detection unavailable ({e}), using wait_for_edge")
+            self.edge_events = False
+
         print(f"🔧 Ignition button initialized on GPIO {self.pin}")
 
 
-    def wait_for_on(self):
+    def _on_edge(self, channel):
+        """
+        GPIO interrupt callback (runs on the GPIO event thread).
 
-        print("🔑 Waiting for ignition button press...")
+        Only falling edges are detected, so every call is a press. The pin
+        is not re-read: contact bounce may already show HIGH again.
+        """
 
+        ts = time.monotonic()
+
+        self._presses.put(ts)
+
+        with self._lock:
+            waiters = list(self._async_waiters)
+
+        for loop, presses in waiters:
+            loop.call_soon_threadsafe(presses.put_nowait, ts)
+
+
+    def _drain(self):
+
+        # Presses made while nobody was waiting must not start a session
         while True:
+            try:
+                self._presses.get_nowait()
+            except queue.Empty:
+                return
 
-            if GPIO.input(self.pin) == GPIO.LOW:
 
-                print("🔑 Button pressed")
+    def wait_for_on(self, timeout=None):
+        """
+        Block (without polling) until the button is pressed.
+
+        Returns:
+            True on press, False on timeout (seconds)
+        """
 
-                # debounce delay
-                time.sleep(0.4)
+        print("🔑 Waiting for ignition button press...")
+
+        if not self.edge_events:
 
-                # wait until button released
-                while GPIO.input(self.pin) == GPIO.LOW:
-                    time.sleep(0.05)
+            channel = GPIO.wait_for_edge(
+                self.pin,
+                GPIO.FALLING,
+                bouncetime=self.bouncetime,
+                timeout=None if timeout is None else int(timeout * 1000)
+            )
 
-                # extra debounce
-                time.sleep(0.3)
+            if channel is None:
+                return False
 
-                return True
+            print("🔑 Button pressed")
+            return True
 
+        self._drain()
 
-    def wait_for_off(self):
+        try:
+            ts = self._presses.get(timeout=timeout)
+        except queue.Empty:
+            return False
+
+        latency_ms = (time.monotonic() - ts) * 1000
+
+        print(f"🔑 Button pressed ({latency_ms:.2f} ms)")
+
+        return True
+
+
+    async def wait_for_on_async(self):
+        """
+        asyncio version of wait_for_on: awaits the next press.
+        """
+
+        if not self.edge_events:
+            return await asyncio.get_running_loop().run_in_executor(None, self.wait_for_on)
+
+        print("🔑 Waiting for ignition button press...")
+
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+
+        with self._lock:
+            self._async_waiters.append(entry)
+
+        try:
+            await entry[1].get()
+        finally:
+            with self._lock:
+                self._async_waiters.remove(entry)
+
+        print("🔑 Button pressed")
+
+        return True
+
+
+    def wait_for_off(self, timeout=None):
         """
-        Wait until button released
+        Wait until button released: the pin has to read HIGH for
+        RELEASE_HOLD_SEC, so a bounce during the press is not a release.
+
+        Returns:
+            True on release, False on timeout (seconds)
         """
 
         print("⏹ Waiting for button release...")
 
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        high_since = None
+
         while True:
 
-            state = GPIO.input(self.pin)
+            now = time.monotonic()
 
-            if state == GPIO.HIGH:
-                print("⏹ Button released")
+            if GPIO.input(self.pin) == GPIO.HIGH:
 
-                time.sleep(1)
+                if high_since is None:
+                    high_since = now
 
-                if GPIO.input(self.pin) == GPIO.HIGH:
+                if now - high_since >= RELEASE_HOLD_SEC:
+                    print("⏹ Button released")
                     return True
 
-            time.sleep(0.05)
+            else:
+                high_since = None
+
+            if deadline is not None and now >= deadline:
+                return False
+
+            time.sleep(RELEASE_POLL_SEC)
 
 
     def cleanup(self):
@@ -86,7 +210,10 @@ class IgnitionSwitch:
         """
 
         try:
+            if self.edge_events:
+                GPIO.remove_event_detect(self.pin)
+
             GPIO.cleanup(self.pin)
             print("🧹 Ignition switch GPIO cleaned")
         except:
-            pass
\ No newline at end of file
+            pass
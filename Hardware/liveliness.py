@@ -1,118 +1,533 @@
+import threading
+import time
+from collections import deque
+
 import cv2
 import dlib
 import numpy as np
-from scipy.spatial import distance as dist
+
+from tracing import span
 
 # ---------------- PARAMETERS ----------------
 
-# Blink detection threshold
+# Blink threshold reported until the driver's baseline is known
 EYE_AR_THRESH = 0.23
 
-# Frames eye must stay closed
-EYE_AR_CONSEC_FRAMES = 3
+# Eye must stay closed at least this long, measured from the first to
+# the last closed frame's timestamp (ms). The old 3-frame rule at 30 fps
+# spans 67 ms; a single low-EAR frame spans 0 ms at any frame rate
+MIN_CLOSED_MS = 60
+
+# ---------------- ADAPTIVE BASELINE ----------------
+
+# EAR samples collected (no blink decisions) before the baseline is used
+BASELINE_FRAMES = 15
+
+# Most recent open-eye samples the baseline is computed over
+BASELINE_WINDOW = 90
+
+# Closed = EAR below baseline median by this fraction ...
+BLINK_DROP = 0.25
+
+# ... or by this many robust standard deviations (1.4826 * MAD), if larger
+MAD_K = 3.0
+
+# A noisy calibration (large MAD) never pushes the threshold below this
+# EAR, which a closed eye still reaches
+EYE_AR_THRESH_MIN = 0.12
 
 # Minimum frames to process
 MIN_FRAMES = 15
 
+# Blinks needed to pass; the check returns as soon as they are seen
+REQUIRED_BLINKS = 1
+
+# Give up after this many seconds of processing (None: until the stream ends)
+MAX_DURATION_SEC = 7.0
+
+# ---------------- TRACKING ----------------
+
+# Full-frame HOG detection every N frames (or when the face is lost);
+# frames in between only propagate the face box
+DETECT_EVERY = 10
+
+# "landmarks": next box = previous frame's landmark bounds (free)
+# "correlation": dlib.correlation_tracker (robust to fast motion)
+# None: detect on every frame
+TRACK_MODE = "landmarks"
+
+# Correlation tracker peak-to-sidelobe ratio below which the face is lost
+TRACK_MIN_QUALITY = 7.0
+
+# Landmark bounds are padded by this fraction to give the predictor context
+LANDMARK_BOX_PAD = 0.15
+
+# A tracked box changing area by more than this factor counts as lost
+MAX_AREA_CHANGE = 1.8
+
 
 # ---------------- LOAD MODELS ----------------
 
-try:
-    detector = dlib.get_frontal_face_detector()
-    predictor = dlib.shape_predictor("shape_predictor_68_face_landmarks.dat")
-    MODEL_READY = True
-except Exception as e:
-    print(f"⚠️ Liveness model load error: {e}")
-    detector = None
-    predictor = None
-    MODEL_READY = False
+PREDICTOR_PATH = "shape_predictor_68_face_landmarks.dat"
+
+# Loaded on first use (or by warm_up() at startup), not at import
+detector = None
+predictor = None
+MODEL_READY = False
+
+_model_lock = threading.Lock()
+_model_loaded = False
+
+
+def load_models():
+    """
+    Load the dlib HOG detector and 68-landmark predictor once.
+
+    Returns:
+        True if the models are ready
+    """
+
+    global detector, predictor, MODEL_READY, _model_loaded
+
+    with _model_lock:
+
+        if _model_loaded:
+            return MODEL_READY
+
+        try:
+            detector = dlib.get_frontal_face_detector()
+            predictor = dlib.shape_predictor(PREDICTOR_PATH)
+            MODEL_READY = True
+        except Exception as e:
+            print(f"⚠️ Liveness model load error: {e}")
+            detector = None
+            predictor = None
+            MODEL_READY = False
+
+        _model_loaded = True
+
+        return MODEL_READY
+
+
+def warm_up():
+    """
+    Load the models and run each once on a blank frame, so the first
+    real liveness frame does not pay for lazy initialisation.
+    """
+
+    if not load_models():
+        return
+
+    gray = np.zeros((480, 640), dtype=np.uint8)
+
+    detector(gray, 0)
+    predictor(gray, dlib.rectangle(200, 120, 440, 360))
 
 
 # Landmark indexes
 (lStart, lEnd) = (42, 48)
 (rStart, rEnd) = (36, 42)
 
+# Fast path: only these landmarks are read from dlib. The 12 eye points
+# (right eye, then left) come first, then the face extremes (jaw sides,
+# chin, brow tops) whose bounds match the full 68-point bounds
+EYE_POINTS = tuple(range(rStart, rEnd)) + tuple(range(lStart, lEnd))
+BOUND_POINTS = (0, 16, 8, 19, 24)
+FAST_POINTS = EYE_POINTS + BOUND_POINTS
+
+
+def read_points(shape, out, indexes=FAST_POINTS):
+    """
+    Copy selected landmarks of a dlib full_object_detection into the
+    preallocated int32 array `out` (len(indexes), 2).
+    """
+
+    for row, i in enumerate(indexes):
+
+        p = shape.part(i)
+
+        out[row, 0] = p.x
+        out[row, 1] = p.y
+
+    return out
+
 
 # ---------------- EYE ASPECT RATIO ----------------
 
+# Per eye: vertical pairs (1, 5), (2, 4) and the horizontal pair (0, 3)
+_EAR_FROM = np.array([1, 2, 0])
+_EAR_TO = np.array([5, 4, 3])
+
+
 def eye_aspect_ratio(eye):
+    """EAR of one eye from its 6 landmarks ((6, 2) array)."""
+
+    return float(ear_batch(np.asarray(eye).reshape(6, 2)))
+
+
+def ear_batch(eyes):
+    """
+    Mean EAR over the eyes, vectorised.
+
+    Args:
+        eyes: (..., 12, 2) eye points in EYE_POINTS order, e.g. one
+              frame (12, 2) or a replay batch (frames, 12, 2)
+
+    Returns:
+        (...) array of EAR values (mean of both eyes)
+    """
+
+    p = np.asarray(eyes, dtype=np.float32)
+
+    p = p.reshape(p.shape[:-2] + (-1, 6, 2))
+
+    # |p1-p5|, |p2-p4|, |p0-p3| for every eye at once
+    d = p[..., _EAR_FROM, :] - p[..., _EAR_TO, :]
+    d = np.sqrt((d * d).sum(axis=-1))
+
+    ear = (d[..., 0] + d[..., 1]) / (2.0 * d[..., 2])
+
+    return ear.mean(axis=-1)
+
+
+# ---------------- FACE TRACKING ----------------
+
+class FaceTracker:
+    """
+    Detect-then-track: HOG runs on the full frame every `detect_every`
+    frames or after a loss, and the face box is propagated in between.
+    Follows one face (the largest detection: the driver).
+    """
+
+    def __init__(self, detect_every=DETECT_EVERY, mode=TRACK_MODE):
+
+        self.detect_every = detect_every if mode else 1
+        self.mode = mode
+
+        self.rect = None
+        self.since_detect = 0
+
+        self.detections = 0
+        self.losses = 0
+
+        self._correlation = None
+
+    def _detect(self, gray):
+
+        # Frames since the last detection, counting this one
+        self.since_detect = 1
+        self.detections += 1
+
+        with span("liveness.detect"):
+            rects = detector(gray, 0)
+
+        if len(rects) == 0:
+            self.rect = None
+            return None
+
+        self.rect = max(rects, key=lambda r: r.area())
+
+        if self.mode == "correlation":
+
+            self._correlation = dlib.correlation_tracker()
+            self._correlation.start_track(gray, self.rect)
+
+        return self.rect
+
+    def _lost(self):
 
-    A = dist.euclidean(eye[1], eye[5])
-    B = dist.euclidean(eye[2], eye[4])
-    C = dist.euclidean(eye[0], eye[3])
+        self.losses += 1
+        self.rect = None
 
-    ear = (A + B) / (2.0 * C)
+    def locate(self, gray):
+        """
+        Returns:
+            dlib.rectangle of the face in this frame, or None
+        """
 
-    return ear
+        if self.rect is None or self.since_detect >= self.detect_every:
+            return self._detect(gray)
+
+        self.since_detect += 1
+
+        if self.mode == "correlation":
+
+            with span("liveness.track"):
+                quality = self._correlation.update(gray)
+
+            if quality < TRACK_MIN_QUALITY:
+                self._lost()
+                return self._detect(gray)
+
+            p = self._correlation.get_position()
+
+            self.rect = dlib.rectangle(
+                int(p.left()), int(p.top()), int(p.right()), int(p.bottom())
+            )
+
+        return self.rect
+
+    def update(self, points, frame_shape):
+        """
+        Feed back this frame's landmarks ((n, 2) array whose bounds are
+        the face bounds, e.g. FAST_POINTS); in "landmarks" mode their
+        padded bounds become the next frame's box.
+        """
+
+        if self.mode != "landmarks" or self.rect is None:
+            return
+
+        h, w = frame_shape[:2]
+
+        left, top = points.min(axis=0)
+        right, bottom = points.max(axis=0)
+
+        pad_x = (right - left) * LANDMARK_BOX_PAD
+        pad_y = (bottom - top) * LANDMARK_BOX_PAD
+
+        rect = dlib.rectangle(
+            int(max(0, left - pad_x)),
+            int(max(0, top - pad_y)),
+            int(min(w - 1, right + pad_x)),
+            int(min(h - 1, bottom + pad_y))
+        )
+
+        # Landmarks fitted off the face collapse or blow up the box
+        change = (rect.area() + 1) / (self.rect.area() + 1)
+
+        if rect.area() == 0 or not 1 / MAX_AREA_CHANGE <= change <= MAX_AREA_CHANGE:
+            self._lost()
+            return
+
+        self.rect = rect
+
+
+# ---------------- BLINK DETECTOR ----------------
+
+class BlinkDetector:
+    """
+    Blink counting against the driver's own open-eye EAR.
+
+    The first BASELINE_FRAMES samples calibrate a running median / MAD,
+    which is then kept up to date with open-eye samples; a frame counts as
+    closed when EAR drops below the median by BLINK_DROP (relative) or
+    MAD_K robust deviations, whichever is larger, but not below
+    EYE_AR_THRESH_MIN. Narrow eyes or glasses
+    shift the baseline instead of failing a fixed threshold. A blink is
+    a closed run whose first and last closed frames are at least
+    min_closed_ms apart (frame timestamps): it takes two or more closed
+    frames whatever the camera frame rate.
+    """
+
+    def __init__(self, min_closed_ms=MIN_CLOSED_MS, baseline_frames=BASELINE_FRAMES,
+                 drop=BLINK_DROP, mad_k=MAD_K):
+
+        self.min_closed_ms = min_closed_ms
+        self.baseline_frames = baseline_frames
+        self.drop = drop
+        self.mad_k = mad_k
+
+        self.blinks = 0
+
+        self._open = deque(maxlen=BASELINE_WINDOW)
+        self._closed_since = None
+        self._closed_last = None
+
+    def baseline(self):
+        """
+        Returns:
+            (median, robust std) of open-eye EAR, or None while calibrating
+        """
+
+        if len(self._open) < self.baseline_frames:
+            return None
+
+        samples = np.fromiter(self._open, dtype=np.float32)
+
+        median = float(np.median(samples))
+
+        return median, 1.4826 * float(np.median(np.abs(samples - median)))
+
+    def threshold(self):
+        """Current closed-eye EAR threshold (EYE_AR_THRESH while calibrating)."""
+
+        baseline = self.baseline()
+
+        if baseline is None:
+            return EYE_AR_THRESH
+
+        median, sigma = baseline
+
+        # The floor stays below the relative drop, so a very narrow eye's
+        # open samples are never all read as closed
+        floor = min(EYE_AR_THRESH_MIN, (1.0 - self.drop) * median)
+
+        return max(floor, median - max(self.drop * median, self.mad_k * sigma))
+
+    def update(self, ear, ts):
+        """
+        Feed one frame's EAR at time ts (seconds).
+
+        Returns:
+            True when this frame completes a blink
+        """
+
+        if self.baseline() is None:
+
+            # Calibrating: every sample counts (the median shrugs off a
+            # blink), no decision yet - a fixed threshold would read
+            # narrow eyes as closed
+            self._open.append(ear)
+
+            return False
+
+        if ear < self.threshold():
+
+            if self._closed_since is None:
+                self._closed_since = ts
+
+            self._closed_last = ts
+
+            return False
+
+        # Eye open: the closed run (if any) ended at the previous frame
+        closed_ms = None
+
+        if self._closed_since is not None:
+            closed_ms = (self._closed_last - self._closed_since) * 1000.0
+
+        self._closed_since = None
+        self._closed_last = None
+
+        self._open.append(ear)
+
+        if closed_ms is not None and closed_ms >= self.min_closed_ms:
+            self.blinks += 1
+            return True
+
+        return False
 
 
 # ---------------- LIVENESS CHECK ----------------
 
-def check_blink_from_frames(frame_stream):
+def _close(stream):
+
+    close = getattr(stream, "close", None)
+
+    if close is not None:
+        close()
 
-    if not MODEL_READY:
+
+def check_blink_from_frames(frame_stream, required_blinks=REQUIRED_BLINKS,
+                            max_duration=MAX_DURATION_SEC, min_frames=MIN_FRAMES,
+                            detect_every=DETECT_EVERY, track_mode=TRACK_MODE):
+    """
+    Count blinks over a stream of BGR or grey (2-D) frames, incrementally.
+    Grey frames, e.g. Camera.get_frame_stream(luma=True), are used as they
+    are with no colour conversion.
+
+    Items are frames or (timestamp, frame) tuples (Camera.get_frame_stream
+    with_timestamps=True); bare frames are timestamped on arrival.
+    Blinks are judged against the driver's adaptive EAR baseline (see
+    BlinkDetector).
+
+    Returns as soon as `required_blinks` blinks are confirmed (after at
+    least `min_frames` frames with a face) and closes the stream, so the
+    camera is released at the driver's blink latency instead of after a
+    fixed duration. Stops unsuccessfully after `max_duration` seconds.
+
+    The face is detected every `detect_every` frames and tracked in
+    between (see FaceTracker), so most frames only cost the landmark
+    predictor and the stream can run at the sensor frame rate.
+
+    Returns:
+        True if at least `required_blinks` blinks were seen
+    """
+
+    if not load_models():
+        _close(frame_stream)
         print("⚠️ Liveness check unavailable (model not loaded)")
         return False
 
-    blink_counter = 0
-    total_blinks = 0
+    blinks = BlinkDetector()
     face_detected = False
 
     frame_count = 0
 
-    for frame in frame_stream:
+    tracker = FaceTracker(detect_every, track_mode)
 
-        frame_count += 1
+    # Reused every frame: eye points first, then the face bounds
+    points = np.empty((len(FAST_POINTS), 2), dtype=np.int32)
+    eyes = points[:len(EYE_POINTS)]
 
-        try:
+    start = time.monotonic()
 
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    try:
 
-            rects = detector(gray, 0)
+        for item in frame_stream:
 
-            if len(rects) > 0:
-                face_detected = True
+            if isinstance(item, tuple):
+                ts, frame = item
+            else:
+                ts, frame = time.monotonic(), item
 
-            for rect in rects:
+            frame_count += 1
 
-                shape = predictor(gray, rect)
+            try:
 
-                shape = np.array([[p.x, p.y] for p in shape.parts()])
+                if frame.ndim == 2:
+                    gray = frame
+                else:
+                    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
 
-                leftEye = shape[lStart:lEnd]
-                rightEye = shape[rStart:rEnd]
+                rect = tracker.locate(gray)
 
-                leftEAR = eye_aspect_ratio(leftEye)
-                rightEAR = eye_aspect_ratio(rightEye)
+                rects = [] if rect is None else [rect]
 
-                ear = (leftEAR + rightEAR) / 2.0
+                if len(rects) > 0:
+                    face_detected = True
 
-                # Debug EAR value
-                # print(f"EAR: {ear:.3f}")
+                for rect in rects:
 
-                if ear < EYE_AR_THRESH:
+                    with span("liveness.landmarks"):
+                        shape = predictor(gray, rect)
 
-                    blink_counter += 1
+                    read_points(shape, points)
 
-                else:
+                    tracker.update(points, gray.shape)
 
-                    if blink_counter >= EYE_AR_CONSEC_FRAMES:
+                    ear = float(ear_batch(eyes))
 
-                        total_blinks += 1
+                    # Debug EAR value
+                    # print(f"EAR: {ear:.3f}")
 
-                        print(f"👁️ Blink detected! Total: {total_blinks}")
+                    if blinks.update(ear, ts):
+                        print(f"👁️ Blink detected! Total: {blinks.blinks}")
 
-                    blink_counter = 0
+            except Exception as e:
 
-        except Exception as e:
+                print(f"⚠️ Liveness frame error: {e}")
+
+                continue
+
+            # ---------------- EARLY EXIT ----------------
+            if blinks.blinks >= required_blinks and frame_count >= min_frames:
+                break
 
-            print(f"⚠️ Liveness frame error: {e}")
+            if max_duration is not None and time.monotonic() - start >= max_duration:
+                print(f"⏱ Liveness time budget ({max_duration:.1f}s) used up")
+                break
 
-            continue
+    finally:
+
+        # Stops the generator chain (frees the camera for other stages)
+        _close(frame_stream)
+
+    elapsed = time.monotonic() - start
 
     # ---------------- FINAL VALIDATION ----------------
 
-    if frame_count < MIN_FRAMES:
+    if frame_count < min_frames:
         print("⚠️ Not enough frames for liveness check")
         return False
 
@@ -120,6 +535,14 @@ def check_blink_from_frames(frame_stream):
         print("⚠️ No face detected during liveness check")
         return False
 
-    print(f"👁️ Total blinks detected: {total_blinks}")
+    baseline = blinks.baseline()
+
+    print(
+        f"👁️ Total blinks detected: {blinks.blinks} in {elapsed:.1f}s "
+        f"({frame_count} frames, {tracker.detections} detections)"
+    )
+
+    if baseline is not None:
+        print(f"👁️ EAR baseline {baseline[0]:.3f}, blink threshold {blinks.threshold():.3f}")
 
-    return total_blinks >= 1
\ No newline at end of file
+    return blinks.blinks >= required_blinks
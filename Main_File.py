@@ -1,24 +1,28 @@
 # Main_File.py
 
+import argparse
 import os
 import threading
 import time
 from datetime import datetime
+
 import numpy as np
 
+from face_cache import FaceCache, TTLPolicy
+from license_store import LicenseStore, card_hash
 from session_logger import SessionLogger
+from pipeline import StageScheduler, StageCancelled, countdown, until_cancelled
+from tracing import start_trace, stop_trace
+from startup import StartupManager
 
-# Hardware imports
-from Hardware.cam import Camera
-from Hardware.liveliness import check_blink_from_frames
-from Hardware.alcohol_sensor import AlcoholSensor
+# Hardware imports (GPIO only - cheap)
+from Hardware.alcohol_sensor import AlcoholSensor, WINDOW_SEC as ALCOHOL_WINDOW_SEC
 from Hardware.ignition_control import IgnitionController
 from Hardware.ignition_switch import IgnitionSwitch
 
-# AI modules
-from ocr_test import process_document
-from face_match import match_faces, load_and_encode
-from license_api import verify_license
+# AI modules (cv2, dlib, face_recognition, pytesseract) are imported and
+# their models warmed in the background while waiting for the button
+AI_MODULES = ("ocr_test", "face_match", "Hardware.liveliness", "license_api")
 
 
 BASE_DIR = "data/sessions"
@@ -26,60 +30,63 @@ BASE_DIR = "data/sessions"
 FACE_CAPTURE_RETRIES = 2
 OCR_RETRIES = 2
 
-alcohol_sensor = None
+# Rolling alcohol window re-evaluated this often until the other checks end
+ALCOHOL_RECHECK_SEC = 0.25
 
+PIPELINE_WORKERS = 4
 
-# ---------- FACE CACHE ----------
-_face_cache_path = os.path.join(BASE_DIR, "face_cache.npy")
-_previous_face_encodings = None
+# Abort the whole session on the first failed mandatory check
+FAIL_FAST = True
 
+# Verify the driver from frames sampled during liveness instead of a
+# separate still: no face capture countdown, one batched encoding call
+FACE_FROM_STREAM = False
+FACE_STREAM_FRAMES = 8
+FACE_STREAM_EVERY = 5
 
-def _load_face_cache():
-
-    global _previous_face_encodings
-
-    try:
-        if os.path.exists(_face_cache_path):
+# Stages whose result feeds final_decision (also their session log names)
+CHECK_STAGES = ("ocr", "face_match", "liveness", "license_api", "alcohol")
 
-            data = np.load(_face_cache_path)
-
-            if data.ndim == 1:
-                data = data.reshape(1, -1)
-
-            _previous_face_encodings = data
-        else:
-            _previous_face_encodings = None
+alcohol_sensor = None
 
-    except Exception:
-        _previous_face_encodings = None
 
+# ---------- FACE CACHE ----------
+# Large enough for a fleet depot; lookups go through an ANN index
+FACE_CACHE_MAX_ENTRIES = 50000
+FACE_MATCH_THRESHOLD = 0.6
 
-def _save_face_cache(enc, max_entries=50, distance_threshold=0.6):
+# Drivers not seen for this long are dropped; when full, least recently
+# seen drivers go first
+FACE_CACHE_TTL_SEC = 180 * 24 * 3600
 
-    global _previous_face_encodings
+# Append-only memory-mapped file; the old .npy is migrated on first load
+face_cache = FaceCache(
+    os.path.join(BASE_DIR, "face_cache.bin"),
+    max_entries=FACE_CACHE_MAX_ENTRIES,
+    eviction=TTLPolicy(FACE_CACHE_TTL_SEC),
+    legacy_path=os.path.join(BASE_DIR, "face_cache.npy")
+)
 
-    try:
 
-        if _previous_face_encodings is None:
-            arr = np.array([enc])
+# License portrait encodings, keyed by LicenseNumber + card hash
+license_store = LicenseStore(os.path.join(BASE_DIR, "license_cache"))
 
-        else:
 
-            dists = np.linalg.norm(_previous_face_encodings - enc, axis=1)
+def _load_face_cache():
 
-            if np.any(dists <= distance_threshold):
-                return
+    face_cache.load()
 
-            arr = np.vstack([_previous_face_encodings, enc])
+    print(f"♻️ Face cache: {len(face_cache)} known drivers")
 
-        if arr.shape[0] > max_entries:
-            arr = arr[-max_entries:]
 
-        os.makedirs(BASE_DIR, exist_ok=True)
+def _save_face_cache(enc, driver_id=None):
 
-        np.save(_face_cache_path, arr)
+    # Known drivers (same licence or a cache hit) move towards their
+    # centroid so repeat drivers keep hitting; new ones are appended.
+    # Durable on return (write + fsync of one record)
+    try:
 
-        _previous_face_encodings = arr
+        face_cache.add(enc, driver_id=driver_id, dedup_threshold=FACE_MATCH_THRESHOLD)
 
     except Exception as e:
         print("⚠️ Face cache save error:", e)
@@ -103,68 +110,86 @@ def create_session():
     }
 
 
-# ---------- ALCOHOL SENSOR THREAD ----------
+# ---------- ALCOHOL SENSOR WARM-UP ----------
 def start_alcohol_sensor():
 
     global alcohol_sensor
 
     alcohol_sensor = AlcoholSensor(pin=17, warmup=False)
 
+    # Returns immediately: heater warm-up is tracked by alcohol_sensor.ready
+    # while D0 is sampled in the background
+    alcohol_sensor.start_warmup()
 
-# ---------- MAIN ----------
-def main():
 
-    print("\n🚗 DriveGuard – Full System Mode\n")
+# ---------- STARTUP ----------
+def open_camera():
 
-    ignition = IgnitionController(
-        relay_pin=25,
-        buzzer_pin=23,
-        green_led=22,
-        red_led=27
-    )
+    from Hardware.cam import Camera
 
-    switch = IgnitionSwitch(pin=24)
+    return Camera()
 
-    alcohol_thread = threading.Thread(target=start_alcohol_sensor)
-    alcohol_thread.start()
 
-    print("🔥 Warming alcohol sensor while waiting for button...")
+def preload(startup):
+    """
+    Queue camera init and every heavy import / model load on the startup
+    manager's threads; nothing here blocks.
+    """
 
-    cam = Camera()
+    startup.preload("camera", open_camera)
 
-    switch.wait_for_on()
+    for module_name in AI_MODULES:
+        startup.preload_module(module_name)
 
-    try:
 
-        session = create_session()
-        logger = SessionLogger(session["base"])
+# ---------- PIPELINE STAGES ----------
+def build_pipeline(cam, session, logger, startup):
+    """
+    Declare every verification stage and what it consumes.
 
-        ocr_ok = False
-        face_ok = False
-        api_ok = False
-        alcohol_ok = False
-        liveness_ok = False
+    Camera stages (face, license, liveness) share one sensor and are
+    serialised; OCR and face encoding run while liveness frames are still
+    being captured, and the license API fires as soon as OCR returns.
+    """
 
-        _load_face_cache()
+    scheduler = StageScheduler(
+        max_workers=PIPELINE_WORKERS,
+        fail_fast=FAIL_FAST
+    )
 
-        # ---------- DRIVER FACE CAPTURE ----------
-        face_capture_success = False
+    cancel = scheduler.cancel_event
 
-        for attempt in range(FACE_CAPTURE_RETRIES + 1):
+    started = time.monotonic()
 
-            try:
+    cam_lock = threading.Lock()
 
-                print("\n📸 Driver face capture starting...")
-                print("➡️ Please look directly at the camera")
+    # Captured BGR frames, so face_match never re-decodes the JPEGs
+    frames = {}
 
-                for i in range(5,0,-1):
-                    print(f"📷 Capturing face in {i} sec")
-                    time.sleep(1)
+    # License frame + card OCR finally read, set by run_ocr: face_match
+    # must use the same card that OCR and the license API checked
+    license_final = {}
 
-                cam.capture_stable_image(session["face_img"])
+    def capture(key):
 
-                face_capture_success = True
-                break
+        path, frames[key] = cam.capture_stable_image(session[key], return_frame=True)
+
+        return path
+
+    # ---------- DRIVER FACE CAPTURE ----------
+    def capture_face():
+
+        for attempt in range(FACE_CAPTURE_RETRIES + 1):
+
+            print("\n📸 Driver face capture starting...")
+            print("➡️ Please look directly at the camera")
+
+            countdown("📷 Capturing face in {} sec", 5, cancel)
+
+            try:
+
+                with cam_lock:
+                    return capture("face_img")
 
             except Exception as e:
 
@@ -173,36 +198,28 @@ def main():
                 if attempt < FACE_CAPTURE_RETRIES:
                     print("🔁 Retrying face capture...\n")
 
-        if not face_capture_success:
+        print("❌ Face capture failed")
 
-            print("❌ Face capture failed")
+        logger.log_error("camera_face_capture", "failed")
 
-            logger.log_error("camera_face_capture", "failed")
-
-            cam.close()
-            ignition.block_ignition()
-            return
+        raise RuntimeError("Face capture failed")
 
-        # ---------- LICENSE CAPTURE ----------
-        license_capture_success = False
+    # ---------- LICENSE CAPTURE ----------
+    def capture_license():
 
         for attempt in range(OCR_RETRIES + 1):
 
-            try:
-
-                print("\n📄 Please place your driving license in front of the camera")
-                print("➡️ Keep license flat")
-                print("➡️ Fill most of the camera frame")
-                print("➡️ Avoid glare")
+            print("\n📄 Please place your driving license in front of the camera")
+            print("➡️ Keep license flat")
+            print("➡️ Fill most of the camera frame")
+            print("➡️ Avoid glare")
 
-                for i in range(7,0,-1):
-                    print(f"📄 Capturing license in {i} sec")
-                    time.sleep(1)
+            countdown("📄 Capturing license in {} sec", 7, cancel)
 
-                cam.capture_stable_image(session["license_img"])
+            try:
 
-                license_capture_success = True
-                break
+                with cam_lock:
+                    return capture("license_img")
 
             except Exception as e:
 
@@ -211,27 +228,48 @@ def main():
                 if attempt < OCR_RETRIES:
                     print("🔁 Retrying license capture...\n")
 
-        if not license_capture_success:
+        print("❌ License capture failed")
 
-            print("❌ License capture failed")
+        logger.log_error("camera_license_capture", "failed")
 
-            logger.log_error("camera_license_capture", "failed")
+        raise RuntimeError("License capture failed")
 
-            cam.close()
-            ignition.block_ignition()
-            return
+    # ---------- LICENSE CARD ----------
+    def locate_card(license_img):
+
+        # Located once; OCR crops the card and face_match the portrait
+        frame = frames.get("license_img")
+
+        if frame is None:
+            return None
+
+        try:
+
+            return startup.get("ocr_test").locate_license(frame)
+
+        except Exception as e:
+
+            # Not fatal: OCR and face_match fall back to the full image
+            logger.log_error("license_card", e)
+
+            return None
+
+    # ---------- OCR ----------
+    def run_ocr(license_img, card):
 
-        # ---------- OCR ----------
         print("\n📄 Running OCR on license...")
 
         license_data = None
 
+        ocr = startup.get("ocr_test")
+
         for attempt in range(OCR_RETRIES + 1):
 
-            license_data = process_document(
-                session["license_img"],
+            license_data = ocr.process_document(
+                license_img,
                 "DRIVING LICENSE",
-                session["ocr_txt"]
+                session["ocr_txt"],
+                card=card
             )
 
             if license_data is not None:
@@ -241,57 +279,140 @@ def main():
 
                 print("🔁 OCR failed. Please reposition license.")
 
-                for i in range(5,0,-1):
-                    print(f"📄 Re-capturing license in {i}")
-                    time.sleep(1)
+                countdown("📄 Re-capturing license in {}", 5, cancel)
+
+                # waits for liveness to release the camera
+                with cam_lock:
+                    capture("license_img")
+
+                # New photo: the card from the old frame no longer applies
+                card = locate_card(license_img)
+
+        license_final["frame"] = frames.get("license_img")
+        license_final["card"] = card
+
+        logger.log_check("ocr", license_data is not None)
+
+        return license_data
+
+    # ---------- FACE ENCODING ----------
+    def encode_face(face_img):
+
+        print("\n🧠 Encoding driver face...")
+
+        return startup.get("face_match").load_and_encode(
+            frames.get("face_img", face_img),
+            bgr="face_img" in frames
+        )
+
+    # ---------- FACE ENCODING (LIVENESS FRAMES) ----------
+    sampled = []
+    stream_encodings = []
+
+    def sample_frames(stream):
+
+        try:
+
+            for i, item in enumerate(stream):
 
-                cam.capture_stable_image(session["license_img"])
+                # (timestamp, frame); frames are ring-buffer views: keep copies
+                if i % FACE_STREAM_EVERY == 0 and len(sampled) < FACE_STREAM_FRAMES:
+                    sampled.append(item[1].copy())
 
-        ocr_ok = license_data is not None
+                yield item
 
-        logger.log_check("ocr", ocr_ok)
+        finally:
+            stream.close()
+
+    def encode_stream_faces():
+
+        print(f"\n🧠 Encoding driver face from {len(sampled)} liveness frames...")
+
+        encodings = startup.get("face_match").encode_frames(sampled, bgr=True)
+
+        stream_encodings.extend(e for e in encodings if e is not None)
+
+        if not stream_encodings:
+            return None
+
+        # Per-dimension median: the driver's template for the face cache
+        return np.median(np.array(stream_encodings), axis=0)
+
+    # ---------- FACE MATCH ----------
+    def run_face_match(current_encoding, license_data):
 
-        # ---------- FACE MATCH ----------
         print("\n🧠 Performing face verification...")
 
-        current_encoding = load_and_encode(session["face_img"])
+        # The license as OCR last read it (after any re-capture)
+        frame = license_final.get("frame")
+        card = license_final.get("card")
+
+        face_ok = False
 
         if current_encoding is None:
 
             print("❌ Driver face encoding failed")
-            face_ok = False
 
         else:
 
-            face_cached = False
+            number = (license_data or {}).get("LicenseNumber")
+
+            face_cached, _, row = face_cache.match(
+                current_encoding,
+                FACE_MATCH_THRESHOLD
+            )
 
-            if _previous_face_encodings is not None:
+            # A cached face only vouches for the licence it was enrolled with
+            if face_cached and (
+                not number or face_cache.metadata(row)["driver_id"] != str(number)
+            ):
 
-                dists = np.linalg.norm(
-                    _previous_face_encodings - current_encoding,
-                    axis=1
-                )
+                print("⚠️ Cached face not enrolled under this licence, checking the card")
 
-                min_dist = float(np.min(dists))
+                face_cached = False
 
-                if min_dist <= 0.6:
+            if face_cached:
 
-                    face_cached = True
-                    face_ok = True
+                face_ok = True
 
-                    print("♻️ Cached face recognized")
+                print("♻️ Cached face recognized")
 
             if not face_cached:
 
                 try:
 
-                    face_result = match_faces(
-                        session["license_img"],
-                        session["face_img"]
+                    image_hash = card_hash(frame, card) if frame is not None else None
+
+                    # Returning license: portrait encoding comes from the store
+                    known = license_store.lookup(number, image_hash) if image_hash is not None else None
+
+                    if known is not None:
+                        print("♻️ Known license, reusing portrait encoding")
+
+                    # Driver face is already encoded: only the license
+                    # portrait goes through detection + encoding. From the
+                    # stream every frame's distance counts (median)
+                    face_result = startup.get("face_match").match_faces(
+                        frame if frame is not None else session["license_img"],
+                        user_encoding=(
+                            np.array(stream_encodings) if stream_encodings
+                            else current_encoding
+                        ),
+                        license_encoding=known["encoding"] if known else None,
+                        bgr=frame is not None,
+                        license_card=card
                     )
 
                     face_ok = face_result.get("match", False)
 
+                    if image_hash is not None:
+                        license_store.put(
+                            number,
+                            image_hash,
+                            face_result.get("license_encoding"),
+                            {"match": bool(face_ok), "distance": face_result.get("distance")}
+                        )
+
                 except Exception as e:
 
                     logger.log_error("face_match", e)
@@ -300,22 +421,46 @@ def main():
 
         logger.log_check("face_match", face_ok)
 
-        # ---------- LIVENESS ----------
+        return face_ok
+
+    # ---------- LIVENESS ----------
+    def run_liveness():
+
         try:
 
             print("\n👁️ Liveness check starting...")
             print("➡️ Blink once when prompted")
 
-            for i in range(3,0,-1):
-                print(f"👁️ Blink detection starting in {i}")
-                time.sleep(1)
+            liveliness = startup.get("Hardware.liveliness")
+
+            countdown("👁️ Blink detection starting in {}", 3, cancel)
+
+            with cam_lock:
+
+                # Upper bound only: the check returns at the first
+                # confirmed blink and closes the stream
+                # Timestamps: the closed-eye rule is in milliseconds
+                # Luma: blink detection only needs the Y plane; face
+                # encoding from the stream needs colour frames
+                frame_stream = until_cancelled(
+                    cam.get_frame_stream(
+                        duration_sec=liveliness.MAX_DURATION_SEC,
+                        with_timestamps=True,
+                        luma=not FACE_FROM_STREAM
+                    ),
+                    cancel
+                )
 
-            frame_stream = cam.get_frame_stream(duration_sec=7)
+                if FACE_FROM_STREAM:
+                    frame_stream = sample_frames(frame_stream)
 
-            liveness_ok = check_blink_from_frames(frame_stream)
+                liveness_ok = liveliness.check_blink_from_frames(frame_stream)
 
             logger.log_check("liveness", liveness_ok)
 
+        except StageCancelled:
+            raise
+
         except Exception as e:
 
             print("⚠️ Liveness error:", e)
@@ -324,14 +469,18 @@ def main():
 
             liveness_ok = False
 
-        cam.close()
+        return liveness_ok
+
+    # ---------- LICENSE API ----------
+    def run_license_api(license_data):
 
-        # ---------- LICENSE API ----------
-        if ocr_ok:
+        api_ok = False
+
+        if license_data is not None:
 
             try:
 
-                api_ok = verify_license(license_data)
+                api_ok = startup.get("license_api").verify_license(license_data)
 
             except Exception as e:
 
@@ -341,18 +490,48 @@ def main():
 
         logger.log_check("license_api", api_ok)
 
-        if ocr_ok and api_ok and face_ok and current_encoding is not None:
+        return api_ok
+
+    # ---------- ALCOHOL CHECK ----------
+    def run_alcohol():
 
-            _save_face_cache(current_encoding)
+        # Only wait for whatever warm-up is actually left
+        eta = alcohol_sensor.time_to_ready()
 
-        # ---------- ALCOHOL CHECK ----------
-        alcohol_thread.join()
+        if eta:
+            print(f"🔥 Alcohol sensor ready in ~{eta:.1f}s")
+
+        while not alcohol_sensor.wait_ready(0.1):
+            if cancel.is_set():
+                raise StageCancelled("Pipeline aborted")
+
+        # One full sampling window with the driver seated
+        remaining = ALCOHOL_WINDOW_SEC - (time.monotonic() - started)
+
+        if remaining > 0 and cancel.wait(remaining):
+            raise StageCancelled("Pipeline aborted")
+
+        others = [name for name in CHECK_STAGES if name != "alcohol"]
 
         try:
 
-            detected, value = alcohol_sensor.is_alcohol_detected()
+            # Keep judging the rolling window until every other check has
+            # finished: the decision is the window ending then, and a driver
+            # who only breathes on the sensor later is still measured.
+            # A positive window denies at once (fail fast)
+            while True:
+
+                detected, value = alcohol_sensor.is_alcohol_detected()
+
+                if detected or scheduler.settled(others):
+                    break
+
+                if cancel.wait(ALCOHOL_RECHECK_SEC):
+                    raise StageCancelled("Pipeline aborted")
 
-            print("\n🍺 Alcohol Sensor Reading:", value)
+            stats = alcohol_sensor.window_stats()
+
+            print("\n🍺 Alcohol Sensor Reading:", value, stats)
 
             if detected:
                 print("🚫 Alcohol detected! Ignition will be blocked.")
@@ -361,7 +540,18 @@ def main():
                 print("✅ No alcohol detected")
                 alcohol_ok = True
 
-            logger.log_check("alcohol", alcohol_ok)
+            logger.log_check(
+                "alcohol",
+                alcohol_ok,
+                {
+                    "sensor_value": value,
+                    "window": stats,
+                    "warmup": alcohol_sensor.readiness()
+                }
+            )
+
+        except StageCancelled:
+            raise
 
         except Exception as e:
 
@@ -371,48 +561,250 @@ def main():
 
             logger.log_error("alcohol", e)
 
-        # ---------- FINAL DECISION ----------
-        final_decision = (
-            ocr_ok
-            and liveness_ok
-            and face_ok
-            and api_ok
-            and alcohol_ok
+        return alcohol_ok
+
+    # alcohol has no inputs: it runs alongside the camera stages and, with
+    # fail-fast, denies a drunk driver as soon as a window reads positive
+    scheduler.add_stage("alcohol", run_alcohol, mandatory=True)
+
+    if FACE_FROM_STREAM:
+
+        scheduler.add_stage("license_img", capture_license, mandatory=True)
+        scheduler.add_stage("face_encoding", encode_stream_faces, after=["liveness"])
+
+    else:
+
+        scheduler.add_stage("face_img", capture_face, mandatory=True)
+        scheduler.add_stage(
+            "license_img",
+            capture_license,
+            after=["face_img"],
+            mandatory=True
         )
+        scheduler.add_stage("face_encoding", encode_face, inputs=["face_img"])
+
+    scheduler.add_stage("license_card", locate_card, inputs=["license_img"])
+    scheduler.add_stage(
+        "ocr",
+        run_ocr,
+        inputs=["license_img", "license_card"],
+        mandatory=True
+    )
+    # After OCR: a failed OCR re-captures the license, and face_match
+    # takes the final frame + card from run_ocr
+    scheduler.add_stage(
+        "face_match",
+        run_face_match,
+        inputs=["face_encoding", "ocr"],
+        mandatory=True
+    )
+    scheduler.add_stage(
+        "liveness",
+        run_liveness,
+        after=["license_img"],
+        mandatory=True
+    )
+    scheduler.add_stage(
+        "license_api",
+        run_license_api,
+        inputs=["ocr"],
+        mandatory=True
+    )
 
-        logger.set_final_decision(final_decision)
+    return scheduler
 
-        logger.write()
 
-        # ---------- IGNITION ----------
-        if final_decision:
+# ---------- SESSION ----------
+def run_session(cam, ignition, startup, close_camera=True):
+    """
+    One button press: a fresh session directory, logger, scheduler and
+    trace; camera, models, HTTP session and face cache are reused.
 
-            ignition.allow_ignition()
+    Returns:
+        final_decision (bool)
+    """
 
-            print("\n✅ IGNITION ENABLED")
+    session = create_session()
+    logger = SessionLogger(session["base"])
 
-        else:
+    start_trace()
+
+    scheduler = build_pipeline(cam, session, logger, startup)
+
+    results = scheduler.run()
+
+    if scheduler.aborted_by is not None:
+
+        # Fail fast: deny before any further bookkeeping (or camera stop)
+        ignition.block_ignition()
 
+    if close_camera:
+        cam.close()
+
+    for name, reason in scheduler.skipped.items():
+
+        if name in CHECK_STAGES:
+            logger.log_skipped(name, reason)
+
+    # Abandoned stages may still be running: their results were not part
+    # of the decision, so they stay out of the log
+    logger.close_checks()
+
+    timing = scheduler.timing_report()
+
+    print(
+        f"\n⏱️ Pipeline: {timing['wall_clock_sec']:.2f}s wall-clock | "
+        f"{timing['critical_path_sec']:.2f}s critical path "
+        f"({' → '.join(timing['critical_path'])})"
+    )
+
+    logger.log_timing(timing)
+
+    ocr_ok = results.get("ocr") is not None
+    face_ok = bool(results.get("face_match", False))
+    api_ok = bool(results.get("license_api", False))
+    alcohol_ok = bool(results.get("alcohol", False))
+    liveness_ok = bool(results.get("liveness", False))
+
+    current_encoding = results.get("face_encoding")
+
+    # ---------- FINAL DECISION ----------
+    final_decision = (
+        ocr_ok
+        and liveness_ok
+        and face_ok
+        and api_ok
+        and alcohol_ok
+    )
+
+    logger.set_final_decision(final_decision)
+
+    # ---------- IGNITION ----------
+    # Actuate before writing the log so the driver never waits on disk
+    if final_decision:
+
+        ignition.allow_ignition()
+
+        print("\n✅ IGNITION ENABLED")
+
+    else:
+
+        if scheduler.aborted_by is None:
             ignition.block_ignition()
 
-            print("\n❌ IGNITION BLOCKED")
+        print("\n❌ IGNITION BLOCKED")
 
-    except KeyboardInterrupt:
+    # Enrol after actuation: an fsync, compaction or index rebuild must
+    # never delay the relay
+    if ocr_ok and api_ok and face_ok and current_encoding is not None:
 
-        print("\n⚠️ Interrupted")
+        _save_face_cache(
+            current_encoding,
+            driver_id=results["ocr"].get("LicenseNumber")
+        )
 
-    except Exception as e:
+    logger.log_spans(stop_trace())
 
-        print("❌ System Error:", e)
+    logger.log_startup(startup.report())
+
+    logger.write()
+
+    return final_decision
 
-        ignition.block_ignition()
+
+# ---------- MAIN ----------
+def main(daemon=False):
+    """
+    daemon=False: handle one button press, then clean up (original mode).
+    daemon=True : keep camera, models, HTTP session and face cache warm and
+                  run a fresh session for every button press until Ctrl+C.
+    """
+
+    print("\n🚗 DriveGuard – Full System Mode\n")
+
+    ignition = IgnitionController(
+        relay_pin=25,
+        buzzer_pin=23,
+        green_led=22,
+        red_led=27
+    )
+
+    switch = IgnitionSwitch(pin=24)
+
+    start_alcohol_sensor()
+
+    print("🔥 Warming alcohol sensor while waiting for button...")
+
+    startup = StartupManager()
+
+    preload(startup)
+
+    print("🧠 Loading models while waiting for button...")
+
+    _load_face_cache()
+
+    cam = None
+
+    try:
+
+        while True:
+
+            switch.wait_for_on()
+
+            allowed = False
+
+            try:
+
+                cam = startup.get("camera")
+
+                if daemon:
+                    # Previous session left the ignition allowed
+                    ignition.reset()
+
+                allowed = run_session(cam, ignition, startup, close_camera=not daemon)
+
+            except KeyboardInterrupt:
+                raise
+
+            except Exception as e:
+
+                print("❌ System Error:", e)
+
+                ignition.block_ignition()
+
+            if not daemon:
+                break
+
+            if not allowed:
+                # Session over: buzzer off, relay off, red LED (cleanup()
+                # does this when not running as a daemon)
+                ignition.reset()
+
+            print("\n🔁 Ready for next driver\n")
+
+    except KeyboardInterrupt:
+
+        print("\n⚠️ Interrupted")
 
     finally:
 
+        if cam is not None and daemon:
+            cam.close()
+
+        face_cache.close()
+
         ignition.cleanup()
 
         print("\n🛑 System shutdown complete")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="DriveGuard ignition control")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="serve every button press without re-initialising"
+    )
+
+    main(daemon=parser.parse_args().daemon)
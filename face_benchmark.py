@@ -0,0 +1,183 @@
+# face_benchmark.py
+"""
+Accuracy / latency trade-off of downscaled face detection.
+
+Runs face_match.detect_faces + encoding at several scales over the
+recorded session images and compares every scale with full-resolution
+detection (scale 1.0):
+
+    found      images where exactly one face was found
+    agree      images whose face count matches full resolution
+    iou        mean box overlap with the full-resolution box
+    enc dist   mean encoding distance to the full-resolution encoding
+               (well below the 0.6 match threshold = same decision)
+
+CLI:
+
+    python face_benchmark.py [data/sessions] [--scales 1.0,0.5,0.33,0.25]
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+
+
+DEFAULT_SCALES = (1.0, 0.5, 0.33, 0.25)
+
+IMAGE_NAMES = ("user_face.jpg", "license.jpg")
+
+
+def _iou(a, b):
+
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+
+    inter = max(0, right - left) * max(0, bottom - top)
+
+    area = lambda r: (r[1] - r[3]) * (r[2] - r[0])
+
+    union = area(a) + area(b) - inter
+
+    return inter / union if union > 0 else 0.0
+
+
+def find_images(sessions_dir, name):
+    return sorted(glob.glob(os.path.join(sessions_dir, "*", "images", name)))
+
+
+def run(paths, scales):
+    """
+    Returns:
+        dict: scale -> {"images", "found", "agree", "detect_ms" (p50, p95),
+                        "encode_ms" (p50), "iou", "enc_dist"}
+    """
+
+    import face_recognition
+    from face_match import detect_faces, warm_up
+
+    warm_up()
+
+    images = [face_recognition.load_image_file(p) for p in paths]
+
+    per_scale = {}
+
+    for scale in scales:
+
+        rows = []
+
+        for image in images:
+
+            start = time.perf_counter()
+            boxes = detect_faces(image, scale)
+            detected = time.perf_counter()
+
+            encodings = face_recognition.face_encodings(image, boxes) if len(boxes) == 1 else []
+
+            rows.append({
+                "boxes": boxes,
+                "encoding": encodings[0] if encodings else None,
+                "detect_ms": (detected - start) * 1000,
+                "encode_ms": (time.perf_counter() - detected) * 1000
+            })
+
+        per_scale[scale] = rows
+
+    reference = per_scale[1.0] if 1.0 in per_scale else None
+
+    report = {}
+
+    for scale, rows in per_scale.items():
+
+        detect = np.array([r["detect_ms"] for r in rows])
+        encode = [r["encode_ms"] for r in rows if r["encoding"] is not None]
+
+        ious, dists, agree = [], [], 0
+
+        for i, r in enumerate(rows):
+
+            if reference is None:
+                continue
+
+            ref = reference[i]
+
+            agree += len(r["boxes"]) == len(ref["boxes"])
+
+            if r["encoding"] is not None and ref["encoding"] is not None:
+                ious.append(_iou(r["boxes"][0], ref["boxes"][0]))
+                dists.append(float(np.linalg.norm(r["encoding"] - ref["encoding"])))
+
+        report[scale] = {
+            "images": len(rows),
+            "found": sum(r["encoding"] is not None for r in rows),
+            "agree": agree if reference is not None else None,
+            "detect_ms": (
+                float(np.percentile(detect, 50)) if len(detect) else None,
+                float(np.percentile(detect, 95)) if len(detect) else None
+            ),
+            "encode_ms": float(np.median(encode)) if encode else None,
+            "iou": float(np.mean(ious)) if ious else None,
+            "enc_dist": float(np.mean(dists)) if dists else None
+        }
+
+    return report
+
+
+def _fmt(value, spec):
+    return "-" if value is None else format(value, spec)
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Downscaled face detection benchmark")
+    parser.add_argument("sessions_dir", nargs="?", default="data/sessions")
+    parser.add_argument(
+        "--scales",
+        default=",".join(str(s) for s in DEFAULT_SCALES),
+        help="comma separated detection scales (1.0 = full resolution)"
+    )
+
+    args = parser.parse_args(argv)
+
+    scales = [float(s) for s in args.scales.split(",")]
+
+    # Full resolution is the accuracy reference
+    if 1.0 not in scales:
+        scales.insert(0, 1.0)
+
+    # Driver faces and license portraits have very different face sizes
+    for name in IMAGE_NAMES:
+
+        paths = find_images(args.sessions_dir, name)
+
+        if not paths:
+            print(f"No {name} images in {args.sessions_dir}")
+            continue
+
+        print(f"\n📊 {name}: {len(paths)} images from {args.sessions_dir}\n")
+
+        report = run(paths, scales)
+
+        print(
+            f"{'scale':>6}{'found':>8}{'agree':>8}{'det p50':>10}{'det p95':>10}"
+            f"{'enc ms':>9}{'iou':>7}{'enc dist':>10}"
+        )
+
+        for scale, r in report.items():
+
+            print(
+                f"{scale:>6.2f}"
+                f"{r['found']:>5}/{r['images']:<2}"
+                f"{_fmt(r['agree'], 'd'):>8}"
+                f"{_fmt(r['detect_ms'][0], '.1f'):>10}"
+                f"{_fmt(r['detect_ms'][1], '.1f'):>10}"
+                f"{_fmt(r['encode_ms'], '.1f'):>9}"
+                f"{_fmt(r['iou'], '.2f'):>7}"
+                f"{_fmt(r['enc_dist'], '.3f'):>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
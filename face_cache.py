@@ -0,0 +1,934 @@
+# face_cache.py
+"""
+Persistent face cache with approximate nearest-neighbour search.
+
+Encodings are stored on disk in an append-only record file that is
+memory-mapped, so loading the cache and searching it are zero-copy:
+
+    header   64 bytes   magic, version, header size, dim, record size
+    records  fixed size encoding float32[dim], driver_id, created,
+                        last_seen, hit_count, flags, crc
+
+Enrolment appends one record with a single write() + fsync(), O(1) in the
+size of the cache. A power cut can only tear the last record; it is
+detected on open (short length or bad CRC) and truncated. Metadata
+(last_seen, hit_count) is updated in place through the map. Evicted
+entries are flagged as deleted and dropped by compaction, which writes a
+new file and swaps it in with an atomic rename.
+
+Small caches are searched exactly with a single matrix product; once the
+cache grows past IVF_MIN_ENTRIES an inverted-file (IVF) index is built in
+pure numpy: k-means centroids partition the encodings into contiguous
+lists and a query only scans the `nprobe` lists closest to it.
+
+Distances are Euclidean, the same metric as face_recognition.face_distance.
+"""
+
+import os
+import struct
+import threading
+import time
+import zlib
+import numpy as np
+
+
+ENCODING_DIM = 128
+
+# Default match threshold (face_recognition convention)
+MATCH_THRESHOLD = 0.6
+
+# Exact search below this size, IVF above
+IVF_MIN_ENTRIES = 2048
+
+# Lists scanned per query
+IVF_NPROBE = 8
+
+# k-means iterations when (re)building the index
+IVF_TRAIN_ITERS = 10
+
+# Rebuild once this fraction of entries is not in the index yet
+IVF_REBUILD_FRACTION = 0.1
+
+# ---------- FILE FORMAT ----------
+
+FILE_MAGIC = b"DGFACES\0"
+FILE_VERSION = 1
+HEADER_SIZE = 64
+
+# magic, version, header size, dim, record size
+_HEADER = struct.Struct("<8sHHII")
+
+# Record flags
+FLAG_DELETED = 1
+
+# Compact once this fraction of records is deleted
+COMPACT_FRACTION = 0.25
+
+# ---------- CENTROIDS ----------
+
+# A driver's encoding is the running mean of their matched encodings,
+# turning into a moving average after this many samples so it follows
+# gradual changes (beard, glasses, ageing)
+CENTROID_MAX_WEIGHT = 20
+
+
+def record_dtype(dim=ENCODING_DIM):
+    """
+    On-disk record layout (little endian). With dim=128 a record is 576
+    bytes, a multiple of the 64-byte cache line.
+    """
+
+    return np.dtype([
+        ("encoding", "<f4", (dim,)),
+        ("driver_id", "S32"),
+        ("created", "<f8"),
+        ("last_seen", "<f8"),
+        ("hit_count", "<u4"),
+        ("flags", "<u4"),
+        ("crc", "<u4"),
+        ("reserved", "<u4")
+    ])
+
+
+def _record_crc(record):
+
+    # Immutable fields only: metadata is updated in place
+    return zlib.crc32(
+        record["encoding"].tobytes()
+        + record["driver_id"].tobytes()
+        + record["created"].tobytes()
+    )
+
+
+def _fsync_dir(path):
+
+    try:
+        fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class FaceStore:
+    """
+    Append-only, memory-mapped record file.
+
+    `records` is a structured view over the file (np.memmap); appends and
+    compaction remap it, so earlier views stay valid as snapshots.
+    """
+
+    def __init__(self, path, dim=ENCODING_DIM):
+
+        self.path = path
+        self.dim = dim
+        self.dtype = record_dtype(dim)
+
+        self.records = np.zeros(0, dtype=self.dtype)
+
+        self._fd = None
+
+    def __len__(self):
+        return self.records.shape[0]
+
+    def _header(self):
+        return _HEADER.pack(
+            FILE_MAGIC, FILE_VERSION, HEADER_SIZE, self.dim, self.dtype.itemsize
+        ).ljust(HEADER_SIZE, b"\0")
+
+    def _write_file(self, records):
+        """Write header + records to a temp file and rename it into place."""
+
+        tmp = self.path + ".tmp"
+
+        with open(tmp, "wb") as f:
+            f.write(self._header())
+            f.write(np.ascontiguousarray(records).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tmp, self.path)
+
+        _fsync_dir(self.path)
+
+    def _map(self, n):
+
+        if n == 0:
+            self.records = np.zeros(0, dtype=self.dtype)
+        else:
+            self.records = np.memmap(
+                self.path, dtype=self.dtype, mode="r+",
+                offset=HEADER_SIZE, shape=(n,)
+            )
+
+    # ---------- OPEN / CLOSE ----------
+    def open(self):
+        """
+        Open (or create) the file, validate the header and drop a torn
+        trailing record left by a crash.
+
+        Raises:
+            ValueError if the file is not a compatible cache file
+        """
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER_SIZE:
+            self._write_file(np.zeros(0, dtype=self.dtype))
+
+        with open(self.path, "rb") as f:
+            magic, version, header_size, dim, record_size = _HEADER.unpack(
+                f.read(_HEADER.size)
+            )
+
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{self.path} is not a face cache file")
+
+        if version != FILE_VERSION or header_size != HEADER_SIZE:
+            raise ValueError(f"Unsupported face cache version {version}")
+
+        if dim != self.dim or record_size != self.dtype.itemsize:
+            raise ValueError(
+                f"Face cache has dim {dim} / record {record_size} bytes, "
+                f"expected {self.dim} / {self.dtype.itemsize}"
+            )
+
+        size = os.path.getsize(self.path) - HEADER_SIZE
+
+        n = size // record_size
+
+        self._map(n)
+
+        # Only the last append can be torn
+        if n and self.records[-1]["crc"] != _record_crc(self.records[-1]):
+            n -= 1
+
+        if HEADER_SIZE + n * record_size != os.path.getsize(self.path):
+
+            print(f"⚠️ Face cache: dropping torn record at {n}")
+
+            self._map(0)
+
+            with open(self.path, "r+b") as f:
+                f.truncate(HEADER_SIZE + n * record_size)
+                f.flush()
+                os.fsync(f.fileno())
+
+            self._map(n)
+
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+
+        return self
+
+    def flush(self):
+        """Persist in-place metadata updates."""
+
+        if isinstance(self.records, np.memmap):
+            self.records.flush()
+
+    def close(self):
+
+        self.flush()
+
+        self._map(0)
+
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # ---------- WRITES ----------
+    def new_records(self, encodings, driver_ids=None, now=None):
+        """
+        Records for `encodings` (not yet written); created / last_seen
+        default to now, other metadata to zero.
+        """
+
+        encodings = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+
+        now = time.time() if now is None else now
+
+        new = np.zeros(encodings.shape[0], dtype=self.dtype)
+
+        new["encoding"] = encodings
+        new["created"] = now
+        new["last_seen"] = now
+
+        if driver_ids is not None:
+            new["driver_id"] = [str(d or "").encode("utf-8")[:32] for d in driver_ids]
+
+        return new
+
+    def write(self, new):
+        """
+        Append records with one write() + fsync().
+
+        Returns:
+            row index of the first new record
+        """
+
+        if self._fd is None:
+            raise RuntimeError(f"Face cache {self.path} is not open")
+
+        for record in new:
+            record["crc"] = _record_crc(record)
+
+        first = len(self)
+
+        os.write(self._fd, new.tobytes())
+        os.fsync(self._fd)
+
+        self._map(first + len(new))
+
+        return first
+
+    def append(self, encodings, driver_ids=None, now=None):
+        """
+        Returns:
+            row index of the first new record
+        """
+
+        return self.write(self.new_records(encodings, driver_ids, now))
+
+    def compact(self, keep):
+        """
+        Rewrite the file with only the `keep` rows (atomic rename).
+
+        Returns:
+            the kept rows, in their new order
+        """
+
+        keep = np.asarray(keep, dtype=np.int64)
+
+        kept = np.array(self.records[keep])
+
+        kept["flags"] &= ~np.uint32(FLAG_DELETED)
+
+        self._write_file(kept)
+
+        # The old descriptor still points at the replaced inode
+        os.close(self._fd)
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+
+        self._map(len(kept))
+
+        return keep
+
+
+def _sq_distances(queries, data, data_sq):
+    """
+    Squared Euclidean distances between (m, d) queries and (n, d) data
+    using |q|^2 + |x|^2 - 2 q.x (one BLAS call).
+    """
+
+    q_sq = np.einsum("ij,ij->i", queries, queries)[:, None]
+
+    d = q_sq + data_sq[None, :] - 2.0 * (queries @ data.T)
+
+    np.maximum(d, 0.0, out=d)
+
+    return d
+
+
+def _top_k(sq_dists, k):
+    """
+    Indices and squared distances of the k smallest entries per row,
+    sorted ascending.
+    """
+
+    k = min(k, sq_dists.shape[1])
+
+    if k == sq_dists.shape[1]:
+        idx = np.argsort(sq_dists, axis=1)
+    else:
+        idx = np.argpartition(sq_dists, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(sq_dists, idx, axis=1), axis=1)
+        idx = np.take_along_axis(idx, order, axis=1)
+
+    return idx, np.take_along_axis(sq_dists, idx, axis=1)
+
+
+class IVFIndex:
+    """
+    Inverted-file index over a fixed snapshot of encodings.
+
+    Entries are reordered so every list is one contiguous block; `ids`
+    maps positions back to rows of the cache matrix (`ids` passed in when
+    `data` is a subset of the rows).
+    """
+
+    def __init__(self, data, ids=None, nlist=None, iters=IVF_TRAIN_ITERS, seed=0):
+
+        n = data.shape[0]
+
+        self.nlist = nlist or max(1, int(np.sqrt(n)))
+
+        rng = np.random.default_rng(seed)
+
+        # ---------- TRAIN (k-means) ----------
+        centroids = data[rng.choice(n, self.nlist, replace=False)].copy()
+
+        for _ in range(iters):
+
+            assign = np.argmin(
+                _sq_distances(data, centroids, np.einsum("ij,ij->i", centroids, centroids)),
+                axis=1
+            )
+
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+
+            counts = np.bincount(assign, minlength=self.nlist)
+
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+
+        assign = np.argmin(
+            _sq_distances(data, centroids, np.einsum("ij,ij->i", centroids, centroids)),
+            axis=1
+        )
+
+        # ---------- CONTIGUOUS LISTS ----------
+        order = np.argsort(assign, kind="stable")
+
+        self.centroids = centroids
+        self.centroids_sq = np.einsum("ij,ij->i", centroids, centroids)
+
+        self.ids = order if ids is None else np.asarray(ids)[order]
+        self.data = np.ascontiguousarray(data[order])
+        self.data_sq = np.einsum("ij,ij->i", self.data, self.data)
+
+        counts = np.bincount(assign, minlength=self.nlist)
+        self.offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def candidates(self, query, nprobe):
+        """Positions (into self.data) of the lists nearest to query."""
+
+        d = _sq_distances(query[None, :], self.centroids, self.centroids_sq)[0]
+
+        probe = np.argpartition(d, min(nprobe, self.nlist) - 1)[:nprobe]
+
+        return np.concatenate([
+            np.arange(self.offsets[c], self.offsets[c + 1]) for c in probe
+        ])
+
+
+# ---------- EVICTION POLICIES ----------
+def _smallest(rows, key, count):
+
+    if count >= len(rows):
+        return rows
+
+    return rows[np.argpartition(key, count - 1)[:count]]
+
+
+class EvictionPolicy:
+    """
+    Chooses which live rows to drop. `records` is the structured record
+    array, `rows` the live row indices.
+    """
+
+    def expired(self, records, rows, now):
+        """Rows to drop regardless of cache size."""
+
+        return rows[:0]
+
+    def select(self, records, rows, count, now):
+        """`count` rows to drop when the cache is full."""
+
+        raise NotImplementedError
+
+
+class FIFOPolicy(EvictionPolicy):
+    """Oldest enrolment first."""
+
+    def select(self, records, rows, count, now):
+        return _smallest(rows, records["created"][rows], count)
+
+
+class LRUPolicy(EvictionPolicy):
+    """Least recently seen first."""
+
+    def select(self, records, rows, count, now):
+        return _smallest(rows, records["last_seen"][rows], count)
+
+
+class LFUPolicy(EvictionPolicy):
+    """Fewest hits first, least recently seen among equals."""
+
+    def select(self, records, rows, count, now):
+
+        order = np.lexsort((records["last_seen"][rows], records["hit_count"][rows]))
+
+        return rows[order[:count]]
+
+
+class TTLPolicy(EvictionPolicy):
+    """
+    Drops drivers not seen for `ttl_sec`; when still full, falls back to
+    `fallback` (LRU by default).
+    """
+
+    def __init__(self, ttl_sec, fallback=None):
+
+        self.ttl_sec = ttl_sec
+        self.fallback = fallback or LRUPolicy()
+
+    def expired(self, records, rows, now):
+        return rows[records["last_seen"][rows] < now - self.ttl_sec]
+
+    def select(self, records, rows, count, now):
+        return self.fallback.select(records, rows, count, now)
+
+
+class FaceCache:
+    """
+    Cache of known driver face encodings, backed by a FaceStore file.
+
+    Usage:
+        cache = FaceCache("data/sessions/face_cache.bin")
+        cache.load()
+        hit, dist, row = cache.match(encoding)
+        idx, dists = cache.query_batch(encodings, k=5)
+        cache.touch(row, encoding)
+        cache.add(encoding, driver_id="DL0420110149646")
+
+    Beyond max_entries the `eviction` policy (LRU by default) picks the
+    rows to drop. Each row is one driver: touch() with the session's
+    encoding moves it towards that driver's centroid, and add() with a
+    known driver_id updates the driver's row instead of adding another.
+
+    `legacy_path` points at an old face_cache.npy; it is imported once
+    into an empty cache and renamed to *.migrated.
+    """
+
+    def __init__(self, path, dim=ENCODING_DIM, max_entries=None, nprobe=IVF_NPROBE,
+                 legacy_path=None, eviction=None):
+
+        self.path = path
+        self.dim = dim
+        self.max_entries = max_entries
+        self.nprobe = nprobe
+        self.legacy_path = legacy_path
+        self.eviction = eviction or LRUPolicy()
+
+        self.store = FaceStore(path, dim)
+
+        self._lock = threading.Lock()
+
+        self._reset()
+
+    def _reset(self):
+        """Rebuild the in-memory state from the store's records."""
+
+        records = self.store.records
+
+        n = records.shape[0]
+
+        # Squared norms live in memory; deleted rows are +inf so they never
+        # come out of a query
+        self._sq_buf = np.empty(max(2 * n, 64), dtype=np.float32)
+
+        enc = records["encoding"]
+
+        self._sq_buf[:n] = np.einsum("ij,ij->i", enc, enc)
+        self._sq_buf[:n][(records["flags"] & FLAG_DELETED) != 0] = np.inf
+
+        self._live = int(np.isfinite(self._sq_buf[:n]).sum())
+
+        self._publish(n)
+
+        # driver_id -> row (latest live row wins)
+        self._drivers = {}
+
+        for row in np.flatnonzero(np.isfinite(self.data_sq)):
+
+            driver = records["driver_id"][row]
+
+            if driver:
+                self._drivers[bytes(driver)] = int(row)
+
+        self._index = None
+        self._indexed = 0
+
+        self._maybe_build_index()
+
+    def _publish(self, n):
+
+        # Readers take these views as their snapshot. `data` is a strided
+        # view of the memory-mapped records (no copy; still BLAS-friendly)
+        self.data = self.store.records["encoding"]
+        self.data_sq = self._sq_buf[:n]
+
+    def __len__(self):
+        return self._live
+
+    @property
+    def rows(self):
+        """Records in the file, including deleted ones."""
+        return self.data.shape[0]
+
+    # ---------- INDEX ----------
+    def _maybe_build_index(self):
+
+        n = self.rows
+
+        if self._live < IVF_MIN_ENTRIES:
+            self._index = None
+            self._indexed = 0
+            return
+
+        if self._index is None or (n - self._indexed) > IVF_REBUILD_FRACTION * n:
+
+            live = np.flatnonzero(np.isfinite(self.data_sq))
+
+            self._index = IVFIndex(self.data[live], ids=live)
+            self._indexed = n
+
+    # ---------- PERSISTENCE ----------
+    def load(self):
+
+        try:
+            with self._lock:
+
+                self.store.open()
+
+                if not len(self.store) and self.legacy_path and os.path.exists(self.legacy_path):
+                    self._migrate_legacy()
+
+                self._reset()
+
+                self._expire(time.time())
+
+        except Exception as e:
+            print("⚠️ Face cache load error:", e)
+
+        return self
+
+    def _migrate_legacy(self):
+
+        data = np.load(self.legacy_path)
+
+        if data.size:
+            self.store.append(data.reshape(-1, self.dim))
+
+        os.replace(self.legacy_path, self.legacy_path + ".migrated")
+
+        print(f"♻️ Face cache: migrated {data.size // self.dim} encodings from {self.legacy_path}")
+
+    def save(self):
+        """
+        Flush in-place metadata (last_seen, hit_count). Appends are
+        already durable when add() returns.
+        """
+
+        try:
+            self.store.flush()
+
+        except Exception as e:
+            print("⚠️ Face cache save error:", e)
+
+    def close(self):
+
+        with self._lock:
+            self.store.close()
+            self._reset()
+
+    # ---------- QUERIES ----------
+    def query_batch(self, queries, k=1):
+        """
+        k nearest cached encodings for each query.
+
+        Args:
+            queries: (m, dim) array
+            k: neighbours per query
+
+        Returns:
+            (indices, distances) -> (m, k') int / float32 arrays sorted by
+            distance, k' = min(k, rows); rows index into `data`. Missing
+            neighbours are -1 / inf
+        """
+
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+
+        # snapshot: concurrent add() swaps in new arrays
+        data, data_sq, index, indexed = self.data, self.data_sq, self._index, self._indexed
+
+        n = data.shape[0]
+
+        if n == 0:
+            empty = np.empty((queries.shape[0], 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        if index is None:
+
+            idx, sq = _top_k(_sq_distances(queries, data, data_sq), k)
+
+            dist = np.sqrt(sq).astype(np.float32)
+
+            idx[~np.isfinite(dist)] = -1
+
+            return idx, dist
+
+        k_eff = min(k, n)
+
+        out_idx = np.empty((queries.shape[0], k_eff), dtype=np.int64)
+        out_dist = np.empty((queries.shape[0], k_eff), dtype=np.float32)
+
+        for i, q in enumerate(queries):
+
+            pos = index.candidates(q, self.nprobe)
+
+            ids = index.ids[pos]
+            sq = _sq_distances(q[None, :], index.data[pos], index.data_sq[pos])[0]
+
+            # Rows deleted since the index was built
+            sq[~np.isfinite(data_sq[ids])] = np.inf
+
+            # Entries added since the last rebuild are scanned exactly
+            if indexed < n:
+                ids = np.concatenate([ids, np.arange(indexed, n)])
+                sq = np.concatenate([
+                    sq,
+                    _sq_distances(q[None, :], data[indexed:], data_sq[indexed:])[0]
+                ])
+
+            top, top_sq = _top_k(sq[None, :], k_eff)
+
+            found = top.shape[1]
+
+            out_idx[i, :found] = ids[top[0]]
+            out_dist[i, :found] = np.sqrt(top_sq[0])
+
+            # Fewer candidates than k: pad with "no neighbour"
+            out_idx[i, found:] = -1
+            out_dist[i, found:] = np.inf
+
+        out_idx[~np.isfinite(out_dist)] = -1
+
+        return out_idx, out_dist
+
+    def query(self, encoding, k=1):
+        """
+        Returns:
+            (indices, distances) -> 1-d arrays for a single encoding
+        """
+
+        idx, dist = self.query_batch(encoding, k)
+
+        return idx[0], dist[0]
+
+    def match(self, encoding, threshold=MATCH_THRESHOLD):
+        """
+        Returns:
+            (hit, distance, row) -> hit True if the nearest cached face is
+            within threshold; distance/row None when the cache is empty
+        """
+
+        idx, dist = self.query(encoding, k=1)
+
+        if len(idx) == 0 or idx[0] < 0:
+            return False, None, None
+
+        return bool(dist[0] <= threshold), float(dist[0]), int(idx[0])
+
+    def metadata(self, row):
+        """
+        Returns:
+            dict with driver_id, created, last_seen, hit_count for a row
+        """
+
+        record = self.store.records[row]
+
+        return {
+            "driver_id": record["driver_id"].decode("utf-8", "ignore"),
+            "created": float(record["created"]),
+            "last_seen": float(record["last_seen"]),
+            "hit_count": int(record["hit_count"])
+        }
+
+    def row_for_driver(self, driver_id):
+        """Live row of a driver, or None."""
+
+        return self._drivers.get(str(driver_id or "").encode("utf-8")[:32])
+
+    # ---------- UPDATES ----------
+    def touch(self, row, encoding=None, now=None, driver_id=None):
+        """
+        Record a cache hit on `row`.
+
+        Without `encoding` only last_seen / hit_count change (in place,
+        flushed by save()). With it the row's encoding moves towards the
+        driver's centroid; the updated record is appended and the old one
+        deleted, so a crash never leaves a half-written encoding.
+        `driver_id` names a row enrolled without one (e.g. migrated).
+        """
+
+        now = time.time() if now is None else now
+
+        with self._lock:
+
+            if not 0 <= row < self.rows or not np.isfinite(self.data_sq[row]):
+                return
+
+            records = self.store.records
+
+            if encoding is None:
+
+                records["last_seen"][row] = now
+                records["hit_count"][row] += 1
+
+                return
+
+            old = records[row]
+
+            encoding = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+
+            # Running mean over the enrolment + every hit, capped
+            weight = min(int(old["hit_count"]) + 2, CENTROID_MAX_WEIGHT)
+
+            centroid = old["encoding"] + (encoding - old["encoding"]) / weight
+
+            new = self.store.new_records(centroid, now=now)
+
+            new["driver_id"] = old["driver_id"] or str(driver_id or "").encode("utf-8")[:32]
+            new["created"] = old["created"]
+            new["hit_count"] = old["hit_count"] + 1
+
+            self._write(new)
+
+            self._delete(np.array([row]))
+
+            self._maybe_compact()
+
+            self._maybe_build_index()
+
+    def add(self, encoding, driver_id=None, dedup_threshold=MATCH_THRESHOLD):
+        """
+        Record a verified driver. A known driver_id, or an entry within
+        dedup_threshold, is updated towards the new encoding (touch());
+        otherwise a row is appended, after the eviction policy has made
+        room beyond max_entries.
+
+        Dedup only ever merges into a row of the same driver or one
+        without a driver_id: a look-alike enrolled under another licence
+        is never moved towards this face.
+
+        Returns:
+            True if a new row was added
+        """
+
+        encoding = np.asarray(encoding, dtype=np.float32).reshape(1, self.dim)
+
+        known = self.row_for_driver(driver_id) if driver_id else None
+
+        if known is None and dedup_threshold is not None and len(self):
+
+            hit, _, row = self.match(encoding[0], dedup_threshold)
+
+            if hit and self.metadata(row)["driver_id"] in ("", str(driver_id or "")[:32]):
+                known = row
+
+        if known is not None:
+
+            self.touch(known, encoding[0], driver_id=driver_id)
+
+            return False
+
+        now = time.time()
+
+        with self._lock:
+
+            self._expire(now)
+
+            if self.max_entries is not None and self._live >= self.max_entries:
+
+                live = np.flatnonzero(np.isfinite(self.data_sq))
+
+                self._delete(self.eviction.select(
+                    self.store.records, live, self._live - self.max_entries + 1, now
+                ))
+
+            self._write(self.store.new_records(encoding, [driver_id], now))
+
+            self._maybe_compact()
+
+            self._maybe_build_index()
+
+        return True
+
+    def expire(self, now=None):
+        """Drop rows the eviction policy considers expired."""
+
+        with self._lock:
+            self._expire(time.time() if now is None else now)
+
+    def _expire(self, now):
+
+        live = np.flatnonzero(np.isfinite(self.data_sq))
+
+        expired = self.eviction.expired(self.store.records, live, now)
+
+        if len(expired):
+
+            self._delete(expired)
+
+            self._maybe_compact()
+
+            self._maybe_build_index()
+
+    def _write(self, new):
+
+        n = self.rows
+
+        first = self.store.write(new)
+
+        if n + len(new) > self._sq_buf.shape[0]:
+
+            grown = np.empty(2 * (n + len(new)), dtype=np.float32)
+            grown[:n] = self._sq_buf[:n]
+
+            self._sq_buf = grown
+
+        enc = new["encoding"]
+
+        self._sq_buf[first:first + len(new)] = np.einsum("ij,ij->i", enc, enc)
+
+        self._live += len(new)
+
+        self._publish(n + len(new))
+
+        for row, driver in enumerate(new["driver_id"], start=first):
+            if driver:
+                self._drivers[bytes(driver)] = row
+
+    def _delete(self, rows):
+
+        records = self.store.records
+
+        records["flags"][rows] |= FLAG_DELETED
+
+        self.store.flush()
+
+        for row, driver in zip(rows, records["driver_id"][rows]):
+            if self._drivers.get(driver) == row:
+                del self._drivers[driver]
+
+        self._sq_buf[rows] = np.inf
+
+        self._live -= len(rows)
+
+    def _maybe_compact(self):
+
+        n = self.rows
+
+        if n - self._live <= COMPACT_FRACTION * n:
+            return
+
+        self.store.compact(np.flatnonzero(np.isfinite(self.data_sq)))
+
+        self._reset()
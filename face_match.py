@@ -1,72 +1,326 @@
+import cv2
+import dlib
 import face_recognition
 import numpy as np
 
+from license_layout import portrait_crops
+from tracing import span
 
-def load_and_encode(image_path):
+
+# HOG detection runs on a copy scaled by this factor (1.0 = full image);
+# boxes are mapped back and encodings use the full-resolution image.
+# Full resolution until face_benchmark.py on recorded sessions shows a
+# smaller scale finds the same faces
+DETECTION_SCALE = 1.0
+
+# The license portrait is small in the frame: detect it at full size
+LICENSE_DETECTION_SCALE = 1.0
+
+# dlib upsampling passes during detection (face_recognition default: 1)
+DETECTION_UPSAMPLE = 1
+
+# ---------------- MULTI-FRAME ----------------
+
+# Aggregate used as "distance" for several user frames: median / trimmed_mean
+MULTI_FRAME_AGGREGATE = "median"
+
+# Fraction of distances dropped at each end for the trimmed mean
+TRIM_FRACTION = 0.2
+
+
+def warm_up():
+    """
+    Run the HOG detector, landmark model and ResNet encoder once on a blank
+    image so their first real call does not pay for initialisation.
+    """
+
+    image = np.zeros((150, 150, 3), dtype=np.uint8)
+
+    face_recognition.face_locations(image)
+    face_recognition.face_encodings(image, [(0, 150, 150, 0)])
+
+
+def load_image(image, bgr=False):
+    """
+    Accepts a file path or a numpy image. Grey (2-D) images, e.g. luma
+    frames from Camera.get_frame_stream, are returned as they are: HOG
+    detection runs on them directly, but encoding needs colour.
+
+    Returns:
+        RGB uint8 array (numpy input is returned without copying unless
+        `bgr` asks for a channel swap)
+    """
+
+    if isinstance(image, str):
+        with span("face.load"):
+            return face_recognition.load_image_file(image)
+
+    if bgr and image.ndim == 3:
+        # dlib needs a C-contiguous array
+        return np.ascontiguousarray(image[:, :, ::-1])
+
+    return image
+
+
+def detect_faces(image, scale=DETECTION_SCALE, upsample=DETECTION_UPSAMPLE):
+    """
+    HOG face detection on a downscaled copy of `image`.
+
+    Returns:
+        [(top, right, bottom, left)] boxes in full-resolution coordinates
     """
-    Loads an image and returns a single face encoding.
+
+    if scale >= 1.0:
+        return face_recognition.face_locations(image, upsample)
+
+    h, w = image.shape[:2]
+
+    small = cv2.resize(
+        image,
+        (max(1, int(w * scale)), max(1, int(h * scale))),
+        interpolation=cv2.INTER_AREA
+    )
+
+    boxes = face_recognition.face_locations(small, upsample)
+
+    return [
+        (
+            max(0, int(round(top / scale))),
+            min(w, int(round(right / scale))),
+            min(h, int(round(bottom / scale))),
+            max(0, int(round(left / scale)))
+        )
+        for top, right, bottom, left in boxes
+    ]
+
+
+def load_and_encode(image, face_locations=None, bgr=False, scale=DETECTION_SCALE):
+    """
+    Returns a single face encoding.
+
+    Args:
+        image: file path or numpy image (RGB, or BGR with bgr=True)
+        face_locations: known [(top, right, bottom, left)] boxes; skips
+                        detection when given
+        scale: detection downscale factor (see detect_faces); landmarks
+               and the encoding always use the full-resolution image
 
     Returns:
         encoding -> numpy array (128)
         None     -> if no face or multiple faces detected
     """
 
+    label = image if isinstance(image, str) else "frame"
+
     try:
-        image = face_recognition.load_image_file(image_path)
+        image = load_image(image, bgr)
 
-        face_locations = face_recognition.face_locations(image)
+        if face_locations is None:
+            with span("face.detect", scale=scale):
+                face_locations = detect_faces(image, scale)
 
         if len(face_locations) == 0:
-            print(f"❌ No face detected in {image_path}")
+            print(f"❌ No face detected in {label}")
             return None
 
         if len(face_locations) > 1:
-            print(f"⚠️ Multiple faces detected in {image_path}")
+            print(f"⚠️ Multiple faces detected in {label}")
             return None
 
-        encodings = face_recognition.face_encodings(image, face_locations)
+        with span("face.encode"):
+            encodings = face_recognition.face_encodings(image, face_locations)
 
         if len(encodings) == 0:
-            print(f"❌ Face encoding failed for {image_path}")
+            print(f"❌ Face encoding failed for {label}")
             return None
 
         return encodings[0]
 
     except Exception as e:
-        print(f"⚠️ Face encoding error ({image_path}): {e}")
+        print(f"⚠️ Face encoding error ({label}): {e}")
         return None
 
 
-def match_faces(license_image_path, user_image_path, threshold=0.6):
+def _encode_batch(images, boxes):
+    """
+    One dlib ResNet call for several (image, box) pairs; falls back to
+    one call per image on dlib builds without batch support.
+    """
+
+    api = face_recognition.api
+
+    try:
+        shapes = []
+
+        for image, box in zip(images, boxes):
+
+            detections = dlib.full_object_detections()
+            detections.append(api.pose_predictor_5_point(image, api._css_to_rect(box)))
+
+            shapes.append(detections)
+
+        descriptors = api.face_encoder.compute_face_descriptor(images, shapes, 1)
+
+        return [np.array(d[0]) for d in descriptors]
+
+    except (AttributeError, TypeError, RuntimeError):
+
+        return [
+            face_recognition.face_encodings(image, [box])[0]
+            for image, box in zip(images, boxes)
+        ]
+
+
+def encode_frames(frames, bgr=False, scale=DETECTION_SCALE):
+    """
+    Encode the face in each of N frames (e.g. sampled from the liveness
+    stream): per-frame downscaled detection, then one batched encoding
+    call for every frame with exactly one face.
+
+    Returns:
+        list aligned with frames: encoding (128) or None
+    """
+
+    images = [load_image(frame, bgr) for frame in frames]
+
+    with span("face.detect_batch", frames=len(images)):
+        boxes = [detect_faces(image, scale) for image in images]
+
+    keep = [i for i, b in enumerate(boxes) if len(b) == 1]
+
+    encodings = [None] * len(images)
+
+    if not keep:
+        return encodings
+
+    with span("face.encode_batch", frames=len(keep)):
+        batch = _encode_batch([images[i] for i in keep], [boxes[i][0] for i in keep])
+
+    for i, encoding in zip(keep, batch):
+        encodings[i] = encoding
+
+    return encodings
+
+
+def aggregate_distances(distances, trim=TRIM_FRACTION):
+    """
+    Robust summary of per-frame distances.
+
+    Returns:
+        {"median", "trimmed_mean", "min", "max"}
+    """
+
+    d = np.sort(np.asarray(distances, dtype=np.float64))
+
+    k = int(len(d) * trim)
+
+    trimmed = d[k:len(d) - k] if len(d) > 2 * k else d
+
+    return {
+        "median": float(np.median(d)),
+        "trimmed_mean": float(trimmed.mean()),
+        "min": float(d[0]),
+        "max": float(d[-1])
+    }
+
+
+def encode_license_face(license_image, card=None, bgr=False):
+    """
+    Encoding of the holder's portrait on a license.
+
+    With a `card` from ocr_test.locate_license() (BGR image), detection
+    and encoding run only on the portrait regions of license_layout;
+    the whole image is the fallback.
+
+    Returns:
+        encoding -> numpy array (128), or None
+    """
+
+    if card is not None:
+
+        for crop, _ in portrait_crops(card):
+
+            with span("face.license_roi"):
+                encoding = load_and_encode(crop, bgr=True, scale=LICENSE_DETECTION_SCALE)
+
+            if encoding is not None:
+                return encoding
+
+        print("⚠️ No face in license portrait region, scanning full card")
+
+        license_image, bgr = card["image"], True
+
+    return load_and_encode(license_image, bgr=bgr, scale=LICENSE_DETECTION_SCALE)
+
+
+def match_faces(license_image=None, user_image=None, threshold=0.6,
+                license_encoding=None, user_encoding=None, bgr=False,
+                license_card=None):
     """
     Compare license photo and live user photo.
 
+    Each side is given as an image (path or numpy, see load_and_encode)
+    or as a precomputed encoding; images are only encoded when their
+    encoding is not supplied. `license_card` (ocr_test.locate_license)
+    restricts the license side to the portrait region.
+
+    `user_encoding` may also be an (N, 128) array of per-frame encodings
+    (see encode_frames): the decision then uses MULTI_FRAME_AGGREGATE of
+    the per-frame distances.
+
     Returns:
         {
             "match": True/False,
             "distance": float,
+            "license_encoding": encoding used for the license (or None),
+            "distances": per-frame distances (multi-frame only),
+            "median", "trimmed_mean": aggregates (multi-frame only),
             "reason": optional
         }
     """
 
     try:
-        print("🔍 Loading license face...")
-        license_encoding = load_and_encode(license_image_path)
+        if license_encoding is None:
+            print("🔍 Loading license face...")
+            license_encoding = encode_license_face(license_image, license_card, bgr)
 
-        print("🔍 Loading user face...")
-        user_encoding = load_and_encode(user_image_path)
+        if user_encoding is None:
+            print("🔍 Loading user face...")
+            user_encoding = load_and_encode(user_image, bgr=bgr)
 
-        if license_encoding is None or user_encoding is None:
+        if license_encoding is None or user_encoding is None or len(user_encoding) == 0:
             return {
                 "match": False,
                 "distance": None,
+                "license_encoding": license_encoding,
                 "reason": "Face detection failed"
             }
 
-        # Use official face_recognition distance
-        distance = face_recognition.face_distance(
-            [license_encoding], user_encoding
-        )[0]
+        extra = {}
+
+        if np.ndim(user_encoding) == 2:
+
+            # Use official face_recognition distance, one per frame
+            distances = face_recognition.face_distance(user_encoding, license_encoding)
+
+            stats = aggregate_distances(distances)
+
+            distance = stats[MULTI_FRAME_AGGREGATE]
+
+            extra = {
+                "distances": [round(float(d), 4) for d in distances],
+                "median": round(stats["median"], 4),
+                "trimmed_mean": round(stats["trimmed_mean"], 4)
+            }
+
+            print(f"📏 Per-frame distances: {extra['distances']}")
+
+        else:
+
+            # Use official face_recognition distance
+            distance = face_recognition.face_distance(
+                [license_encoding], user_encoding
+            )[0]
 
         match = distance <= threshold
 
@@ -79,7 +333,9 @@ def match_faces(license_image_path, user_image_path, threshold=0.6):
 
         return {
             "match": bool(match),
-            "distance": round(float(distance), 4)
+            "distance": round(float(distance), 4),
+            "license_encoding": license_encoding,
+            **extra
         }
 
     except Exception as e:
@@ -88,5 +344,6 @@ def match_faces(license_image_path, user_image_path, threshold=0.6):
         return {
             "match": False,
             "distance": None,
+            "license_encoding": None,
             "reason": str(e)
         }
\ No newline at end of file
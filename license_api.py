@@ -17,6 +17,8 @@ import threading
 import time
 from typing import Dict, Any
 
+from tracing import span
+
 # Configuration
 LICENSE_API_URL = os.getenv("LICENSE_API_URL", "http://localhost:5000")
 LICENSE_API_ENDPOINT = f"{LICENSE_API_URL}/verify-license"
@@ -95,11 +97,12 @@ def verify_license(license_data: Dict[str, Any]) -> bool:
             print(f"🌐 API: Connecting to {LICENSE_API_ENDPOINT}...")
             print(f"⏱️  API: Request started at {datetime.datetime.now().strftime('%H:%M:%S')}")
 
-            response = _session.post(
-                LICENSE_API_ENDPOINT,
-                json=payload,
-                timeout=API_TIMEOUT
-            )
+            with span("license_api.http"):
+                response = _session.post(
+                    LICENSE_API_ENDPOINT,
+                    json=payload,
+                    timeout=API_TIMEOUT
+                )
 
             api_elapsed = time.time() - api_start_time
 
@@ -0,0 +1,86 @@
+# license_layout.py
+"""
+Where the holder's portrait sits on a driving license card.
+
+ocr_test.locate_license() already finds the card rectangle for OCR; the
+portrait is then a fixed fraction of that rectangle, so face detection
+and encoding only need to look at a small crop instead of the whole card
+(text, holograms, background).
+
+Regions are (x0, y0, x1, y1) fractions of the card in landscape
+orientation, tried in order. Indian DL formats put the photo on the left
+(most state smart cards) or on the right (older booklet / some states).
+"""
+
+
+# Candidate portrait regions, most common layout first
+PORTRAIT_REGIONS = (
+    (0.00, 0.15, 0.42, 0.95),    # photo on the left
+    (0.58, 0.15, 1.00, 0.95),    # photo on the right
+)
+
+# Extra margin around a region (fraction of the card size) so a slightly
+# skewed card still contains the whole face
+REGION_MARGIN = 0.05
+
+
+def _rotate(region):
+    """Landscape region -> same region on a card turned 90° (portrait)."""
+
+    x0, y0, x1, y1 = region
+
+    return (1.0 - y1, x0, 1.0 - y0, x1)
+
+
+def portrait_boxes(card_rect, image_shape, regions=PORTRAIT_REGIONS, margin=REGION_MARGIN):
+    """
+    Portrait candidate boxes in image pixels.
+
+    Args:
+        card_rect: (x, y, w, h) tight card box (locate_license()["rect"])
+        image_shape: shape of the image the card was found in
+
+    Returns:
+        list of (x, y, w, h), in the order of `regions`
+    """
+
+    cx, cy, cw, ch = card_rect
+
+    h_img, w_img = image_shape[:2]
+
+    boxes = []
+
+    for region in regions:
+
+        if ch > cw:
+            region = _rotate(region)
+
+        x0, y0, x1, y1 = region
+
+        left = int(cx + (x0 - margin) * cw)
+        top = int(cy + (y0 - margin) * ch)
+        right = int(cx + (x1 + margin) * cw)
+        bottom = int(cy + (y1 + margin) * ch)
+
+        left, top = max(0, left), max(0, top)
+        right, bottom = min(w_img, right), min(h_img, bottom)
+
+        if right > left and bottom > top:
+            boxes.append((left, top, right - left, bottom - top))
+
+    return boxes
+
+
+def portrait_crops(card, regions=PORTRAIT_REGIONS):
+    """
+    Returns:
+        list of (crop, (x, y)) -> views into card["image"] and their
+        top-left offsets, for a card from ocr_test.locate_license()
+    """
+
+    image = card["image"]
+
+    return [
+        (image[y:y + h, x:x + w], (x, y))
+        for x, y, w, h in portrait_boxes(card["rect"], image.shape, regions)
+    ]
@@ -0,0 +1,191 @@
+# license_store.py
+"""
+Per-license cache of the license portrait encoding.
+
+A returning license skips detecting and encoding its portrait: the entry
+is keyed by the OCR'd LicenseNumber and only used when a perceptual hash
+(dHash) of the card still matches the stored one, so a different photo
+behind a known number is always encoded afresh.
+
+One small JSON file per license under `root`, written to a temp file and
+renamed into place, so an update is O(1) and a power cut leaves either
+the old or the new entry.
+
+    store = LicenseStore("data/sessions/license_cache")
+    entry = store.lookup(number, card_hash)
+    store.put(number, card_hash, encoding, result)
+"""
+
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+import numpy as np
+
+from face_cache import ENCODING_DIM
+
+
+# dHash grid (HASH_SIZE x HASH_SIZE bits)
+HASH_SIZE = 8
+
+# Max differing bits (of 64) for the same card under different lighting
+HASH_MAX_DISTANCE = 10
+
+
+def dhash(image, size=HASH_SIZE):
+    """
+    Difference hash: block-average the grey image to size x (size + 1)
+    and compare horizontal neighbours. Pure numpy (no resize needed).
+
+    Returns:
+        int with size * size bits
+    """
+
+    gray = np.asarray(image, dtype=np.float64)
+
+    if gray.ndim == 3:
+        gray = gray.mean(axis=2)
+
+    h, w = gray.shape
+
+    ys = np.linspace(0, h, size + 1).astype(int)
+    xs = np.linspace(0, w, size + 2).astype(int)
+
+    # Block sums from a summed-area table
+    table = np.pad(gray.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+
+    sums = (
+        table[np.ix_(ys[1:], xs[1:])]
+        - table[np.ix_(ys[:-1], xs[1:])]
+        - table[np.ix_(ys[1:], xs[:-1])]
+        + table[np.ix_(ys[:-1], xs[:-1])]
+    )
+
+    means = sums / np.maximum(np.outer(np.diff(ys), np.diff(xs)), 1)
+
+    bits = (means[:, 1:] > means[:, :-1]).ravel()
+
+    return int("".join("1" if b else "0" for b in bits), 2)
+
+
+def card_hash(image, card=None):
+    """
+    dHash of the license card (tight card rect from
+    ocr_test.locate_license), or of the whole image without a card.
+    """
+
+    if card is not None:
+        x, y, w, h = card["rect"]
+        image = card["image"][y:y + h, x:x + w]
+
+    return dhash(image)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class LicenseStore:
+
+    def __init__(self, root):
+
+        self.root = root
+
+    def _path(self, license_number):
+
+        number = re.sub(r"[^A-Z0-9]", "", str(license_number).upper())
+
+        # Hashed name: no license numbers in the directory listing
+        name = hashlib.sha256(number.encode("utf-8")).hexdigest()[:32]
+
+        return os.path.join(self.root, f"{name}.json")
+
+    def lookup(self, license_number, image_hash):
+        """
+        Returns:
+            {"encoding": np.ndarray(128), "hash", "result", "updated"}
+            None -> unknown license, unreadable entry or different card
+        """
+
+        if not license_number:
+            return None
+
+        path = self._path(license_number)
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+
+            stored_hash = int(entry["hash"], 16)
+
+            encoding = np.asarray(entry["encoding"], dtype=np.float64)
+
+            if encoding.shape != (ENCODING_DIM,):
+                raise ValueError(f"encoding shape {encoding.shape}")
+
+        except FileNotFoundError:
+            return None
+
+        except (ValueError, KeyError, TypeError) as e:
+            # Malformed entry (bad JSON, missing or non-hex hash, wrong
+            # encoding): a miss, and drop it so it is rewritten by put()
+            print(f"⚠️ License store entry malformed, discarding: {e}")
+            self._discard(path)
+            return None
+
+        except Exception as e:
+            print(f"⚠️ License store read error: {e}")
+            return None
+
+        distance = hamming(stored_hash, image_hash)
+
+        if distance > HASH_MAX_DISTANCE:
+            print(f"⚠️ License photo changed (hash distance {distance}), re-encoding")
+            return None
+
+        entry["encoding"] = encoding
+
+        return entry
+
+    def _discard(self, path):
+
+        try:
+            os.remove(path)
+
+        except Exception as e:
+            print(f"⚠️ License store delete error: {e}")
+
+    def put(self, license_number, image_hash, encoding, result=None):
+        """
+        Store the portrait encoding and the last verification result
+        (e.g. {"match": True, "distance": 0.41}).
+        """
+
+        if not license_number or encoding is None:
+            return
+
+        path = self._path(license_number)
+
+        entry = {
+            "hash": f"{image_hash:016x}",
+            "encoding": np.asarray(encoding, dtype=np.float64).tolist(),
+            "result": result,
+            "updated": datetime.now().isoformat()
+        }
+
+        try:
+            os.makedirs(self.root, exist_ok=True)
+
+            tmp = path + ".tmp"
+
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(tmp, path)
+
+        except Exception as e:
+            print(f"⚠️ License store write error: {e}")
@@ -2,10 +2,40 @@ import pytesseract
 import cv2
 import re
 import datetime
+import numpy as np
+
+from tracing import span, traced
+
+
+# ---------------- WARM UP ----------------
+def warm_up():
+    """
+    Start tesseract once on a tiny blank image: pulls the binary and the
+    language data into the page cache before the first license.
+    """
+
+    pytesseract.get_tesseract_version()
+
+    blank = np.full((32, 128), 255, dtype=np.uint8)
+
+    pytesseract.image_to_string(blank, config="--oem 3 --psm 6")
 
 
 # ---------------- LICENSE AUTO CROP ----------------
-def detect_and_crop_license(img):
+@traced("ocr.locate")
+def locate_license(img):
+    """
+    Find the license card in a BGR image.
+
+    Returns:
+        {
+            "image": img,
+            "rect": (x, y, w, h)  tight card bounding box,
+            "bbox": (x, y, w, h)  padded crop box,
+            "crop": padded crop (view into img)
+        }
+        None -> no card-shaped quadrilateral found
+    """
 
     gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
     edges = cv2.Canny(gray, 50, 150)
@@ -27,7 +57,9 @@ def detect_and_crop_license(img):
 
         if len(approx) == 4:
 
-            x, y, w, h = cv2.boundingRect(approx)
+            rect = cv2.boundingRect(approx)
+
+            x, y, w, h = rect
 
             if w > 300 and h > 150:
 
@@ -39,39 +71,69 @@ def detect_and_crop_license(img):
                 w = min(w_img - x, w + pad * 2)
                 h = min(h_img - y, h + pad * 2)
 
-                cropped = img[y:y+h, x:x+w]
+                return {
+                    "image": img,
+                    "rect": tuple(int(v) for v in rect),
+                    "bbox": (x, y, w, h),
+                    "crop": img[y:y+h, x:x+w]
+                }
 
-                print("✅ License card detected and cropped safely")
+    return None
 
-                return cropped
 
-    print("⚠️ License auto-crop failed")
+def detect_and_crop_license(img, card=None):
+    """
+    Returns:
+        cropped card (card from locate_license, located here if not given)
+        or the full image when no card is found
+    """
 
-    return img
+    if card is None:
+        card = locate_license(img)
+
+    if card is None:
+
+        print("⚠️ License auto-crop failed")
+
+        return img
+
+    print("✅ License card detected and cropped safely")
+
+    return card["crop"]
 
 
 # ---------------- OCR CORE ----------------
-def extract_text(image_path):
+def extract_text(image_path, card=None):
+    """
+    OCR the license. `card` (from locate_license) skips reading the file
+    and locating the card again.
+    """
 
-    img = cv2.imread(image_path)
+    if card is not None:
+        img = card["image"]
+    else:
+        img = cv2.imread(image_path)
 
     if img is None:
         print("❌ Image not found")
         return ""
 
-    img = detect_and_crop_license(img)
+    img = detect_and_crop_license(img, card)
 
-    img = cv2.resize(img, None, fx=1.6, fy=1.6, interpolation=cv2.INTER_CUBIC)
+    with span("ocr.preprocess"):
 
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        img = cv2.resize(img, None, fx=1.6, fy=1.6, interpolation=cv2.INTER_CUBIC)
+
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-    gray = cv2.GaussianBlur(gray, (3, 3), 0)
+        gray = cv2.GaussianBlur(gray, (3, 3), 0)
 
-    _, thresh = cv2.threshold(gray, 130, 255, cv2.THRESH_BINARY)
+        _, thresh = cv2.threshold(gray, 130, 255, cv2.THRESH_BINARY)
 
     config = "--oem 3 --psm 6"
 
-    text = pytesseract.image_to_string(thresh, config=config)
+    with span("ocr.tesseract"):
+        text = pytesseract.image_to_string(thresh, config=config)
 
     return text
 
@@ -103,6 +165,7 @@ BLOCK_WORDS = {
 
 
 # ---------------- FIELD EXTRACTION ----------------
+@traced("ocr.fields")
 def extract_fields(text, lines):
 
     data = {}
@@ -188,13 +251,13 @@ def extract_fields(text, lines):
 
 
 # ---------------- MAIN PROCESS ----------------
-def process_document(image_path, doc_name, output_txt):
+def process_document(image_path, doc_name, output_txt, card=None):
 
     try:
 
         print("\n📄 Running OCR on license...")
 
-        raw = extract_text(image_path)
+        raw = extract_text(image_path, card)
 
         print("\n📄 OCR RAW TEXT:\n", raw)
 
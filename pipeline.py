@@ -0,0 +1,382 @@
+# pipeline.py
+"""
+Dependency-aware stage scheduler for the DriveGuard verification pipeline.
+
+Each stage declares the stages it consumes (inputs) and the stages it must
+merely run after (ordering only, e.g. two stages sharing the camera).
+A stage is submitted to a thread pool as soon as everything it depends on
+has finished, so independent checks overlap instead of adding up.
+
+Threads are used rather than processes: the camera, GPIO and HTTP session
+objects cannot be pickled, and tesseract / dlib / numpy release the GIL
+during their heavy work.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from tracing import span
+
+
+# How long run() waits for cancelled stages after a fail-fast abort
+ABORT_JOIN_SEC = 1.0
+
+
+class StageCancelled(Exception):
+    """Raised inside a stage that notices the pipeline was aborted."""
+
+
+class Stage:
+    """
+    A single unit of work in the pipeline.
+
+    name   : unique stage name, also the key of its result
+    func   : callable, receives the results of `inputs` positionally
+    inputs : stage names whose results are passed to func
+    after  : stage names that must finish first (result not passed)
+    mandatory : a falsy result or an exception fails the whole pipeline
+    """
+
+    def __init__(self, name, func, inputs=(), after=(), mandatory=False):
+
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.after = tuple(after)
+        self.mandatory = mandatory
+
+    @property
+    def deps(self):
+        return self.inputs + tuple(d for d in self.after if d not in self.inputs)
+
+
+class StageScheduler:
+    """
+    Runs registered stages concurrently, respecting their dependencies.
+
+    Usage:
+        sched = StageScheduler()
+        sched.add_stage("license_img", capture_license)
+        sched.add_stage("ocr", run_ocr, inputs=["license_img"])
+        results = sched.run()
+        timing = sched.timing_report()
+
+    With fail_fast=True the first failed mandatory stage aborts the run:
+    pending stages are never started, `cancel_event` is set so running
+    stages can stop cooperatively, and run() waits at most abort_join_sec
+    for them before returning (their late results are discarded). Stages
+    still running after that are listed in `abandoned`.
+
+    Every stage runs in a copy of the caller's contextvars context, so
+    per-session state such as the active tracer follows the stage and
+    not the worker thread.
+    """
+
+    def __init__(self, max_workers=4, fail_fast=False, abort_join_sec=ABORT_JOIN_SEC):
+
+        self.max_workers = max_workers
+        self.fail_fast = fail_fast
+        self.abort_join_sec = abort_join_sec
+        self.stages = {}
+
+        self.results = {}
+        self.errors = {}
+        self.timings = {}
+        self.skipped = {}
+
+        self.aborted_by = None
+        self.abandoned = []
+        self.cancel_event = threading.Event()
+
+        self._cancelled = []
+        self._t0 = None
+        self._wall = None
+        self._lock = threading.Lock()
+
+    def add_stage(self, name, func, inputs=(), after=(), mandatory=False):
+
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage: {name}")
+
+        self.stages[name] = Stage(name, func, inputs, after, mandatory)
+
+        return self.stages[name]
+
+    # ---------- VALIDATION ----------
+    def _check_graph(self):
+
+        for stage in self.stages.values():
+            for dep in stage.deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+
+        # Kahn's algorithm: every stage must be reachable in topological order
+        remaining = {name: set(s.deps) for name, s in self.stages.items()}
+        done = set()
+
+        while remaining:
+
+            ready = [n for n, deps in remaining.items() if deps <= done]
+
+            if not ready:
+                raise ValueError(f"Dependency cycle between stages: {sorted(remaining)}")
+
+            for n in ready:
+                done.add(n)
+                del remaining[n]
+
+    # ---------- EXECUTION ----------
+    def _run_stage(self, stage):
+
+        args = [self.results[name] for name in stage.inputs]
+
+        start = time.perf_counter()
+
+        try:
+            with span(f"stage.{stage.name}"):
+                return stage.func(*args)
+
+        finally:
+            end = time.perf_counter()
+
+            with self._lock:
+                self.timings[stage.name] = {
+                    "start": round(start - self._t0, 4),
+                    "end": round(end - self._t0, 4),
+                    "duration": round(end - start, 4),
+                    "thread": threading.current_thread().name
+                }
+
+    def run(self):
+        """
+        Execute all stages. Blocks until every runnable stage has finished,
+        or until the first mandatory failure when fail_fast is set.
+
+        A stage that raises is recorded in `errors`; stages depending on
+        it are not run and are listed in `skipped`.
+
+        Returns:
+            dict: stage name -> result
+        """
+
+        self._check_graph()
+
+        self.results = {}
+        self.errors = {}
+        self.timings = {}
+        self.skipped = {}
+
+        self.aborted_by = None
+        self.abandoned = []
+        self.cancel_event.clear()
+
+        self._cancelled = []
+
+        pending = dict(self.stages)
+        running = {}
+
+        self._t0 = time.perf_counter()
+
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="stage"
+        )
+
+        try:
+
+            while (pending or running) and self.aborted_by is None:
+
+                # Drop stages whose dependencies failed
+                for name, stage in list(pending.items()):
+                    failed = [d for d in stage.deps if d in self.errors or d in self.skipped]
+                    if failed:
+                        self.skipped[name] = f"dependency failed: {failed[0]}"
+                        del pending[name]
+
+                # Submit every stage whose dependencies are satisfied
+                for name, stage in list(pending.items()):
+                    if all(d in self.results for d in stage.deps):
+                        ctx = contextvars.copy_context()
+                        running[pool.submit(ctx.run, self._run_stage, stage)] = name
+                        del pending[name]
+
+                if not running:
+                    break
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+
+                for future in finished:
+
+                    name = running.pop(future)
+                    stage = self.stages[name]
+
+                    try:
+                        self.results[name] = future.result()
+                        failed = stage.mandatory and not self.results[name]
+                    except Exception as e:
+                        print(f"⚠️ Stage '{name}' error: {e}")
+                        self.errors[name] = e
+                        failed = stage.mandatory
+
+                    if failed and self.fail_fast:
+                        self._abort(name, pending, running)
+                        break
+
+        finally:
+
+            # On abort do not wait for tesseract / dlib / HTTP to return
+            pool.shutdown(wait=self.aborted_by is None, cancel_futures=True)
+
+        if self._cancelled:
+            self._join_cancelled()
+
+        self._wall = time.perf_counter() - self._t0
+
+        return self.results
+
+    def settled(self, names):
+        """
+        True once every stage in `names` has finished, failed or been
+        skipped. Safe to poll from a running stage.
+        """
+
+        return all(
+            name in self.results or name in self.errors or name in self.skipped
+            for name in names
+        )
+
+    def _abort(self, failed_stage, pending, running):
+
+        print(f"⛔ Fail-fast: '{failed_stage}' failed, cancelling remaining stages")
+
+        self.aborted_by = failed_stage
+        self.cancel_event.set()
+
+        for name in list(pending) + list(running.values()):
+            self.skipped[name] = f"aborted after {failed_stage} failed"
+
+        pending.clear()
+
+        for future, name in running.items():
+            if not future.cancel():
+                self._cancelled.append((future, name))
+
+        running.clear()
+
+    def _join_cancelled(self):
+
+        # Give cooperative stages a bounded moment to notice cancel_event,
+        # so the next session does not start with them still holding the
+        # camera or writing to this session's logger
+        futures = [future for future, _ in self._cancelled]
+
+        _, not_done = wait(futures, timeout=self.abort_join_sec)
+
+        self.abandoned = [name for future, name in self._cancelled if future in not_done]
+        self._cancelled = []
+
+        if self.abandoned:
+            print(f"⚠️ Stages still running after abort: {', '.join(self.abandoned)}")
+
+    # ---------- TIMING ----------
+    def critical_path(self):
+        """
+        Longest dependency chain through the finished stages.
+
+        Returns:
+            (path, seconds) -> list of stage names, summed duration
+        """
+
+        with self._lock:
+            timings = dict(self.timings)
+
+        best = {}
+
+        def visit(name):
+
+            if name in best:
+                return best[name]
+
+            own = timings.get(name, {}).get("duration", 0.0)
+
+            chain, length = [], 0.0
+
+            for dep in self.stages[name].deps:
+
+                dep_chain, dep_len = visit(dep)
+
+                if dep_len > length:
+                    chain, length = dep_chain, dep_len
+
+            best[name] = (chain + [name], length + own)
+
+            return best[name]
+
+        path, seconds = [], 0.0
+
+        for name in self.stages:
+
+            chain, length = visit(name)
+
+            if length > seconds:
+                path, seconds = chain, length
+
+        return path, seconds
+
+    def timing_report(self):
+
+        path, seconds = self.critical_path()
+
+        with self._lock:
+            timings = dict(self.timings)
+
+        return {
+            "wall_clock_sec": round(self._wall or 0.0, 4),
+            "critical_path_sec": round(seconds, 4),
+            "critical_path": path,
+            "serial_sum_sec": round(sum(t["duration"] for t in timings.values()), 4),
+            "stages": timings,
+            "aborted_by": self.aborted_by,
+            "abandoned": list(self.abandoned),
+            "skipped": dict(self.skipped)
+        }
+
+
+def until_cancelled(iterable, cancel_event):
+    """
+    Wrap a generator (e.g. the liveness frame stream) so it stops at the
+    next item once cancel_event is set. Closing the wrapper closes the
+    wrapped generator too.
+    """
+
+    try:
+
+        for item in iterable:
+
+            if cancel_event.is_set():
+                break
+
+            yield item
+
+    finally:
+
+        close = getattr(iterable, "close", None)
+
+        if close is not None:
+            close()
+
+
+def countdown(message, seconds, cancel_event):
+    """
+    Print a user countdown (message is formatted with the seconds left).
+    Raises StageCancelled as soon as the pipeline is aborted.
+    """
+
+    for i in range(seconds, 0, -1):
+
+        print(message.format(i))
+
+        if cancel_event.wait(1):
+            raise StageCancelled("Pipeline aborted")
@@ -1,6 +1,7 @@
 # session_logger.py
 import json
 import os
+import threading
 from datetime import datetime
 
 
@@ -16,28 +17,72 @@ class SessionLogger:
             "final_decision": None
         }
 
+        # Stages run on worker threads; stages abandoned by a fail-fast
+        # abort may still report after the session has been decided
+        self._lock = threading.Lock()
+        self._checks_closed = False
+
     def log_check(self, name, status, details=None):
         """
         name: str (e.g., 'ocr', 'face_match')
         status: bool
         details: optional dict
         """
-        self.data["checks"][name] = {
-            "status": bool(status),
-            "details": details
-        }
+        with self._lock:
+
+            if self._checks_closed:
+                return
+
+            self.data["checks"][name] = {
+                "status": bool(status),
+                "details": details
+            }
+
+    def close_checks(self):
+        """Ignore check results arriving from now on (abandoned stages)."""
+        with self._lock:
+            self._checks_closed = True
 
     def log_error(self, name, exc):
         """Convenience: record a failure with exception details."""
         self.log_check(name, False, {"error": str(exc)})
 
+    def log_skipped(self, name, reason):
+        """Record a check that never ran (fail-fast abort, failed dependency)."""
+        self.log_check(name, False, {"skipped": True, "reason": reason})
+
+    def log_timing(self, report):
+        """
+        report: dict from StageScheduler.timing_report()
+        (wall-clock vs critical-path time, per-stage start/end)
+        """
+        self.data["timing"] = report
+
+    def log_spans(self, spans):
+        """
+        spans: span tree from tracing.stop_trace()
+        (name, start, duration, thread, children per span)
+        """
+        self.data["spans"] = spans
+
+    def log_startup(self, report):
+        """
+        report: dict from StartupManager.report()
+        (import / warm-up / wait seconds per preloaded module)
+        """
+        self.data["startup"] = report
+
     def set_final_decision(self, decision):
         self.data["final_decision"] = bool(decision)
 
     def write(self):
         try:
+            # Serialise a consistent snapshot, then write outside the lock
+            with self._lock:
+                text = json.dumps(self.data, indent=4)
+
             with open(self.log_path, "w", encoding="utf-8") as f:
-                json.dump(self.data, f, indent=4)
+                f.write(text)
             print(f"📝 Session log written: {self.log_path}")
         except Exception as e:
             print(f"⚠️ Failed to write session log: {e}")
@@ -0,0 +1,152 @@
+# startup.py
+"""
+Startup manager: deferred imports and model warm-up in the background.
+
+Heavy modules (face_recognition, dlib, pytesseract, cv2) and their
+models are loaded on worker threads while the system waits for the
+ignition button, instead of at import time of Main_File.py. Each load is
+timed so cold start can be measured and bounded.
+
+    startup = StartupManager()
+    startup.preload_module("face_match")          # import + warm_up()
+    startup.preload("camera", open_camera)        # any callable
+    ...
+    face_match = startup.get("face_match")        # blocks only if not ready
+"""
+
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Max seconds a stage waits for a preload before failing
+DEFAULT_TIMEOUT = 60.0
+
+
+class StartupManager:
+
+    def __init__(self, max_workers=4):
+
+        self.t0 = time.perf_counter()
+
+        self.timings = {}
+
+        self._futures = {}
+        self._lock = threading.Lock()
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="preload"
+        )
+
+    def _record(self, name, **values):
+
+        with self._lock:
+            self.timings.setdefault(name, {}).update(values)
+
+    def preload(self, name, func):
+        """
+        Run func() in the background; its result is returned by get(name).
+        """
+
+        def run():
+
+            start = time.perf_counter()
+
+            try:
+                result = func()
+                self._record(name, ok=True)
+                return result
+
+            except Exception as e:
+                print(f"⚠️ Preload '{name}' failed: {e}")
+                self._record(name, ok=False, error=str(e))
+                raise
+
+            finally:
+                end = time.perf_counter()
+                self._record(
+                    name,
+                    total_sec=round(end - start, 4),
+                    ready_at_sec=round(end - self.t0, 4)
+                )
+
+        with self._lock:
+            self._futures[name] = self._pool.submit(run)
+
+    def preload_module(self, module_name, warm="warm_up"):
+        """
+        Import `module_name` in the background, then call its `warm`
+        function (if it has one) to load / exercise its models.
+        """
+
+        def load():
+
+            start = time.perf_counter()
+
+            module = importlib.import_module(module_name)
+
+            imported = time.perf_counter()
+
+            self._record(module_name, import_sec=round(imported - start, 4))
+
+            warm_func = getattr(module, warm, None)
+
+            if warm_func is not None:
+                warm_func()
+                self._record(
+                    module_name,
+                    warm_sec=round(time.perf_counter() - imported, 4)
+                )
+
+            return module
+
+        self.preload(module_name, load)
+
+    def get(self, name, timeout=DEFAULT_TIMEOUT):
+        """
+        Result of a preload, waiting at most `timeout` seconds.
+
+        Raises:
+            KeyError if never preloaded, TimeoutError, or the load error
+        """
+
+        with self._lock:
+            future = self._futures[name]
+
+        if not future.done():
+
+            start = time.perf_counter()
+
+            result = future.result(timeout=timeout)
+
+            self._record(name, waited_sec=round(time.perf_counter() - start, 4))
+
+            return result
+
+        return future.result()
+
+    def wait_all(self, timeout=DEFAULT_TIMEOUT):
+
+        with self._lock:
+            names = list(self._futures)
+
+        for name in names:
+            try:
+                self.get(name, timeout)
+            except Exception:
+                pass
+
+    def report(self):
+        """
+        Returns:
+            dict: name -> {import_sec, warm_sec, total_sec, ready_at_sec,
+                           waited_sec, ok, error} (fields present if known)
+        """
+
+        with self._lock:
+            return {name: dict(t) for name, t in self.timings.items()}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,27 @@
+# conftest.py
+"""
+Shared test setup: repo root on sys.path and the simulated GPIO backend
+(Hardware.gpio reads DRIVEGUARD_GPIO at import).
+"""
+
+import os
+import sys
+
+import pytest
+
+os.environ["DRIVEGUARD_GPIO"] = "sim"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def gpio():
+    """The simulated GPIO, reset before and after the test."""
+
+    from Hardware.gpio import GPIO
+
+    GPIO.reset()
+
+    yield GPIO
+
+    GPIO.reset()
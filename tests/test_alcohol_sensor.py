@@ -0,0 +1,213 @@
+# test_alcohol_sensor.py
+"""
+AlcoholSensor warm-up / readiness and the windowed decision, on a fake
+clock with injected samples (no sampler thread).
+
+    python -m pytest tests
+"""
+
+import pytest
+
+from Hardware.alcohol_sensor import (
+    AlcoholSensor, ADC_THRESHOLD, DUTY_THRESHOLD, MIN_TIME_ABOVE_SEC,
+    STABILITY_SEC, WARMUP_MAX_SEC, WARMUP_MIN_SEC
+)
+
+
+class FakeClock:
+
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+class FakeADC:
+
+    def read(self):
+        return 0.2
+
+    def close(self):
+        pass
+
+
+def _sensor(clock, adc=None):
+
+    sensor = AlcoholSensor(pin=17, warmup=False, adc=adc, clock=clock)
+
+    # Warm-up started, sampler not running: samples are fed by the test
+    sensor.warmup_started_at = clock()
+
+    return sensor
+
+
+def _advance(sensor, clock, seconds, level, rate_hz=50):
+    """Feed `seconds` of samples at `level`, re-evaluating readiness."""
+
+    for _ in range(int(seconds * rate_hz)):
+        clock.t += 1.0 / rate_hz
+        sensor.record(level, clock.t)
+        sensor._update_readiness(clock.t)
+
+
+def test_digital_path_waits_for_full_warmup(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock)
+
+    assert sensor.time_to_ready() == pytest.approx(WARMUP_MAX_SEC)
+
+    # A cold MQ3 behind a comparator sits at one level: not a warm heater
+    _advance(sensor, clock, WARMUP_MIN_SEC + STABILITY_SEC, 0.0)
+
+    assert not sensor.ready.is_set()
+    assert sensor.time_to_ready() == pytest.approx(
+        WARMUP_MAX_SEC - WARMUP_MIN_SEC - STABILITY_SEC, abs=0.05
+    )
+
+    _advance(sensor, clock, WARMUP_MAX_SEC, 0.0)
+
+    assert sensor.ready.is_set()
+    assert sensor.time_to_ready() == 0.0
+    assert sensor.readiness()["warmup_sec"] == pytest.approx(WARMUP_MAX_SEC, abs=0.05)
+
+
+def test_analog_stability_shortens_warmup(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock, adc=FakeADC())
+
+    # Heater still settling: level drifting
+    for i in range(int(2 * 50)):
+        clock.t += 0.02
+        sensor.record(0.2 + 0.002 * i, clock.t)
+        sensor._update_readiness(clock.t)
+
+    assert not sensor.ready.is_set()
+    assert sensor.time_to_ready() >= STABILITY_SEC - 0.05
+
+    _advance(sensor, clock, WARMUP_MIN_SEC, 0.4)
+
+    assert sensor.ready.is_set()
+    assert clock.t - sensor.warmup_started_at < WARMUP_MAX_SEC
+
+
+def test_analog_never_ready_before_minimum(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock, adc=FakeADC())
+
+    _advance(sensor, clock, WARMUP_MIN_SEC - 0.5, 0.3)
+
+    assert not sensor.ready.is_set()
+    assert 0.0 < sensor.time_to_ready() <= 0.6
+
+    _advance(sensor, clock, 1.0, 0.3)
+
+    assert sensor.ready.is_set()
+
+
+def test_time_to_ready_before_start(gpio):
+
+    sensor = AlcoholSensor(pin=17, warmup=False, clock=FakeClock())
+
+    assert sensor.time_to_ready() is None
+
+
+# ---------- DECISION ----------
+
+def _feed(sensor, clock, pattern, rate_hz=50):
+    """Samples for each (seconds, level) segment in order."""
+
+    for seconds, level in pattern:
+        for _ in range(int(round(seconds * rate_hz))):
+            clock.t += 1.0 / rate_hz
+            sensor.record(level, clock.t)
+
+
+def test_sober_window(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock)
+
+    _feed(sensor, clock, [(3.0, 0.0)])
+
+    detected, value = sensor.is_alcohol_detected()
+
+    assert not detected
+    assert value == 0.0
+
+
+def test_sustained_alcohol_is_detected(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock)
+
+    _feed(sensor, clock, [(1.0, 0.0), (2.0, 1.0)])
+
+    stats = sensor.window_stats()
+
+    assert stats["duty_cycle"] >= DUTY_THRESHOLD
+    assert stats["time_above_sec"] >= MIN_TIME_ABOVE_SEC
+    assert sensor.is_alcohol_detected()[0]
+
+
+def test_spikes_below_min_time_above_are_rejected(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock)
+
+    # Duty cycle 60 %, but no run reaches MIN_TIME_ABOVE_SEC
+    _feed(sensor, clock, [(0.3, 1.0), (0.2, 0.0)] * 6)
+
+    stats = sensor.window_stats()
+
+    assert stats["duty_cycle"] >= DUTY_THRESHOLD
+    assert stats["time_above_sec"] < MIN_TIME_ABOVE_SEC
+    assert not sensor.is_alcohol_detected()[0]
+
+
+def test_short_run_below_duty_threshold_is_rejected(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock)
+
+    # One long run, but under half the window
+    _feed(sensor, clock, [(2.0, 0.0), (1.0, 1.0)])
+
+    stats = sensor.window_stats()
+
+    assert stats["time_above_sec"] >= MIN_TIME_ABOVE_SEC
+    assert stats["duty_cycle"] < DUTY_THRESHOLD
+    assert not sensor.is_alcohol_detected()[0]
+
+
+def test_rolling_window_sees_late_breath(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock)
+
+    # Sober for the first window after the press ...
+    _feed(sensor, clock, [(3.0, 0.0)])
+
+    assert not sensor.is_alcohol_detected()[0]
+
+    # ... then breathing on the sensor while the vision stages still run
+    _feed(sensor, clock, [(2.0, 1.0)])
+
+    assert sensor.is_alcohol_detected()[0]
+
+
+def test_analog_threshold(gpio):
+
+    clock = FakeClock()
+    sensor = _sensor(clock, adc=FakeADC())
+
+    _feed(sensor, clock, [(3.0, ADC_THRESHOLD - 0.05)])
+
+    assert not sensor.is_alcohol_detected()[0]
+
+    _feed(sensor, clock, [(3.0, ADC_THRESHOLD + 0.05)])
+
+    assert sensor.is_alcohol_detected()[0]
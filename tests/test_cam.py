@@ -0,0 +1,184 @@
+# test_cam.py
+"""
+FrameRing publication, overwrite and the wait_next margin; Camera init
+failure releasing its backend.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import threading
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("cv2")
+
+from Hardware.cam import Camera, FrameRing
+from Hardware.camera_backends import CameraBackend
+
+
+SIZE = 4
+
+
+def _ring(frames=0):
+
+    ring = FrameRing(SIZE, (2, 3))
+
+    for _ in range(frames):
+        _produce(ring)
+
+    return ring
+
+
+def _produce(ring):
+    """Write frame number `seq` into the next slot and publish it."""
+
+    seq = ring.seq
+
+    ring.write_slot()[...] = seq
+
+    ring.publish(timestamp=seq / 10.0, metadata={"seq": seq})
+
+
+# ---------- FRAME RING ----------
+
+def test_latest_is_a_zero_copy_view():
+
+    ring = _ring()
+
+    assert ring.latest() is None
+
+    _produce(ring)
+    _produce(ring)
+
+    seq, frame, ts = ring.latest()
+
+    assert seq == 1
+    assert ts == pytest.approx(0.1)
+    assert (frame == 1).all()
+    assert np.shares_memory(frame, ring.frames)
+    assert ring.metadata_at(seq) == {"seq": 1}
+
+
+def test_slots_are_overwritten_after_size_frames():
+
+    ring = _ring(1)
+
+    _, first, _ = ring.latest()
+
+    for _ in range(SIZE):
+        _produce(ring)
+
+    # Same slot, now holding frame SIZE: views are only valid for a while
+    assert (first == SIZE).all()
+    assert ring.latest()[0] == SIZE
+
+
+def test_wait_next_in_order_within_margin():
+
+    ring = _ring(SIZE)
+
+    # Oldest frame a reader may still take: one slot of margin between it
+    # and the slot the producer writes next
+    oldest = ring.seq - (SIZE - 2)
+
+    seq, frame, ts = ring.wait_next(oldest - 1, timeout=0)
+
+    assert seq == oldest
+    assert (frame == seq).all()
+    assert ts == pytest.approx(seq / 10.0)
+
+    # One frame older and the reader skips ahead
+    assert ring.wait_next(oldest - 2, timeout=0)[0] == ring.seq - 1
+
+
+def test_wait_next_skips_the_slot_about_to_be_overwritten():
+
+    ring = _ring(3 * SIZE)
+
+    newest = ring.seq - 1
+
+    # Next frame lives in the slot write_slot() returns: skip to the newest
+    next_slot = ring.seq - SIZE
+
+    assert np.shares_memory(ring.write_slot(), ring.frames[next_slot % SIZE])
+
+    seq, frame, _ = ring.wait_next(next_slot - 1, timeout=0)
+
+    assert seq == newest
+    assert (frame == newest).all()
+
+    # Far behind: same
+    assert ring.wait_next(0, timeout=0)[0] == newest
+
+
+def test_wait_next_blocks_until_published():
+
+    ring = _ring(1)
+
+    assert ring.wait_next(0, timeout=0.05) is None
+
+    timer = threading.Timer(0.05, _produce, args=(ring,))
+    timer.start()
+
+    try:
+        seq, frame, _ = ring.wait_next(0, timeout=2)
+    finally:
+        timer.join()
+
+    assert seq == 1
+    assert (frame == 1).all()
+
+
+# ---------- CAMERA INIT ----------
+
+class _FailingBackend(CameraBackend):
+
+    live = False
+
+    def __init__(self, fail_in):
+
+        super().__init__(size=(8, 6))
+
+        self.fail_in = fail_in
+        self.started = False
+        self.stopped = False
+
+    def start(self):
+
+        self.started = True
+
+        if self.fail_in == "start":
+            raise RuntimeError("sensor busy")
+
+    def frame_shape(self):
+
+        if self.fail_in == "frame_shape":
+            raise RuntimeError("unsupported mode")
+
+        return super().frame_shape()
+
+    def read_into(self, dst):
+        raise EOFError("no frames")
+
+    def stop(self):
+        self.stopped = True
+
+
+@pytest.mark.parametrize("fail_in", ["start", "frame_shape"])
+def test_init_failure_stops_the_backend(fail_in):
+
+    backend = _FailingBackend(fail_in)
+
+    cam = Camera(backend=backend)
+
+    assert cam.backend is None
+    assert backend.started
+    assert backend.stopped
+
+    # close() after a failed init is harmless
+    cam.close()
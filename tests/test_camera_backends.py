@@ -0,0 +1,192 @@
+# test_camera_backends.py
+"""
+Camera backends without hardware: replay from recorded frames and the
+Picamera2 YUV420 copy on a synthetic padded buffer.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+cv2 = pytest.importorskip("cv2")
+
+from Hardware.camera_backends import Picamera2Backend, ReplayBackend, create_backend
+
+
+SIZE = (32, 24)
+
+
+def _recording(tmp_path, n=3):
+
+    for i in range(n):
+
+        frame = np.full((SIZE[1], SIZE[0], 3), 10 * (i + 1), dtype=np.uint8)
+
+        assert cv2.imwrite(str(tmp_path / f"frame_{i:03d}.png"), frame)
+
+    return str(tmp_path)
+
+
+def test_replay_spec_options(tmp_path):
+
+    backend = create_backend(f"replay:{tmp_path}?fps=10&realtime=0&loop=1", size=SIZE)
+
+    assert isinstance(backend, ReplayBackend)
+    assert backend.source == str(tmp_path)
+    assert backend.fps == 10.0
+    assert backend.loop is True
+    assert backend.realtime is False
+
+    plain = create_backend(f"replay:{tmp_path}", size=SIZE)
+
+    assert (plain.fps, plain.loop, plain.realtime) == (30.0, False, False)
+
+    with pytest.raises(ValueError, match="Unknown replay option"):
+        create_backend(f"replay:{tmp_path}?speed=2")
+
+    with pytest.raises(ValueError, match="needs a path"):
+        create_backend("replay:?loop=1")
+
+
+def test_replay_frames_timestamps_and_loop(tmp_path):
+
+    backend = create_backend(f"replay:{_recording(tmp_path)}?fps=10&loop=1", size=SIZE)
+    backend.start()
+
+    dst = np.empty(backend.frame_shape(), dtype=np.uint8)
+
+    seen, stamps = [], []
+
+    for _ in range(5):
+
+        ts, _ = backend.read_into(dst)
+
+        seen.append(int(dst[0, 0, 0]))
+        stamps.append(ts)
+
+    backend.stop()
+
+    assert seen == [10, 20, 30, 10, 20]
+    assert np.allclose(np.diff(stamps), 0.1)
+
+
+def test_replay_without_loop_ends(tmp_path):
+
+    backend = ReplayBackend(_recording(tmp_path, n=2), size=SIZE)
+    backend.start()
+
+    dst = np.empty(backend.frame_shape(), dtype=np.uint8)
+
+    backend.read_into(dst)
+    backend.read_into(dst)
+
+    with pytest.raises(EOFError):
+        backend.read_into(dst)
+
+
+def test_replay_rejects_undecodable_directory(tmp_path):
+
+    for i in range(2):
+        (tmp_path / f"broken_{i}.jpg").write_bytes(b"not a jpeg")
+
+    backend = ReplayBackend(str(tmp_path), loop=True, size=SIZE)
+
+    with pytest.raises(RuntimeError, match="No images in"):
+        backend.start()
+
+    empty = tmp_path / "empty"
+    empty.mkdir()
+
+    with pytest.raises(RuntimeError, match="No images in"):
+        ReplayBackend(str(empty), size=SIZE).start()
+
+
+class _FakeRequest:
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def make_array(self, name):
+        return self.frame
+
+    def get_metadata(self):
+        return {"SensorTimestamp": 1}
+
+    def release(self):
+        pass
+
+
+class _FakePicamera2:
+
+    def __init__(self, frame):
+        self.frame = frame
+
+    def capture_request(self):
+        return _FakeRequest(self.frame)
+
+
+def _padded_yuv420(width, height, stride, seed=0):
+    """
+    (padded Picamera2 buffer, expected packed I420) with distinct Y/U/V
+    values and 255 in every padding byte.
+    """
+
+    rng = np.random.default_rng(seed)
+
+    y = rng.integers(0, 200, size=(height, width), dtype=np.uint8)
+    u = rng.integers(0, 200, size=(height // 2, width // 2), dtype=np.uint8)
+    v = rng.integers(0, 200, size=(height // 2, width // 2), dtype=np.uint8)
+
+    padded = np.full((height * 3 // 2, stride), 255, dtype=np.uint8)
+    padded[:height, :width] = y
+
+    chroma = padded[height:].reshape(-1)
+
+    for plane, values in enumerate((u, v)):
+
+        rows = chroma[plane * (height // 2) * (stride // 2):].reshape(-1, stride // 2)
+
+        rows[:height // 2, :width // 2] = values
+
+    expected = np.concatenate([y.reshape(-1), u.reshape(-1), v.reshape(-1)])
+
+    return padded, expected.reshape(height * 3 // 2, width)
+
+
+@pytest.mark.parametrize("stride", [32, 64])
+def test_picamera2_yuv420_honours_stride(stride):
+
+    width, height = 24, 16
+
+    padded, expected = _padded_yuv420(width, height, stride)
+
+    backend = Picamera2Backend(size=(width, height))
+    backend.picam2 = _FakePicamera2(padded)
+
+    dst = np.zeros(backend.frame_shape(), dtype=np.uint8)
+
+    _, metadata = backend.read_into(dst)
+
+    assert metadata == {"SensorTimestamp": 1}
+    assert np.array_equal(dst, expected)
+    assert not (dst == 255).any()
+
+
+def test_picamera2_yuv420_unpadded():
+
+    padded, expected = _padded_yuv420(32, 16, 32)
+
+    backend = Picamera2Backend(size=(32, 16))
+    backend.picam2 = _FakePicamera2(padded)
+
+    dst = np.zeros(backend.frame_shape(), dtype=np.uint8)
+
+    backend.read_into(dst)
+
+    assert np.array_equal(dst, expected)
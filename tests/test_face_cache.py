@@ -0,0 +1,389 @@
+# test_face_cache.py
+"""
+FaceStore file format, crash recovery, FaceCache persistence and IVF
+search against brute force.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+import face_cache
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from face_cache import (
+    FaceCache, FaceStore, IVFIndex, FILE_MAGIC, HEADER_SIZE, FLAG_DELETED, record_dtype
+)
+
+
+def _encodings(n, seed=0):
+
+    rng = np.random.default_rng(seed)
+
+    enc = rng.normal(size=(n, 128)).astype(np.float32)
+
+    # Unit norm: distinct drivers are ~1.4 apart, well beyond 0.6
+    return enc / np.linalg.norm(enc, axis=1, keepdims=True)
+
+
+def test_record_layout():
+
+    assert record_dtype().itemsize == 576
+
+
+def test_header_and_append_roundtrip(tmp_path):
+
+    path = str(tmp_path / "cache.bin")
+
+    store = FaceStore(path).open()
+
+    enc = _encodings(3)
+
+    assert store.append(enc, ["A", "B", None]) == 0
+
+    store.close()
+
+    with open(path, "rb") as f:
+        assert f.read(8) == FILE_MAGIC
+
+    assert os.path.getsize(path) == HEADER_SIZE + 3 * 576
+
+    store = FaceStore(path).open()
+
+    assert len(store) == 3
+    assert np.array_equal(store.records["encoding"], enc)
+    assert list(store.records["driver_id"]) == [b"A", b"B", b""]
+
+    store.close()
+
+
+def test_torn_tail_is_truncated(tmp_path):
+
+    path = str(tmp_path / "cache.bin")
+
+    store = FaceStore(path).open()
+    store.append(_encodings(2))
+    store.close()
+
+    # Power cut half way through the third append
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 200)
+
+    store = FaceStore(path).open()
+
+    assert len(store) == 2
+    assert os.path.getsize(path) == HEADER_SIZE + 2 * 576
+
+    store.close()
+
+
+def test_bad_crc_tail_is_truncated(tmp_path):
+
+    path = str(tmp_path / "cache.bin")
+
+    store = FaceStore(path).open()
+    store.append(_encodings(3))
+    store.close()
+
+    # Full-length last record whose payload never reached the disk
+    with open(path, "r+b") as f:
+        f.seek(HEADER_SIZE + 2 * 576)
+        f.write(b"\x00" * 64)
+
+    store = FaceStore(path).open()
+
+    assert len(store) == 2
+    assert os.path.getsize(path) == HEADER_SIZE + 2 * 576
+
+    store.close()
+
+
+def test_foreign_file_is_rejected(tmp_path):
+
+    path = str(tmp_path / "cache.bin")
+
+    with open(path, "wb") as f:
+        f.write(b"x" * 256)
+
+    with pytest.raises(ValueError, match="not a face cache file"):
+        FaceStore(path).open()
+
+
+def test_add_without_open_store_raises_clearly(tmp_path):
+
+    path = str(tmp_path / "cache.bin")
+
+    with open(path, "wb") as f:
+        f.write(b"x" * 256)
+
+    cache = FaceCache(path).load()
+
+    with pytest.raises(RuntimeError, match="not open"):
+        cache.add(_encodings(1)[0], driver_id="A")
+
+
+def test_cache_persists_deletes_and_compaction(tmp_path):
+
+    path = str(tmp_path / "cache.bin")
+
+    enc = _encodings(8)
+
+    cache = FaceCache(path, max_entries=4).load()
+
+    for i, e in enumerate(enc):
+        cache.add(e, driver_id=f"D{i}")
+
+    assert len(cache) == 4
+
+    cache.close()
+
+    cache = FaceCache(path, max_entries=4).load()
+
+    assert len(cache) == 4
+
+    # The newest drivers survive eviction, each still matching itself
+    for i in range(4, 8):
+
+        hit, dist, row = cache.match(enc[i])
+
+        assert hit and dist < 1e-3
+        assert cache.metadata(row)["driver_id"] == f"D{i}"
+
+    flags = cache.store.records["flags"]
+
+    assert (flags & FLAG_DELETED).sum() == cache.rows - 4
+
+    cache.close()
+
+
+def test_legacy_npy_is_migrated(tmp_path):
+
+    path = str(tmp_path / "cache.bin")
+    legacy = str(tmp_path / "face_cache.npy")
+
+    enc = _encodings(3)
+
+    np.save(legacy, enc)
+
+    cache = FaceCache(path, legacy_path=legacy).load()
+
+    assert len(cache) == 3
+    assert not os.path.exists(legacy)
+    assert os.path.exists(legacy + ".migrated")
+
+    hit, _, _ = cache.match(enc[1])
+
+    assert hit
+
+    cache.close()
+
+
+def test_dedup_never_merges_another_driver(tmp_path):
+
+    cache = FaceCache(str(tmp_path / "cache.bin")).load()
+
+    a = _encodings(1)[0]
+    look_alike = a + 0.01
+
+    cache.add(a, driver_id="A")
+
+    assert cache.add(look_alike, driver_id="B") is True
+    assert len(cache) == 2
+
+    row_a = cache.row_for_driver("A")
+
+    assert np.array_equal(cache.data[row_a], a)
+    assert cache.metadata(cache.row_for_driver("B"))["driver_id"] == "B"
+
+    cache.close()
+
+
+def test_dedup_names_an_anonymous_row(tmp_path):
+
+    cache = FaceCache(str(tmp_path / "cache.bin")).load()
+
+    a = _encodings(1)[0]
+
+    cache.add(a)
+
+    assert cache.add(a + 0.01, driver_id="A") is False
+    assert len(cache) == 1
+    assert cache.metadata(cache.row_for_driver("A"))["hit_count"] == 1
+
+    cache.close()
+
+
+# ---------- IVF vs BRUTE FORCE ----------
+
+def _clustered(n, clusters=12, spread=0.15, seed=1):
+    """Encodings grouped around a few centres, like repeat drivers."""
+
+    rng = np.random.default_rng(seed)
+
+    centres = _encodings(clusters, seed=seed + 100)
+
+    enc = centres[rng.integers(0, clusters, n)] + rng.normal(scale=spread, size=(n, 128))
+
+    return enc.astype(np.float32)
+
+
+def _brute_force(cache, queries, k):
+
+    live = np.flatnonzero(np.isfinite(cache.data_sq))
+
+    data = np.asarray(cache.data[live], dtype=np.float64)
+
+    dists = np.linalg.norm(queries[:, None, :].astype(np.float64) - data[None], axis=2)
+
+    order = np.argsort(dists, axis=1)[:, :k]
+
+    return live[order], np.take_along_axis(dists, order, axis=1)
+
+
+def _filled_cache(tmp_path, monkeypatch, n, **kwargs):
+
+    monkeypatch.setattr(face_cache, "IVF_MIN_ENTRIES", 64)
+
+    cache = FaceCache(str(tmp_path / "cache.bin"), **kwargs).load()
+
+    for e in _clustered(n):
+        cache.add(e, dedup_threshold=None)
+
+    return cache
+
+
+def test_kmeans_lists_hold_their_nearest_centroid():
+
+    data = _clustered(400)
+
+    index = IVFIndex(data, ids=np.arange(1000, 1400))
+
+    assert index.nlist == 20
+    assert index.offsets[-1] == 400
+    assert sorted(index.ids) == list(range(1000, 1400))
+    assert np.array_equal(index.data, data[index.ids - 1000])
+
+    d = np.linalg.norm(index.data[:, None, :] - index.centroids[None], axis=2)
+    nearest = np.argmin(d, axis=1)
+
+    for c in range(index.nlist):
+        assert (nearest[index.offsets[c]:index.offsets[c + 1]] == c).all()
+
+
+def test_probe_count_bounds_candidates():
+
+    index = IVFIndex(_clustered(400), nlist=20)
+
+    q = _clustered(1, seed=7)[0]
+
+    sizes = np.diff(index.offsets)
+
+    one = index.candidates(q, 1)
+
+    assert len(one) in sizes
+    assert len(index.candidates(q, 4)) >= len(one)
+    assert sorted(index.candidates(q, index.nlist)) == list(range(400))
+
+
+def test_ivf_probing_every_list_is_exact(tmp_path, monkeypatch):
+
+    cache = _filled_cache(tmp_path, monkeypatch, 300, nprobe=10 ** 6)
+
+    assert cache._index is not None
+
+    queries = _clustered(25, seed=3)
+
+    idx, dist = cache.query_batch(queries, k=5)
+    want_idx, want_dist = _brute_force(cache, queries, 5)
+
+    assert np.array_equal(idx, want_idx)
+    assert np.allclose(dist, want_dist, atol=1e-4)
+
+    cache.close()
+
+
+def test_ivf_default_probe_recall(tmp_path, monkeypatch):
+
+    cache = _filled_cache(tmp_path, monkeypatch, 300, nprobe=4)
+
+    # Re-visits of cached drivers: slightly different encodings
+    rng = np.random.default_rng(5)
+    queries = cache.data[rng.choice(cache.rows, 25, replace=False)] + \
+        rng.normal(scale=0.02, size=(25, 128)).astype(np.float32)
+
+    idx, _ = cache.query_batch(queries, k=5)
+    want_idx, _ = _brute_force(cache, queries, 5)
+
+    assert np.array_equal(idx[:, 0], want_idx[:, 0])
+
+    recall = np.mean([len(set(a) & set(b)) / 5 for a, b in zip(idx, want_idx)])
+
+    assert recall >= 0.9
+
+    cache.close()
+
+
+def test_ivf_after_eviction_and_unindexed_rows(tmp_path, monkeypatch):
+
+    cache = _filled_cache(tmp_path, monkeypatch, 300, nprobe=10 ** 6, max_entries=200)
+
+    assert len(cache) == 200
+
+    # The index still lists evicted rows and misses the newest ones
+    assert not np.isfinite(cache.data_sq[cache._index.ids]).all()
+    assert cache._indexed < cache.rows
+
+    queries = _clustered(25, seed=4)
+
+    idx, dist = cache.query_batch(queries, k=5)
+    want_idx, want_dist = _brute_force(cache, queries, 5)
+
+    # Evicted rows never come back, the rest matches an exact scan
+    assert np.isfinite(cache.data_sq[idx]).all()
+    assert np.array_equal(idx, want_idx)
+    assert np.allclose(dist, want_dist, atol=1e-4)
+
+    # A row added after the last rebuild is scanned exactly
+    fresh = _encodings(1, seed=42)[0]
+
+    cache.add(fresh, driver_id="NEW", dedup_threshold=None)
+
+    assert cache._indexed < cache.rows
+
+    hit, d, row = cache.match(fresh)
+
+    assert hit and d < 1e-3
+    assert cache.metadata(row)["driver_id"] == "NEW"
+
+    cache.close()
+
+
+def test_ivf_rebuilds_after_growth(tmp_path, monkeypatch):
+
+    cache = _filled_cache(tmp_path, monkeypatch, 100)
+
+    index, indexed = cache._index, cache._indexed
+
+    assert index is not None
+
+    extra = int(face_cache.IVF_REBUILD_FRACTION * 200) + 5
+
+    for e in _clustered(extra, seed=9):
+        cache.add(e, dedup_threshold=None)
+
+    assert cache._index is not index
+    assert cache._indexed > indexed
+
+    monkeypatch.setattr(face_cache, "IVF_MIN_ENTRIES", 10 ** 6)
+
+    cache.add(_encodings(1, seed=11)[0], dedup_threshold=None)
+
+    # Back below the threshold: exact search again
+    assert cache._index is None
+
+    cache.close()
@@ -0,0 +1,109 @@
+# test_gpio_sim.py
+"""
+SimulatedGPIO: scripted inputs, edge callbacks and recorded outputs.
+
+    python -m pytest tests
+"""
+
+import sys
+
+import pytest
+
+from Hardware.gpio import SimulatedGPIO
+from Hardware.ignition_control import IgnitionController
+from Hardware.ignition_switch import IgnitionSwitch
+
+
+RELAY, BUZZER, GREEN, RED, BUTTON = 25, 23, 22, 27, 24
+
+
+def _levels(gpio, pin):
+    return [level for _, level in gpio.outputs(pin)]
+
+
+def test_scripted_press_drives_relay_and_leds(gpio):
+
+    ignition = IgnitionController(RELAY, BUZZER, GREEN, RED)
+    switch = IgnitionSwitch(pin=BUTTON)
+
+    # Fail-safe state on start
+    assert _levels(gpio, RELAY) == [gpio.LOW]
+    assert _levels(gpio, RED) == [gpio.LOW, gpio.HIGH]
+
+    gpio.script(BUTTON, [(0.05, gpio.LOW), (0.3, gpio.HIGH)])
+
+    assert switch.wait_for_on(timeout=2)
+
+    ignition.allow_ignition()
+
+    assert _levels(gpio, RELAY) == [gpio.LOW, gpio.HIGH]
+    assert _levels(gpio, GREEN)[-1] == gpio.HIGH
+    assert _levels(gpio, RED)[-1] == gpio.LOW
+
+    ignition.block_ignition()
+
+    assert _levels(gpio, RELAY)[-1] == gpio.LOW
+    assert _levels(gpio, BUZZER)[-1] == gpio.HIGH
+
+    ignition.reset()
+
+    assert _levels(gpio, BUZZER)[-1] == gpio.LOW
+    assert _levels(gpio, RED)[-1] == gpio.HIGH
+
+    # Transitions are timestamped in order
+    times = [t for t, _ in gpio.outputs(RELAY)]
+    assert times == sorted(times)
+
+
+def test_edge_callbacks_respect_direction_and_bouncetime(gpio):
+
+    gpio.setup(BUTTON, gpio.IN, pull_up_down=gpio.PUD_UP)
+
+    edges = []
+
+    gpio.add_event_detect(BUTTON, gpio.FALLING, callback=edges.append, bouncetime=100)
+
+    gpio.set_input(BUTTON, gpio.LOW)
+    gpio.set_input(BUTTON, gpio.HIGH)     # rising: not watched
+    gpio.set_input(BUTTON, gpio.LOW)      # within bouncetime: swallowed
+
+    assert edges == [BUTTON]
+    assert gpio.event_detected(BUTTON)
+    assert not gpio.event_detected(BUTTON)
+
+    with pytest.raises(RuntimeError, match="Conflicting"):
+        gpio.add_event_detect(BUTTON, gpio.BOTH)
+
+
+def test_wait_for_edge_times_out(gpio):
+
+    gpio.setup(BUTTON, gpio.IN, pull_up_down=gpio.PUD_UP)
+
+    assert gpio.wait_for_edge(BUTTON, gpio.FALLING, timeout=50) is None
+
+    gpio.script(BUTTON, [(0.02, gpio.LOW)])
+
+    assert gpio.wait_for_edge(BUTTON, gpio.FALLING, timeout=1000) == BUTTON
+
+
+def test_output_requires_setup(gpio):
+
+    with pytest.raises(RuntimeError, match="not set up"):
+        gpio.output(RELAY, gpio.HIGH)
+
+
+def test_missing_rpi_gpio_is_an_error(monkeypatch):
+
+    import Hardware.gpio as gpio_module
+
+    monkeypatch.delenv("DRIVEGUARD_GPIO")
+
+    # RPi.GPIO is not installed off the Pi; it must not fall back silently
+    monkeypatch.setitem(sys.modules, "RPi", None)
+
+    with pytest.raises(ImportError):
+        gpio_module._load_gpio()
+
+    monkeypatch.setenv("DRIVEGUARD_GPIO", "sim")
+
+    assert isinstance(gpio_module._load_gpio(), SimulatedGPIO)
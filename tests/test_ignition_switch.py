@@ -0,0 +1,114 @@
+# test_ignition_switch.py
+"""
+IgnitionSwitch on the simulated GPIO: press queue, stale-press drain,
+asyncio waiters and the release hold.
+
+    python -m pytest tests
+"""
+
+import asyncio
+import time
+
+import Hardware.ignition_switch as ignition_switch
+from Hardware.ignition_switch import IgnitionSwitch
+
+
+BUTTON = 24
+
+
+def _tap(gpio):
+    """Press and release right now (one falling edge)."""
+
+    gpio.set_input(BUTTON, gpio.LOW)
+    gpio.set_input(BUTTON, gpio.HIGH)
+
+
+def test_press_is_queued_once_despite_bounce(gpio):
+
+    switch = IgnitionSwitch(pin=BUTTON)
+
+    assert switch.edge_events
+
+    # Contact bounce inside the 200 ms window: one press
+    for level in (gpio.LOW, gpio.HIGH, gpio.LOW, gpio.HIGH, gpio.LOW):
+        gpio.set_input(BUTTON, level)
+
+    assert switch._presses.qsize() == 1
+
+    gpio.set_input(BUTTON, gpio.HIGH)
+
+
+def test_wait_for_on_takes_the_next_press(gpio):
+
+    switch = IgnitionSwitch(pin=BUTTON)
+
+    assert not switch.wait_for_on(timeout=0.05)
+
+    gpio.script(BUTTON, [(0.05, gpio.LOW), (0.1, gpio.HIGH)])
+
+    t0 = time.monotonic()
+
+    assert switch.wait_for_on(timeout=2)
+    assert time.monotonic() - t0 < 1
+
+
+def test_stale_presses_are_drained(gpio):
+
+    switch = IgnitionSwitch(pin=BUTTON)
+
+    # Pressed while nobody was waiting (e.g. during the previous session)
+    _tap(gpio)
+
+    assert switch._presses.qsize() == 1
+
+    assert not switch.wait_for_on(timeout=0.1)
+    assert switch._presses.empty()
+
+
+def test_async_waiters_all_wake_on_one_press(gpio):
+
+    switch = IgnitionSwitch(pin=BUTTON)
+
+    async def main():
+
+        waiters = [asyncio.ensure_future(switch.wait_for_on_async()) for _ in range(2)]
+
+        # Let both register before pressing
+        while len(switch._async_waiters) < 2:
+            await asyncio.sleep(0.01)
+
+        gpio.script(BUTTON, [(0.02, gpio.LOW), (0.05, gpio.HIGH)])
+
+        return await asyncio.wait_for(asyncio.gather(*waiters), timeout=2)
+
+    assert asyncio.run(main()) == [True, True]
+    assert switch._async_waiters == []
+
+
+def test_release_needs_a_steady_high(gpio, monkeypatch):
+
+    monkeypatch.setattr(ignition_switch, "RELEASE_HOLD_SEC", 0.3)
+
+    switch = IgnitionSwitch(pin=BUTTON)
+
+    gpio.set_input(BUTTON, gpio.LOW)
+
+    assert not switch.wait_for_off(timeout=0.1)
+
+    # Lifted, bounced closed after 0.15 s, then released for good
+    gpio.script(BUTTON, [(0.0, gpio.HIGH), (0.15, gpio.LOW), (0.2, gpio.HIGH)])
+
+    t0 = time.monotonic()
+
+    assert switch.wait_for_off(timeout=2)
+    assert time.monotonic() - t0 >= 0.2 + 0.3
+
+
+def test_release_is_confirmed_after_one_second(gpio):
+
+    switch = IgnitionSwitch(pin=BUTTON)
+
+    t0 = time.monotonic()
+
+    assert switch.wait_for_off(timeout=3)
+    assert time.monotonic() - t0 >= 1.0
@@ -0,0 +1,129 @@
+# test_license_store.py
+"""
+License card dHash and the per-license portrait store.
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from license_store import (
+    HASH_MAX_DISTANCE, LicenseStore, card_hash, dhash, hamming
+)
+
+
+def _card(seed=0, shape=(120, 190)):
+
+    rng = np.random.default_rng(seed)
+
+    return rng.integers(0, 256, size=shape).astype(np.uint8)
+
+
+def _flip_bits(value, count):
+
+    for bit in range(count):
+        value ^= 1 << bit
+
+    return value
+
+
+# ---------- HASH ----------
+
+def test_dhash_of_gradients():
+
+    ramp = np.tile(np.arange(90, dtype=np.float64), (40, 1))
+
+    assert dhash(ramp) == (1 << 64) - 1
+    assert dhash(ramp[:, ::-1]) == 0
+    assert dhash(np.full((40, 90), 128)) == 0
+
+
+def test_dhash_ignores_lighting_and_colour_layout():
+
+    card = _card()
+
+    brighter = np.clip(card.astype(np.float64) * 1.2 + 10, 0, None)
+
+    assert dhash(brighter) == dhash(card)
+    assert dhash(np.dstack([card] * 3)) == dhash(card)
+
+
+def test_dhash_separates_different_cards():
+
+    assert hamming(dhash(_card(0)), dhash(_card(1))) > HASH_MAX_DISTANCE
+
+
+def test_card_hash_uses_the_card_rect():
+
+    frame = _card(2, shape=(480, 640))
+
+    card = {"image": frame, "rect": (100, 50, 190, 120)}
+
+    assert card_hash(frame, card) == dhash(frame[50:170, 100:290])
+    assert card_hash(frame) == dhash(frame)
+
+
+def test_hamming():
+
+    assert hamming(0, 0) == 0
+    assert hamming(0b1011, 0b0001) == 2
+    assert hamming((1 << 64) - 1, 0) == 64
+
+
+# ---------- STORE ----------
+
+def test_lookup_within_hash_distance(tmp_path):
+
+    store = LicenseStore(str(tmp_path))
+
+    encoding = np.linspace(-1, 1, 128)
+    image_hash = dhash(_card())
+
+    store.put("DL-04 2011", image_hash, encoding, {"match": True})
+
+    entry = store.lookup("dl0420 11", image_hash)
+
+    assert np.array_equal(entry["encoding"], encoding)
+    assert entry["result"] == {"match": True}
+
+    assert store.lookup("DL042011", _flip_bits(image_hash, HASH_MAX_DISTANCE)) is not None
+    assert store.lookup("DL042011", _flip_bits(image_hash, HASH_MAX_DISTANCE + 1)) is None
+
+    assert store.lookup("DL999", image_hash) is None
+    assert store.lookup("", image_hash) is None
+
+    # Hashed file names: no license number on disk
+    assert all("042011" not in name for name in os.listdir(str(tmp_path)))
+
+
+@pytest.mark.parametrize("content", [
+    "{not json",
+    json.dumps({"encoding": [0.0] * 128}),
+    json.dumps({"hash": "zz", "encoding": [0.0] * 128}),
+    json.dumps({"hash": None, "encoding": [0.0] * 128}),
+    json.dumps({"hash": "00ff", "encoding": [0.0] * 5}),
+    json.dumps({"hash": "00ff"}),
+])
+def test_malformed_entry_is_a_miss_and_removed(tmp_path, content):
+
+    store = LicenseStore(str(tmp_path))
+
+    path = store._path("DL042011")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+    assert store.lookup("DL042011", 0xFF) is None
+    assert not os.path.exists(path)
+
+    # put() writes a fresh entry afterwards
+    store.put("DL042011", 0xFF, np.zeros(128))
+
+    assert store.lookup("DL042011", 0xFF) is not None
@@ -0,0 +1,242 @@
+# test_liveliness.py
+"""
+BlinkDetector calibration and blink timing at different frame rates, and
+the vectorised EAR against the textbook per-eye formula.
+
+    python -m pytest tests
+"""
+
+import math
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("cv2")
+pytest.importorskip("dlib")
+
+from Hardware.liveliness import (
+    BASELINE_FRAMES, BLINK_DROP, EYE_AR_THRESH, EYE_AR_THRESH_MIN, EYE_POINTS,
+    FAST_POINTS, BlinkDetector, ear_batch, eye_aspect_ratio, read_points
+)
+
+
+OPEN_EAR = 0.30
+CLOSED_EAR = 0.08
+
+
+class _Feed:
+    """Feeds EAR samples to a detector at a fixed frame rate."""
+
+    def __init__(self, detector, fps):
+
+        self.detector = detector
+        self.dt = 1.0 / fps
+        self.ts = 0.0
+        self.completed = []
+
+    def frames(self, ear, count):
+
+        for _ in range(count):
+
+            if self.detector.update(ear, self.ts):
+                self.completed.append(self.ts)
+
+            self.ts += self.dt
+
+        return self
+
+
+def _calibrated(fps=30, ear=OPEN_EAR):
+
+    detector = BlinkDetector()
+
+    feed = _Feed(detector, fps)
+
+    # Small jitter so the MAD is not zero
+    for i in range(BASELINE_FRAMES):
+        feed.frames(ear + (0.005 if i % 2 else -0.005), 1)
+
+    return detector, feed
+
+
+def test_calibration_makes_no_decisions():
+
+    detector = BlinkDetector()
+
+    feed = _Feed(detector, 30)
+
+    assert detector.threshold() == EYE_AR_THRESH
+
+    # A closed eye while calibrating is neither a blink nor the threshold
+    feed.frames(OPEN_EAR, BASELINE_FRAMES - 3).frames(CLOSED_EAR, 3)
+
+    assert detector.baseline() is not None
+    assert feed.completed == []
+    assert detector.threshold() == pytest.approx(OPEN_EAR * (1 - BLINK_DROP), abs=0.01)
+
+    feed.frames(OPEN_EAR, 5)
+
+    assert detector.blinks == 0
+
+
+def test_noisy_calibration_is_clamped():
+
+    detector = BlinkDetector()
+
+    feed = _Feed(detector, 30)
+
+    # Median 0.30, but 3 robust sigma would put the threshold near 0.03
+    for i in range(BASELINE_FRAMES):
+        feed.frames((0.18, 0.24, 0.30, 0.36, 0.42)[i % 5], 1)
+
+    assert detector.threshold() == EYE_AR_THRESH_MIN
+
+    feed.frames(OPEN_EAR, 2).frames(CLOSED_EAR, 3).frames(OPEN_EAR, 1)
+
+    assert detector.blinks == 1
+
+
+def test_clamp_stays_below_narrow_eyes():
+
+    detector, feed = _calibrated(ear=0.13)
+
+    assert detector.threshold() < 0.13 - 0.005
+
+    feed.frames(0.13, 10)
+
+    assert detector.blinks == 0
+    assert detector._closed_since is None
+
+
+@pytest.mark.parametrize("fps, closed_frames", [(15, 1), (30, 1), (30, 2)])
+def test_too_short_blink_is_rejected(fps, closed_frames):
+
+    detector, feed = _calibrated(fps)
+
+    # 0 ms (one frame) or 33 ms (two frames at 30 fps) < MIN_CLOSED_MS
+    feed.frames(CLOSED_EAR, closed_frames).frames(OPEN_EAR, 3)
+
+    assert detector.blinks == 0
+    assert feed.completed == []
+
+
+@pytest.mark.parametrize("fps, closed_frames", [(15, 2), (30, 3)])
+def test_real_blink_counts_once(fps, closed_frames):
+
+    detector, feed = _calibrated(fps)
+
+    feed.frames(OPEN_EAR, 2)
+
+    reopen = feed.ts + closed_frames * feed.dt
+
+    feed.frames(CLOSED_EAR, closed_frames).frames(OPEN_EAR, 5)
+
+    assert detector.blinks == 1
+    assert feed.completed == [pytest.approx(reopen)]
+
+
+# ---------- EYE ASPECT RATIO ----------
+
+def _reference_ear(eye):
+    """(|p1-p5| + |p2-p4|) / (2 |p0-p3|), one point at a time."""
+
+    a = math.dist(eye[1], eye[5])
+    b = math.dist(eye[2], eye[4])
+    c = math.dist(eye[0], eye[3])
+
+    return (a + b) / (2.0 * c)
+
+
+class _Point:
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class _Shape:
+    """Stand-in for dlib.full_object_detection."""
+
+    def __init__(self, landmarks):
+        self.landmarks = landmarks
+
+    def part(self, i):
+        return _Point(*self.landmarks[i])
+
+
+def _landmarks(seed):
+
+    rng = np.random.default_rng(seed)
+
+    points = rng.integers(100, 400, size=(68, 2))
+
+    # Eyes shaped like eyes: corners wide apart, lids at varying openings
+    for start in (36, 42):
+
+        x0, y0 = rng.integers(150, 300, size=2)
+        width = rng.integers(25, 45)
+        lid = rng.integers(1, 12, size=2)
+
+        points[start:start + 6] = [
+            (x0, y0),
+            (x0 + width // 3, y0 - lid[0]),
+            (x0 + 2 * width // 3, y0 - lid[1]),
+            (x0 + width, y0),
+            (x0 + 2 * width // 3, y0 + lid[1]),
+            (x0 + width // 3, y0 + lid[0])
+        ]
+
+    return points
+
+
+FIXED_EYES = [
+    # open eye, slightly tilted eye, nearly closed eye
+    [(0, 0), (10, -6), (20, -6), (30, 0), (20, 6), (10, 6)],
+    [(3, 1), (12, -4), (21, -5), (31, 2), (21, 7), (12, 6)],
+    [(0, 0), (10, -1), (20, -1), (30, 0), (20, 1), (10, 1)],
+]
+
+
+@pytest.mark.parametrize("eye", FIXED_EYES)
+def test_eye_aspect_ratio_matches_formula(eye):
+
+    assert eye_aspect_ratio(np.array(eye)) == pytest.approx(_reference_ear(eye), rel=1e-6)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_read_points_and_ear_batch_match_scalar_ear(seed):
+
+    landmarks = _landmarks(seed)
+
+    out = np.empty((len(FAST_POINTS), 2), dtype=np.int32)
+
+    points = read_points(_Shape(landmarks), out)
+
+    assert points is out
+    assert np.array_equal(points, landmarks[list(FAST_POINTS)])
+
+    right = landmarks[36:42].tolist()
+    left = landmarks[42:48].tolist()
+
+    expected = (_reference_ear(right) + _reference_ear(left)) / 2.0
+
+    assert float(ear_batch(points[:len(EYE_POINTS)])) == pytest.approx(expected, rel=1e-6)
+
+
+def test_ear_batch_over_frames():
+
+    frames = np.stack([_landmarks(seed)[list(EYE_POINTS)] for seed in range(6)])
+
+    batch = ear_batch(frames)
+
+    assert batch.shape == (6,)
+
+    for eyes, ear in zip(frames, batch):
+
+        expected = (_reference_ear(eyes[:6].tolist()) + _reference_ear(eyes[6:].tolist())) / 2.0
+
+        assert float(ear) == pytest.approx(expected, rel=1e-6)
@@ -0,0 +1,311 @@
+# test_pipeline.py
+"""
+StageScheduler: ordering, failure propagation, fail-fast, timing and
+session isolation after an abort.
+
+    python -m pytest tests
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pipeline import StageScheduler, StageCancelled, until_cancelled
+from tracing import span, start_trace, stop_trace
+
+
+def test_inputs_are_passed_in_dependency_order():
+
+    sched = StageScheduler()
+
+    sched.add_stage("a", lambda: 2)
+    sched.add_stage("b", lambda: 3)
+    sched.add_stage("sum", lambda a, b: a + b, inputs=["a", "b"])
+    sched.add_stage("double", lambda s: s * 2, inputs=["sum"])
+
+    results = sched.run()
+
+    assert results == {"a": 2, "b": 3, "sum": 5, "double": 10}
+    assert sched.timings["sum"]["start"] >= sched.timings["a"]["end"]
+    assert sched.timings["double"]["start"] >= sched.timings["sum"]["end"]
+
+
+def test_after_orders_without_passing_result():
+
+    order = []
+
+    sched = StageScheduler()
+
+    sched.add_stage("first", lambda: order.append("first") or "x")
+    sched.add_stage("second", lambda: order.append("second") or "y", after=["first"])
+
+    sched.run()
+
+    assert order == ["first", "second"]
+
+
+def test_independent_stages_overlap():
+
+    sched = StageScheduler(max_workers=3)
+
+    for name in ("a", "b", "c"):
+        sched.add_stage(name, lambda: time.sleep(0.2) or True)
+
+    sched.run()
+
+    report = sched.timing_report()
+
+    assert report["wall_clock_sec"] < 0.5
+    assert report["serial_sum_sec"] >= 0.6
+
+
+def test_failed_stage_skips_dependents():
+
+    def boom():
+        raise RuntimeError("camera unplugged")
+
+    sched = StageScheduler()
+
+    sched.add_stage("capture", boom)
+    sched.add_stage("ocr", lambda img: img, inputs=["capture"])
+    sched.add_stage("api", lambda data: data, inputs=["ocr"])
+    sched.add_stage("alcohol", lambda: True)
+
+    results = sched.run()
+
+    assert isinstance(sched.errors["capture"], RuntimeError)
+    assert sched.skipped["ocr"] == "dependency failed: capture"
+    assert sched.skipped["api"] == "dependency failed: ocr"
+    assert results == {"alcohol": True}
+    assert sched.aborted_by is None
+
+
+def test_fail_fast_aborts_on_falsy_mandatory_result():
+
+    started = threading.Event()
+    cancelled = threading.Event()
+    ran = []
+
+    def slow():
+
+        started.set()
+
+        if sched.cancel_event.wait(5):
+            cancelled.set()
+            raise StageCancelled("Pipeline aborted")
+
+        return True
+
+    def deny():
+        started.wait(5)
+        return False
+
+    sched = StageScheduler(fail_fast=True)
+
+    sched.add_stage("slow", slow, mandatory=True)
+    sched.add_stage("alcohol", deny, mandatory=True)
+    sched.add_stage("later", lambda: ran.append(1) or True, after=["alcohol"])
+
+    t0 = time.monotonic()
+    sched.run()
+
+    assert time.monotonic() - t0 < 2
+    assert sched.aborted_by == "alcohol"
+    assert sched.cancel_event.is_set()
+    assert cancelled.wait(1)
+    assert ran == []
+    assert sched.skipped["later"].startswith("aborted after alcohol")
+    assert sched.skipped["slow"].startswith("aborted after alcohol")
+
+
+def test_optional_stage_failure_does_not_abort():
+
+    sched = StageScheduler(fail_fast=True)
+
+    sched.add_stage("card", lambda: None)
+    sched.add_stage("ocr", lambda card: "text", inputs=["card"], mandatory=True)
+
+    results = sched.run()
+
+    assert sched.aborted_by is None
+    assert results["ocr"] == "text"
+
+
+def test_graph_errors():
+
+    sched = StageScheduler()
+    sched.add_stage("a", lambda: 1, inputs=["missing"])
+
+    with pytest.raises(ValueError, match="unknown stage"):
+        sched.run()
+
+    sched = StageScheduler()
+    sched.add_stage("a", lambda b: 1, inputs=["b"])
+    sched.add_stage("b", lambda a: 1, inputs=["a"])
+
+    with pytest.raises(ValueError, match="cycle"):
+        sched.run()
+
+    with pytest.raises(ValueError, match="Duplicate"):
+        sched.add_stage("a", lambda: 1)
+
+
+def test_critical_path_follows_longest_chain():
+
+    sched = StageScheduler()
+
+    sched.add_stage("capture", lambda: time.sleep(0.05) or 1)
+    sched.add_stage("ocr", lambda c: time.sleep(0.15) or 1, inputs=["capture"])
+    sched.add_stage("face", lambda c: time.sleep(0.01) or 1, inputs=["capture"])
+    sched.add_stage("api", lambda o: time.sleep(0.02) or 1, inputs=["ocr"])
+
+    sched.run()
+
+    path, seconds = sched.critical_path()
+
+    assert path == ["capture", "ocr", "api"]
+    assert seconds >= 0.2
+
+
+def test_until_cancelled_closes_inner_generator():
+
+    closed = []
+
+    def frames():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            closed.append(True)
+
+    cancel = threading.Event()
+
+    seen = []
+
+    for item in until_cancelled(frames(), cancel):
+
+        seen.append(item)
+
+        if item == 2:
+            cancel.set()
+
+    assert seen == [0, 1, 2]
+    assert closed == [True]
+
+
+def test_settled_lets_a_stage_wait_for_others():
+
+    sched = StageScheduler(max_workers=3)
+
+    def boom():
+        raise RuntimeError("no camera")
+
+    def watcher():
+
+        polls = 0
+
+        while not sched.settled(["slow", "broken", "dependent"]):
+            polls += 1
+            time.sleep(0.01)
+
+        return polls
+
+    sched.add_stage("slow", lambda: time.sleep(0.1) or True)
+    sched.add_stage("broken", boom)
+    sched.add_stage("dependent", lambda b: True, inputs=["broken"])
+    sched.add_stage("watcher", watcher)
+
+    results = sched.run()
+
+    assert results["watcher"] > 0
+    assert sched.timings["watcher"]["end"] >= sched.timings["slow"]["end"]
+    assert "dependent" in sched.skipped
+
+
+def _names(spans):
+
+    for s in spans:
+        yield s["name"]
+        yield from _names(s["children"])
+
+
+def test_abort_joins_cooperative_stages():
+
+    stopped = []
+
+    def camera():
+
+        sched.cancel_event.wait(5)
+
+        # Releasing the camera takes a moment after the cancel
+        time.sleep(0.1)
+        stopped.append(True)
+
+        raise StageCancelled("Pipeline aborted")
+
+    sched = StageScheduler(fail_fast=True, abort_join_sec=2)
+
+    sched.add_stage("camera", camera, mandatory=True)
+    sched.add_stage("alcohol", lambda: time.sleep(0.02) and False, mandatory=True)
+
+    sched.run()
+
+    assert sched.aborted_by == "alcohol"
+    assert stopped == [True]
+    assert sched.abandoned == []
+
+
+def test_aborted_session_does_not_leak_into_next():
+
+    release = threading.Event()
+    leaked = threading.Event()
+
+    def stuck():
+
+        # Ignores cancel_event, like a blocking tesseract call
+        release.wait(5)
+
+        with span("late"):
+            pass
+
+        leaked.set()
+
+        return True
+
+    # Session 1: aborted while "stuck" is still running
+    start_trace()
+
+    first = StageScheduler(fail_fast=True, abort_join_sec=0.05)
+
+    first.add_stage("stuck", stuck, mandatory=True)
+    first.add_stage("alcohol", lambda: time.sleep(0.02) and False, mandatory=True)
+
+    t0 = time.monotonic()
+    first.run()
+
+    assert time.monotonic() - t0 < 1
+    assert first.abandoned == ["stuck"]
+    assert first.timing_report()["abandoned"] == ["stuck"]
+
+    stop_trace()
+
+    # Session 2 starts while the abandoned stage is still alive
+    start_trace()
+
+    second = StageScheduler()
+
+    second.add_stage("face", lambda: release.set() or leaked.wait(5))
+
+    results = second.run()
+
+    spans = stop_trace()
+
+    assert results["face"] is True
+    assert "stage.face" in set(_names(spans))
+    assert "late" not in set(_names(spans))
+    assert "stuck" not in second.timings
@@ -0,0 +1,60 @@
+# test_session_logger.py
+"""
+SessionLogger with stages still reporting from worker threads.
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_logger import SessionLogger
+
+
+def test_late_checks_are_ignored_after_close(tmp_path):
+
+    logger = SessionLogger(str(tmp_path))
+
+    logger.log_skipped("face_match", "aborted after alcohol failed")
+    logger.close_checks()
+
+    # Abandoned stage finishing after the decision
+    logger.log_check("face_match", True)
+
+    logger.write()
+
+    with open(os.path.join(str(tmp_path), "session_result.json"), encoding="utf-8") as f:
+        checks = json.load(f)["checks"]
+
+    assert checks["face_match"]["status"] is False
+    assert checks["face_match"]["details"]["skipped"] is True
+
+
+def test_write_while_stages_log(tmp_path):
+
+    logger = SessionLogger(str(tmp_path))
+
+    stop = threading.Event()
+
+    def stage():
+        i = 0
+        while not stop.is_set():
+            logger.log_check(f"late_{i % 2000}", i % 2 == 0)
+            i += 1
+
+    worker = threading.Thread(target=stage)
+    worker.start()
+
+    try:
+        for _ in range(50):
+            logger.write()
+    finally:
+        stop.set()
+        worker.join()
+
+    with open(os.path.join(str(tmp_path), "session_result.json"), encoding="utf-8") as f:
+        assert "checks" in json.load(f)
@@ -0,0 +1,272 @@
+# tracing.py
+"""
+Lightweight per-stage latency tracing.
+
+    from tracing import span, traced
+
+    with span("ocr.tesseract"):
+        text = pytesseract.image_to_string(...)
+
+    @traced("face.encode")
+    def encode(...): ...
+
+Spans are only recorded while a trace is active (start_trace() ...
+stop_trace()); otherwise span() costs a single check. The active tracer
+lives in a contextvar: the scheduler runs each stage in a copy of the
+session's context, so a stage abandoned by a fail-fast abort keeps
+writing to its own (finished) session and never into the next one.
+Nesting is tracked per thread, so spans opened inside a pipeline stage
+become children of that stage's span. stop_trace() returns the span tree, which
+SessionLogger stores in session_result.json.
+
+CLI - latency percentiles per span across recorded sessions:
+
+    python tracing.py [data/sessions]
+"""
+
+import contextvars
+import functools
+import glob
+import json
+import math
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+_local = threading.local()
+_active = contextvars.ContextVar("driveguard_tracer", default=None)
+
+
+class Tracer:
+    """Collects spans for one session."""
+
+    def __init__(self):
+
+        self.t0 = time.perf_counter()
+        self.spans = []
+
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def new_id(self):
+
+        with self._lock:
+            self._next_id += 1
+            return self._next_id
+
+    def add(self, record):
+
+        with self._lock:
+            self.spans.append(record)
+
+    def tree(self):
+        """
+        Returns:
+            list of root spans, each {"name", "start", "duration", "thread",
+            "children": [...], optional "attrs"}, sorted by start time
+        """
+
+        with self._lock:
+            records = [dict(r) for r in self.spans]
+
+        by_id = {r["id"]: r for r in records}
+        roots = []
+
+        for r in records:
+            r["children"] = []
+
+        for r in sorted(records, key=lambda r: r["start"]):
+
+            parent = by_id.get(r.pop("parent"))
+
+            if parent is None:
+                roots.append(r)
+            else:
+                parent["children"].append(r)
+
+        for r in records:
+            del r["id"]
+
+        return roots
+
+
+def start_trace():
+    """Begin recording spans in the current context (replaces any active trace)."""
+
+    tracer = Tracer()
+
+    _active.set(tracer)
+
+    return tracer
+
+
+def stop_trace():
+    """
+    Stop recording.
+
+    Returns:
+        span tree (see Tracer.tree) or [] if no trace was active
+    """
+
+    tracer = _active.get()
+
+    _active.set(None)
+
+    return tracer.tree() if tracer is not None else []
+
+
+def _stack():
+
+    stack = getattr(_local, "stack", None)
+
+    if stack is None:
+        stack = _local.stack = []
+
+    return stack
+
+
+@contextmanager
+def span(name, **attrs):
+    """Time the enclosed block as a span named `name`."""
+
+    tracer = _active.get()
+
+    if tracer is None:
+        yield
+        return
+
+    stack = _stack()
+
+    span_id = tracer.new_id()
+    parent = stack[-1] if stack else None
+
+    stack.append(span_id)
+
+    start = time.perf_counter()
+
+    try:
+        yield
+
+    finally:
+
+        end = time.perf_counter()
+
+        stack.pop()
+
+        record = {
+            "id": span_id,
+            "parent": parent,
+            "name": name,
+            "start": round(start - tracer.t0, 6),
+            "duration": round(end - start, 6),
+            "thread": threading.current_thread().name
+        }
+
+        if attrs:
+            record["attrs"] = attrs
+
+        tracer.add(record)
+
+
+def traced(name=None):
+    """Decorator form of span(); defaults to the function's qualified name."""
+
+    def decorator(func):
+
+        label = name or f"{func.__module__}.{func.__qualname__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ---------------- AGGREGATION ----------------
+def _walk(spans):
+
+    for s in spans:
+        yield s
+        yield from _walk(s.get("children", []))
+
+
+def _percentile(sorted_values, p):
+
+    # nearest-rank
+    rank = math.ceil(p / 100.0 * len(sorted_values))
+
+    return sorted_values[max(rank, 1) - 1]
+
+
+def aggregate(sessions_dir="data/sessions"):
+    """
+    Collect span durations from every session_result.json.
+
+    Returns:
+        dict: span name -> {"count", "p50", "p95", "p99", "max"} (seconds)
+    """
+
+    durations = {}
+
+    pattern = os.path.join(sessions_dir, "*", "session_result.json")
+
+    for path in glob.glob(pattern):
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {e}")
+            continue
+
+        for s in _walk(data.get("spans", [])):
+            durations.setdefault(s["name"], []).append(s["duration"])
+
+    stats = {}
+
+    for name, values in durations.items():
+
+        values.sort()
+
+        stats[name] = {
+            "count": len(values),
+            "p50": _percentile(values, 50),
+            "p95": _percentile(values, 95),
+            "p99": _percentile(values, 99),
+            "max": values[-1]
+        }
+
+    return stats
+
+
+def main(argv=None):
+
+    argv = sys.argv[1:] if argv is None else argv
+
+    sessions_dir = argv[0] if argv else "data/sessions"
+
+    stats = aggregate(sessions_dir)
+
+    if not stats:
+        print(f"No traced sessions in {sessions_dir}")
+        return
+
+    print(f"{'span':<32}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+
+    for name, st in sorted(stats.items(), key=lambda kv: -kv[1]["p50"] * kv[1]["count"]):
+
+        print(
+            f"{name:<32}{st['count']:>7}"
+            f"{st['p50'] * 1000:>10.1f}{st['p95'] * 1000:>10.1f}"
+            f"{st['p99'] * 1000:>10.1f}{st['max'] * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()